@@ -1,19 +1,240 @@
+import asyncio
+import atexit
+import logging
 import os
-from datetime import datetime
-from typing import Optional
+import queue
+import sqlite3
+from typing import List, Optional
 
-from flask import (Flask, redirect, render_template, request,
-                   send_from_directory, url_for)
-from database import get_supabase_client
+from flask import (Flask, Response, abort, make_response, redirect,
+                   render_template, request, stream_template, stream_with_context,
+                   url_for)
+from werkzeug.exceptions import HTTPException
+import compression
+import metrics
+import rate_limit
+import static_assets
+from app_logging import REQUEST_LOGGER, configure_logging
+from async_repository import DatabaseLoop, create_async_visitor_repository
+from cache import LastValueCache, TTLCache, VisitorLRU
+from circuit_breaker import (STATE_VALUES, CircuitBreaker, CircuitOpenError,
+                             GuardedRepository)
+from counters import create_counters
+from export import EXPORT_FORMATS, export_visitors
+from http_cache import (data_version_etag, last_modified, not_modified, set_validators,
+                        visitor_etag)
+from json_api import json_response, parse_fields, project, query_columns
+from pagination import StreamedPage, decode_cursor, fetch_page, fetch_page_async
+from spool import SpoolReplayer, VisitSpool
+from templating import configure_templates, template_version
+from visitor_queue import VisitorWriteBehindQueue
+from visitor_repository import clean_name, create_visitor_repository, normalize_name
+from visitor_stats import (DEFAULT_DAYS, DEFAULT_HOURS, DEFAULT_TOP, MAX_DAYS, MAX_HOURS,
+                           MAX_TOP, build_stats)
+
+# Logging con cola y escritor en segundo plano (LOG_LEVEL, LOG_FORMAT, LOG_REQUEST_SAMPLE_RATE)
+configure_logging()
+log = logging.getLogger('app')
+request_log = logging.getLogger(REQUEST_LOGGER)
 
 app = Flask(__name__)
 
-# Cliente de Supabase
-supabase = get_supabase_client()
+# Latencias por ruta, plantilla y operación de BD en /metrics (formato Prometheus)
+metrics.init_app(app)
+
+# Límite de peticiones por IP antes de tocar la BD (RATE_LIMIT=1, RATE_LIMITS)
+rate_limit.init_app(app)
+
+# Compresión gzip/brotli de respuestas (RESPONSE_COMPRESSION=1, incluye streaming)
+compression.init_app(app)
+
+# Recursos estáticos con hash, precomprimidos y en memoria (/assets/, asset_url)
+static_assets.init_app(app)
+
+# Caché de bytecode y precompilación de plantillas (JINJA_BYTECODE_CACHE_DIR, JINJA_PRECOMPILE)
+configure_templates(app)
+
+# Repositorio de visitantes (backend según VISITOR_BACKEND: supabase, memory, sqlite)
+visitor_repository = create_visitor_repository()
+
+# Circuit breaker de la BD (DB_CIRCUIT_BREAKER=1): con Supabase caído o lento
+# las llamadas fallan al instante en lugar de esperar el timeout del cliente
+db_breaker = CircuitBreaker.from_env()
+if db_breaker is not None:
+    visitor_repository = GuardedRepository(visitor_repository, db_breaker)
+
+# Contadores de visitas y saludos (backend según COUNTER_BACKEND: local, shm, sqlite)
+counters = create_counters()
+
+
+def flush_visitors_batch(visits: List[dict], batch_id: Optional[str] = None,
+                         returning: bool = True) -> List[dict]:
+    """
+    Envía a la base de datos un lote de visitas ya fusionadas por nombre
+
+    Args:
+        visits: Registros pendientes con name, increment, first_visit,
+            last_visit e ip_address
+        batch_id: Identificador del lote para reenvíos idempotentes (spool)
+        returning: False si no se usan las filas (la BD no las devuelve)
+
+    Returns:
+        List[dict]: Filas actualizadas de los visitantes
+    """
+    rows = visitor_repository.register_batch(visits, batch_id=batch_id, returning=returning)
+    visitors_cache.invalidate()
+    return rows
+
+
+def _spool_failed_batch(visits: List[dict]) -> None:
+    """Lote write-behind fallido: pasa al spool durable en lugar de reintentarse en memoria"""
+    visit_spool.append(visits)
+    log.warning("⚠️ Lote write-behind guardado en el spool",
+                extra={'batch_size': len(visits)})
+
+
+# Filas conocidas de los visitantes recientes (VISITOR_LRU_SIZE): numeran las
+# visitas encoladas o en el spool en memoria sin consultar la BD. Sin ninguna
+# de esas colas no hay quien las lea y no se llena
+visitor_lru = VisitorLRU(int(os.getenv('VISITOR_LRU_SIZE', '10000')))
+
+# Spool durable (DB_SPOOL_PATH): las visitas que no se pudieron escribir se
+# guardan en disco y se reenvían por lotes, a ritmo limitado, al volver la BD
+visit_spool = None
+spool_replayer = None
+if os.getenv('DB_SPOOL_PATH'):
+    visit_spool = VisitSpool(os.getenv('DB_SPOOL_PATH'))
+    spool_replayer = SpoolReplayer(
+        visit_spool,
+        # El reenvío no usa las filas resultantes
+        lambda visits, batch_id: flush_visitors_batch(visits, batch_id, returning=False),
+        batch_size=int(os.getenv('DB_SPOOL_REPLAY_BATCH', '100')),
+        rate=float(os.getenv('DB_SPOOL_REPLAY_RATE', '200')),
+        interval_ms=int(os.getenv('DB_SPOOL_REPLAY_INTERVAL_MS', '1000')),
+        can_replay=(lambda: db_breaker.available) if db_breaker is not None else None
+    )
+    spool_replayer.start()
+    atexit.register(spool_replayer.close)
+
+# Modo write-behind (opcional): VISITOR_WRITE_MODE=write_behind
+write_queue = None
+if os.getenv('VISITOR_WRITE_MODE', 'sync') == 'write_behind':
+    write_queue = VisitorWriteBehindQueue(
+        flush_visitors_batch,
+        flush_interval_ms=int(os.getenv('VISITOR_FLUSH_INTERVAL_MS', '200')),
+        flush_max_items=int(os.getenv('VISITOR_FLUSH_MAX_ITEMS', '100')),
+        max_pending=int(os.getenv('VISITOR_QUEUE_MAX_SIZE', '10000')),
+        can_flush=(lambda: db_breaker.available) if db_breaker is not None else None,
+        known=visitor_lru,
+        on_flush_error=_spool_failed_batch if visit_spool is not None else None
+    )
+    write_queue.start()
+    atexit.register(write_queue.close)
+
+# Sin spool durable, las visitas recibidas con el circuito abierto se guardan
+# en memoria y se envían por lotes cuando la BD vuelve (en modo write-behind
+# se usa la misma cola)
+spool_queue = write_queue
+if db_breaker is not None and spool_queue is None and visit_spool is None:
+    spool_queue = VisitorWriteBehindQueue(
+        flush_visitors_batch,
+        flush_interval_ms=int(os.getenv('DB_SPOOL_REPLAY_INTERVAL_MS', '1000')),
+        max_pending=int(os.getenv('DB_SPOOL_MAX_SIZE', '10000')),
+        can_flush=lambda: db_breaker.available,
+        known=visitor_lru
+    )
+    spool_queue.start()
+    atexit.register(spool_queue.close)
+
+# Paginación de /visitors (?limit=&after=|before=)
+VISITORS_PAGE_SIZE = int(os.getenv('VISITORS_PAGE_SIZE', '50'))
+VISITORS_MAX_PAGE_SIZE = int(os.getenv('VISITORS_MAX_PAGE_SIZE', '500'))
+
+# Render de /visitors: buffered (por defecto) o stream (la tabla se envía por
+# bloques de VISITORS_STREAM_CHUNK_SIZE filas mientras se consultan; solo modo sync)
+VISITORS_RENDER_MODE = os.getenv('VISITORS_RENDER_MODE', 'buffered')
+VISITORS_STREAM_CHUNK_SIZE = int(os.getenv('VISITORS_STREAM_CHUNK_SIZE', '100'))
+STREAM_BUFFER_SIZE = 4096
+
+# Forma parte del ETag de /visitors: un despliegue con otra plantilla lo invalida
+VISITORS_TEMPLATE_VERSION = template_version(app, 'visitors.html')
+
+# Respuesta de /visitors cuando la BD no está disponible
+EMPTY_PAGE = {'rows': [], 'next_cursor': None, 'prev_cursor': None}
+EMPTY_TOTALS = {'total_unique': 0, 'total_visits': 0}
+
+# Filas por consulta al exportar /visitors/export
+VISITORS_EXPORT_CHUNK_SIZE = int(os.getenv('VISITORS_EXPORT_CHUNK_SIZE', '1000'))
+
+# Caché de páginas y totales de /visitors (VISITORS_CACHE_TTL=0 la desactiva)
+visitors_cache = TTLCache(
+    ttl=float(os.getenv('VISITORS_CACHE_TTL', '0')),
+    maxsize=int(os.getenv('VISITORS_CACHE_MAXSIZE', '256'))
+)
+
+# Última página y totales obtenidos: se sirven si la BD no responde
+last_listing = LastValueCache()
+
+# Estado de la caché y de la cola write-behind en /metrics
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    'visitors_cache_entries', 'Entradas en la caché de /visitors',
+    lambda: visitors_cache.stats()['size']))
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    'visitors_cache_hits_total', 'Aciertos de la caché de /visitors',
+    lambda: visitors_cache.stats()['hits'], type='counter'))
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    'visitors_cache_misses_total', 'Fallos de la caché de /visitors',
+    lambda: visitors_cache.stats()['misses'], type='counter'))
+if spool_queue is not None:
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_lru_entries', 'Visitantes en la LRU de filas conocidas',
+        lambda: visitor_lru.stats()['size']))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_lru_hits_total', 'Visitas numeradas con una fila conocida',
+        lambda: visitor_lru.stats()['hits'], type='counter'))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_lru_misses_total', 'Visitas de visitantes sin fila conocida',
+        lambda: visitor_lru.stats()['misses'], type='counter'))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_lru_hit_ratio', 'Tasa de aciertos de la LRU de visitantes',
+        lambda: visitor_lru.stats()['hit_ratio']))
+if write_queue is not None:
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_queue_depth', 'Visitantes pendientes de escribir',
+        lambda: write_queue.stats()['queue_depth']))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_queue_flush_errors_total', 'Lotes write-behind fallidos',
+        lambda: write_queue.stats()['flush_errors'], type='counter'))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_queue_spooled_visits_total', 'Visitas de lotes fallidos guardadas en el spool',
+        lambda: write_queue.stats()['handed_off_visits'], type='counter'))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'visitor_queue_rejected_total', 'Visitas rechazadas por cola llena',
+        lambda: write_queue.stats()['rejected'], type='counter'))
+if db_breaker is not None:
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'db_circuit_state', 'Circuito de la BD (0 cerrado, 1 semiabierto, 2 abierto)',
+        lambda: STATE_VALUES[db_breaker.state]))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'db_circuit_rejected_total', 'Llamadas a la BD rechazadas por el circuito',
+        lambda: db_breaker.stats()['rejected'], type='counter'))
+
+if visit_spool is not None:
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'db_spool_depth', 'Visitas en el spool pendientes de reenviar a la BD',
+        lambda: visit_spool.stats()['visits']))
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'db_spool_replayed_total', 'Visitas del spool reenviadas a la BD',
+        lambda: spool_replayer.replayed, type='counter'))
+elif spool_queue is not None and spool_queue is not write_queue:
+    metrics.REGISTRY.register(metrics.CallbackMetric(
+        'db_spool_depth', 'Visitantes pendientes de reenviar a la BD',
+        lambda: spool_queue.stats()['queue_depth']))
 
-# Contadores de visitas (en memoria, para compatibilidad)
-visit_count = 0
-greeting_count = 0
+# Modo de servicio: sync (por defecto) o async (vistas async + cliente async de Supabase)
+SERVING_MODE = os.getenv('APP_SERVING_MODE', 'sync')
+db_loop = None
+async_visitor_repository = None
 
 
 def register_visitor(name: str, ip_address: str = None) -> Optional[dict]:
@@ -27,86 +248,149 @@ def register_visitor(name: str, ip_address: str = None) -> Optional[dict]:
     Returns:
         Optional[dict]: Datos del visitante registrado, o None si hubo error
     """
+    if write_queue is not None:
+        try:
+            # Se envía en segundo plano; el número de visita se calcula localmente
+            return write_queue.submit(name, ip_address)
+        except queue.Full:
+            # Cola llena: registrar en línea para no perder la visita
+            log.warning("⚠️ Cola write-behind llena, registrando de forma síncrona")
+
     try:
-        # Buscar si el visitante ya existe
-        response = supabase.table('visitors').select('*').eq('name', name).execute()
-        
-        if response.data and len(response.data) > 0:
-            # El visitante ya existe, actualizar visit_count y last_visit
-            visitor = response.data[0]
-            updated_visitor = supabase.table('visitors').update({
-                'visit_count': visitor['visit_count'] + 1,
-                'last_visit': datetime.now().isoformat(),
-                'ip_address': ip_address or visitor['ip_address']
-            }).eq('id', visitor['id']).execute()
-            
-            print(f"✅ Visitante actualizado: {name} (visita #{visitor['visit_count'] + 1})")
-            return updated_visitor.data[0] if updated_visitor.data else visitor
-        else:
-            # Nuevo visitante, crear registro
-            new_visitor = supabase.table('visitors').insert({
-                'name': name,
-                'visit_count': 1,
-                'first_visit': datetime.now().isoformat(),
-                'last_visit': datetime.now().isoformat(),
-                'ip_address': ip_address
-            }).execute()
-            
-            print(f"✅ Nuevo visitante registrado: {name}")
-            return new_visitor.data[0] if new_visitor.data else None
-            
+        visitor = visitor_repository.register(name, ip_address)
+        visitors_cache.invalidate()
+        _log_registration(name, visitor)
+        _remember_visitor(visitor)
+        return visitor
+
+    except CircuitOpenError:
+        return _spool_registration(name, ip_address)
+
     except Exception as e:
-        print(f"❌ Error al registrar visitante: {str(e)}")
+        log.error("❌ Error al registrar visitante: %s", e, extra={'visitor': name})
+        # Con spool durable la visita no se pierde: se reenvía más tarde
+        return _spool_registration(name, ip_address) if visit_spool is not None else None
+
+
+async def register_visitor_async(name: str, ip_address: str = None) -> Optional[dict]:
+    """
+    Igual que register_visitor, esperando a la BD sin bloquear el hilo
+    (la llamada se ejecuta en el loop de BD compartido)
+    """
+    if write_queue is not None:
+        try:
+            return write_queue.submit(name, ip_address)
+        except queue.Full:
+            log.warning("⚠️ Cola write-behind llena, registrando de forma síncrona")
+
+    try:
+        visitor = await db_loop.run(async_visitor_repository.register(name, ip_address))
+        visitors_cache.invalidate()
+        _log_registration(name, visitor)
+        _remember_visitor(visitor)
+        return visitor
+
+    except CircuitOpenError:
+        return _spool_registration(name, ip_address)
+
+    except Exception as e:
+        log.error("❌ Error al registrar visitante: %s", e, extra={'visitor': name})
+        # Con spool durable la visita no se pierde: se reenvía más tarde
+        return _spool_registration(name, ip_address) if visit_spool is not None else None
+
+
+def _spool_registration(name: str, ip_address: Optional[str]) -> Optional[dict]:
+    """
+    Modo degradado: la visita se guarda para reenviarla cuando la BD responda
+
+    Returns:
+        Optional[dict]: Fila calculada localmente (spool en memoria), o None
+        con el spool durable: la página usa el contador de saludos
+    """
+    if visit_spool is not None:
+        try:
+            visit_spool.append_visit(name, ip_address)
+        except sqlite3.Error as e:
+            log.error("❌ Error al guardar la visita en el spool: %s", e, extra={'visitor': name})
         return None
+    try:
+        return spool_queue.submit(name, ip_address)
+    except queue.Full:
+        log.error("❌ Spool de visitas lleno, visita descartada", extra={'visitor': name})
+        return None
+
+
+def _remember_visitor(visitor: Optional[dict]) -> None:
+    """Guarda la fila en la LRU solo si hay una cola que la lea al numerar visitas"""
+    if visitor and spool_queue is not None:
+        visitor_lru.update(visitor)
+
+
+def _log_registration(name: str, visitor: Optional[dict]) -> None:
+    if visitor and visitor['visit_count'] > 1:
+        log.debug("✅ Visitante actualizado: %s (visita #%d)", name, visitor['visit_count'])
+    elif visitor:
+        log.debug("✅ Nuevo visitante registrado: %s", name)
 
 
 @app.route('/')
 def index():
-   global visit_count
-   visit_count += 1
-   print('Request for index page received')
-   return render_template('index.html', visits=visit_count)
+   visits = counters.increment('visits')
+   request_log.info('Request for index page received')
+   return render_template('index.html', visits=visits)
 
 @app.route('/favicon.ico')
 def favicon():
-    return send_from_directory(os.path.join(app.root_path, 'static'),
-                               'favicon.ico', mimetype='image/vnd.microsoft.icon')
+    # Servido desde memoria: sin stat del archivo ni revalidación en cada visita
+    return static_assets.send_asset(static_assets.get_asset('favicon.ico'),
+                                    static_assets.FAVICON_CACHE)
 
 @app.route('/hello', methods=['POST'])
 def hello():
-   global greeting_count
-   name = request.form.get('name')
+   # "Ana " y "Ana" son el mismo nombre; solo espacios cuenta como vacío
+   name = clean_name(request.form.get('name') or '')
+
+   if name:
+       # Registrar o actualizar visitante en la base de datos (con su IP)
+       visitor = register_visitor(name, request.remote_addr)
+       return _render_hello(name, visitor)
+   else:
+       request_log.info('Request for hello page received with no name or blank name -- redirecting')
+       return redirect(url_for('index'))
+
+
+async def hello_async():
+   """Variante async de /hello (APP_SERVING_MODE=async)"""
+   name = clean_name(request.form.get('name') or '')
 
    if name:
-       # Obtener la IP del visitante
-       ip_address = request.remote_addr
-       
-       # Registrar o actualizar visitante en la base de datos
-       visitor = register_visitor(name, ip_address)
-       
-       # Incrementar contador en memoria (para compatibilidad)
-       greeting_count += 1
-       
-       # Obtener datos del visitante desde la BD o usar valores por defecto
-       visit_number = visitor['visit_count'] if visitor else greeting_count
-       
-       print(f'Request for hello page received with name={name}, visit #{visit_number}')
-       
-       return render_template('hello.html', 
-                            name=name, 
-                            greetings=greeting_count,
-                            visit_number=visit_number,
-                            visitor=visitor)
+       visitor = await register_visitor_async(name, request.remote_addr)
+       return _render_hello(name, visitor)
    else:
-       print('Request for hello page received with no name or blank name -- redirecting')
+       request_log.info('Request for hello page received with no name or blank name -- redirecting')
        return redirect(url_for('index'))
 
+
+def _render_hello(name: str, visitor: Optional[dict]):
+   # Incrementar contador de saludos
+   greetings = counters.increment('greetings')
+
+   # Obtener datos del visitante desde la BD o usar valores por defecto
+   visit_number = visitor['visit_count'] if visitor else greetings
+
+   request_log.info('Request for hello page received with name=%s, visit #%s', name, visit_number)
+
+   return render_template('hello.html',
+                        name=name,
+                        greetings=greetings,
+                        visit_number=visit_number,
+                        visitor=visitor)
+
 # --- NUEVA RUTA: Reset counters ---
 @app.post("/reset")
 def reset_counters():
-    global visit_count, greeting_count
-    visit_count = 0
-    greeting_count = 0
+    # Con backend shm o sqlite el reinicio aplica a todos los workers
+    counters.reset()
     # volvemos al home con un indicador para mostrar un mensaje en la UI
     return redirect(url_for("index", reset=1))
 
@@ -119,43 +403,287 @@ def list_visitors():
       - Total de visitantes únicos
       - Total de visitas acumuladas
     Orden: última visita (desc, más reciente primero)
+    Paginación: ?limit=N y cursor keyset ?after= / ?before= sobre (last_visit, id)
     Si no hay registros: mensaje informativo
     """
+    limit, after, before = _visitors_page_args()
+
     try:
-        # Traer campos necesarios y ordenar por last_visit DESC
-        response = supabase.table('visitors') \
-            .select('name, first_visit, last_visit, visit_count') \
-            .order('last_visit', desc=True) \
-            .execute()
-        rows = response.data or []
+        # Los totales (con caché) dan la versión de los datos para ETag/304
+        totals = visitors_cache.get_or_load('totals', visitor_repository.totals)
     except Exception as e:
         # En caso de fallo de conexión, no romper la UI
-        print(f"❌ Error consultando visitors: {e}")
-        rows = []
+        return _degraded_visitors(e, limit, after, before)
+    last_listing.put('totals', totals)
 
-    total_unique = len(rows)
-    total_visits = sum(int(r.get('visit_count', 0) or 0) for r in rows)
+    etag, modified = _visitors_version(totals)
+    unchanged = not_modified(etag, modified)
+    if unchanged is not None:
+        return unchanged
 
-    # Normalizar ISO 8601 → strings amigables (opcional)
-    def fmt(dt_str):
-        if not dt_str:
-            return "-"
-        # Evitar crash si viene con/ sin zona horaria
+    if VISITORS_RENDER_MODE == 'stream':
+        response = _stream_visitors(limit, after, before, totals)
+    else:
         try:
-            return dt_str.replace('T', ' ').split('+')[0].split('Z')[0]
-        except Exception:
-            return dt_str
+            # Una sola página ordenada por last_visit DESC (con caché), guardada
+            # junto a los totales con los que se cargó
+            page = visitors_cache.get_or_load(
+                _page_cache_key(totals, limit, after, before),
+                lambda: {**fetch_page(visitor_repository, limit, after=after, before=before),
+                         'totals': totals}
+            )
+        except Exception as e:
+            return _degraded_visitors(e, limit, after, before)
+        last_listing.put(('page', limit, after, before), page)
+        # ETag, Last-Modified y totales de la misma instantánea que las filas
+        etag, modified = _visitors_version(page['totals'])
+        response = make_response(_render_visitors(page, page['totals'], limit))
+
+    return set_validators(response, etag, modified)
+
+
+async def list_visitors_async():
+    """
+    Variante async de /visitors: la página se pide tras los totales, cuya
+    versión forma parte de su clave de caché, y no se pide si el cliente ya
+    tiene la versión actual (304)
+    """
+    limit, after, before = _visitors_page_args()
+
+    try:
+        totals = await _cached_async('totals', async_visitor_repository.totals)
+        etag, modified = _visitors_version(totals)
+        unchanged = not_modified(etag, modified)
+        if unchanged is not None:
+            return unchanged
+        page = await _cached_async(
+            _page_cache_key(totals, limit, after, before),
+            lambda: _fetch_page_with_totals_async(totals, limit, after, before))
+    except Exception as e:
+        return _degraded_visitors(e, limit, after, before)
+    last_listing.put('totals', totals)
+    last_listing.put(('page', limit, after, before), page)
+
+    etag, modified = _visitors_version(page['totals'])
+    response = make_response(_render_visitors(page, page['totals'], limit))
+    return set_validators(response, etag, modified)
+
+
+async def _fetch_page_with_totals_async(totals: dict, limit: int, after: Optional[str],
+                                        before: Optional[str]) -> dict:
+    page = await fetch_page_async(async_visitor_repository, limit, after=after, before=before)
+    return {**page, 'totals': totals}
+
+
+async def _cached_async(key, coro_factory):
+    """Lee de visitors_cache; en un fallo la carga corre en el loop de BD"""
+    if visitors_cache.ttl <= 0:
+        return await db_loop.run(coro_factory())
+    return await asyncio.to_thread(visitors_cache.get_or_load, key,
+                                   lambda: db_loop.call(coro_factory()))
 
-    for r in rows:
-        r['first_visit_fmt'] = fmt(r.get('first_visit'))
-        r['last_visit_fmt'] = fmt(r.get('last_visit'))
 
+def _page_cache_key(totals: dict, limit: int, after: Optional[str], before: Optional[str]):
+    """
+    Clave de la página en visitors_cache, con la versión de los datos de `totals`
+
+    Los totales y las páginas caducan por separado y las escrituras de otros
+    workers no invalidan esta caché: sin la versión en la clave, unos totales
+    recién cargados podían servirse con una página anterior a ellos. Cada
+    visita cambia la versión, así que la página nunca es anterior a los totales.
+    """
+    return 'page', data_version_etag(totals), limit, after, before
+
+
+def _visitors_version(totals: dict):
+    etag = data_version_etag(totals) + VISITORS_TEMPLATE_VERSION
+    return etag, last_modified(totals)
+
+
+def _visitors_page_args():
+    limit = request.args.get('limit', VISITORS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, VISITORS_MAX_PAGE_SIZE))
+    after, before = request.args.get('after'), request.args.get('before')
+    try:
+        # Validar los cursores antes de consultar nada (ni responder 304)
+        for cursor in (after, before):
+            if cursor:
+                decode_cursor(cursor)
+    except ValueError:
+        abort(400, description="Cursor de paginación inválido")
+    return limit, after, before
+
+
+def _render_visitors(page: dict, totals: dict, limit: int, stale: bool = False):
+    # La plantilla formatea las fechas (texto ISO 8601 de la BD)
     return render_template(
         "visitors.html",
-        visitors=rows,
-        total_unique=total_unique,
-        total_visits=total_visits
+        visitors=page['rows'],
+        total_unique=totals['total_unique'],
+        total_visits=totals['total_visits'],
+        limit=limit,
+        page=page,
+        stale=stale
+    )
+
+
+def _degraded_visitors(error: Exception, limit: int, after: Optional[str],
+                       before: Optional[str]):
+    """Última página conocida (o vacía) cuando la BD falla; sin ETag ni caché"""
+    if isinstance(error, CircuitOpenError):
+        log.warning("⚠️ Circuito de BD abierto, /visitors en modo degradado")
+    else:
+        log.error("❌ Error consultando visitors: %s", error)
+    page = last_listing.get(('page', limit, after, before))
+    totals = last_listing.get('totals')
+    if page is None or totals is None:
+        return _render_visitors(EMPTY_PAGE, EMPTY_TOTALS, limit)
+    return _render_visitors(page, totals, limit, stale=True)
+
+
+def _stream_visitors(limit: int, after: Optional[str], before: Optional[str], totals: dict):
+    """Render en streaming: cabecera y totales primero, filas según llegan de la BD"""
+    page = StreamedPage(visitor_repository, limit, after=after, before=before,
+                        chunk_size=VISITORS_STREAM_CHUNK_SIZE)
+    body = stream_template(
+        "visitors.html",
+        visitors=page,
+        total_unique=totals['total_unique'],
+        total_visits=totals['total_visits'],
+        limit=limit,
+        page=page
     )
+    return Response(_buffered(body, STREAM_BUFFER_SIZE), content_type='text/html; charset=utf-8')
+
+
+def _buffered(chunks, size: int):
+    # Jinja produce un fragmento por nodo; se agrupan para no enviar uno por celda
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+@app.get("/visitors/export")
+def export_visitors_route():
+    """
+    Descarga la tabla completa de visitantes (?format=csv|ndjson)
+    en streaming, leyendo de la BD por bloques con paginación keyset
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400, description="Formato no soportado (csv, ndjson)")
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    try:
+        body = export_visitors(visitor_repository, fmt, VISITORS_EXPORT_CHUNK_SIZE)
+    except Exception as e:
+        log.error("❌ Error exportando visitors: %s", e, extra={'format': fmt})
+        abort(503, description="Visitantes no disponibles")
+    return Response(stream_with_context(body), content_type=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=visitors.{extension}'
+    })
+
+
+@app.get("/visitors/stats")
+def visitors_stats():
+    """
+    Estadísticas en JSON desde el rollup por hora (?hours=, ?days=, ?top=):
+    visitas por hora y por día, nuevos frente a recurrentes y el top por
+    visit_count
+    """
+    hours = _bounded_arg('hours', DEFAULT_HOURS, MAX_HOURS)
+    days = _bounded_arg('days', DEFAULT_DAYS, MAX_DAYS)
+    top = _bounded_arg('top', DEFAULT_TOP, MAX_TOP)
+    try:
+        stats = visitors_cache.get_or_load(
+            ('stats', hours, days, top),
+            lambda: build_stats(visitor_repository, hours, days, top))
+    except Exception as e:
+        log.error("❌ Error consultando estadísticas de visitors: %s", e)
+        return json_response({'error': "Estadísticas no disponibles"}, 503)
+    return json_response(stats)
+
+
+def _bounded_arg(name: str, default: int, maximum: int) -> int:
+    return max(1, min(request.args.get(name, default, type=int), maximum))
+
+
+@app.get("/api/visitors")
+def api_visitors():
+    """
+    Listado JSON: misma consulta, orden y cursores que /visitors (?limit=,
+    ?after=, ?before=), ?fields= y ETag/304 con la versión de los datos
+    """
+    try:
+        limit, after, before = _visitors_page_args()
+        fields = parse_fields(request.args.get('fields'))
+    except HTTPException as e:
+        return json_response({'error': e.description}, e.code)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    try:
+        totals = visitors_cache.get_or_load('totals', visitor_repository.totals)
+        etag, modified = data_version_etag(totals), last_modified(totals)
+        unchanged = not_modified(etag, modified)
+        if unchanged is not None:
+            return unchanged
+        # El cursor necesita id y last_visit aunque no se hayan pedido
+        columns = query_columns(fields, ('id', 'last_visit'))
+        page = visitors_cache.get_or_load(
+            ('api', limit, after, before, columns),
+            lambda: fetch_page(visitor_repository, limit, after=after, before=before,
+                               columns=columns))
+    except Exception as e:
+        log.error("❌ Error consultando visitors para la API: %s", e)
+        return json_response({'error': "Visitantes no disponibles"}, 503)
+
+    return set_validators(json_response({
+        'visitors': project(page['rows'], fields),
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'total_unique': totals['total_unique'],
+        'total_visits': totals['total_visits'],
+    }), etag, modified)
+
+
+@app.get("/api/visitors/<name>")
+def api_visitor(name: str):
+    """Un visitante en JSON, buscado por su nombre normalizado (?fields=, ETag/304)"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    try:
+        # id y visit_count forman el ETag; last_visit, Last-Modified
+        visitor = visitor_repository.get_visitor(
+            normalize_name(name), query_columns(fields, ('id', 'visit_count', 'last_visit')))
+    except Exception as e:
+        log.error("❌ Error consultando el visitante para la API: %s", e)
+        return json_response({'error': "Visitantes no disponibles"}, 503)
+    if visitor is None:
+        return json_response({'error': "Visitante no encontrado"}, 404)
+
+    etag, modified = visitor_etag(visitor), last_modified(visitor)
+    unchanged = not_modified(etag, modified)
+    if unchanged is not None:
+        return unchanged
+    return set_validators(json_response(project([visitor], fields)[0]), etag, modified)
+
+
+if SERVING_MODE == 'async':
+    # Las consultas de todas las peticiones comparten un loop y un cliente async
+    db_loop = DatabaseLoop()
+    async_visitor_repository = create_async_visitor_repository(visitor_repository)
+    app.view_functions['hello'] = hello_async
+    app.view_functions['list_visitors'] = list_visitors_async
 
 if __name__ == '__main__':
    app.run(port=80)
@@ -0,0 +1,147 @@
+"""
+Logging estructurado y sin bloqueo de la aplicación
+
+Los registros se encolan con un QueueHandler y un hilo de fondo
+(QueueListener) los escribe en stdout, así una petición nunca espera a que
+el stream se libere. Variables de entorno:
+  - LOG_LEVEL: nivel mínimo (INFO por defecto; DEBUG muestra los registros exitosos)
+  - LOG_FORMAT: json (por defecto) o text
+  - LOG_REQUEST_SAMPLE_RATE: fracción de líneas por petición que se emiten
+    (0 por defecto: desactivadas; las advertencias y errores nunca se muestrean)
+  - LOG_QUEUE_SIZE: registros en espera antes de descartar (10000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+# Logger de las líneas por petición (muestreadas)
+REQUEST_LOGGER = 'app.request'
+
+# Atributos propios de LogRecord; el resto llega por `extra` y se serializa
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'taskName'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_config: dict = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos pasados en `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar una fracción de los registros bajo WARNING"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler con cola acotada: si el escritor no da abasto los registros
+    se descartan (y se cuentan) en lugar de bloquear la petición
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # El formateo ocurre en el hilo de fondo; aquí solo se resuelven los
+        # argumentos para que el registro no retenga objetos de la petición
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: str = None, fmt: str = None, sample_rate: float = None,
+                      stream=None) -> DroppingQueueHandler:
+    """
+    Instala el handler con cola en el logger `app` y arranca el escritor
+
+    Llamarla de nuevo reemplaza la configuración anterior.
+
+    Returns:
+        DroppingQueueHandler: Handler instalado (expone `dropped`)
+    """
+    global _listener, _config
+    _config = {'level': level, 'fmt': fmt, 'sample_rate': sample_rate, 'stream': stream}
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    fmt = fmt or os.getenv('LOG_FORMAT', 'json')
+    if sample_rate is None:
+        sample_rate = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', '0'))
+
+    if _listener is not None:
+        _listener.stop()
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    handler = DroppingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', '10000'))))
+    _listener = logging.handlers.QueueListener(handler.queue, writer)
+    _listener.start()
+
+    logger = logging.getLogger('app')
+    logger.handlers = [handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    # Con muestreo 0 el nivel corta antes de crear el registro
+    request_logger = logging.getLogger(REQUEST_LOGGER)
+    request_logger.setLevel(logging.WARNING if sample_rate <= 0 else logging.NOTSET)
+    request_logger.filters = [SamplingFilter(sample_rate)]
+    return handler
+
+
+def stop_logging() -> None:
+    """Vacía la cola pendiente y detiene el escritor de fondo"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork() -> None:
+    # El hilo escritor no sobrevive a fork (gunicorn --preload): cada worker
+    # arranca el suyo con una cola nueva
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging(**_config)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(stop_logging)
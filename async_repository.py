@@ -0,0 +1,125 @@
+"""
+Acceso asíncrono a visitantes para el modo de servicio async (APP_SERVING_MODE=async)
+
+Las vistas async de Flask se ejecutan en un event loop propio de cada petición.
+Las llamadas a la base de datos se envían a un único loop de larga vida
+(DatabaseLoop) en un hilo dedicado, donde vive el cliente async de Supabase:
+así un worker multiplexa muchas consultas en curso sobre el mismo pool de
+conexiones en lugar de fijar un hilo por cada viaje HTTP.
+"""
+import asyncio
+import threading
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from circuit_breaker import GuardedRepository
+from metrics import time_db_operation
+from visitor_repository import (LISTING_COLUMNS, PageKey, SupabaseVisitorRepository,
+                                VisitorRepository, clean_name, keyset_filter,
+                                normalize_name)
+
+
+class DatabaseLoop:
+    """Event loop en un hilo dedicado para las corrutinas de base de datos"""
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='database-loop', daemon=True)
+        self._thread.start()
+
+    def run(self, coro: Awaitable) -> Awaitable:
+        """Ejecuta `coro` en el loop de BD; retorna un awaitable para el loop actual"""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def call(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Ejecuta `coro` en el loop de BD y bloquea el hilo actual hasta el resultado"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def close(self) -> None:
+        """Detiene el loop y su hilo"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class AsyncSupabaseVisitorRepository:
+    """Versión asíncrona de SupabaseVisitorRepository (mismas consultas)"""
+
+    def __init__(self, client_factory: Callable[[], Awaitable]):
+        self._client_factory = client_factory
+
+    async def register(self, name: str, ip_address: str = None) -> Optional[dict]:
+        client = await self._client_factory()
+        with time_db_operation('register'):
+            response = await client.rpc('register_visitor', {
+                'p_name': clean_name(name),
+                'p_name_key': normalize_name(name),
+                'p_ip_address': ip_address
+            }).execute()
+        return response.data[0] if response.data else None
+
+    async def list_by_last_visit(self, limit: int, after: Optional[PageKey] = None,
+                                 before: Optional[PageKey] = None,
+                                 columns: Sequence[str] = LISTING_COLUMNS) -> List[dict]:
+        client = await self._client_factory()
+        query = client.table('visitors').select(', '.join(columns))
+        if after:
+            query = query.or_(keyset_filter('lt', after))
+        elif before:
+            query = query.or_(keyset_filter('gt', before))
+
+        descending = before is None
+        with time_db_operation('list'):
+            response = await query \
+                .order('last_visit', desc=descending) \
+                .order('id', desc=descending) \
+                .limit(limit) \
+                .execute()
+        rows = response.data or []
+        return rows if descending else rows[::-1]
+
+    async def totals(self) -> dict:
+        client = await self._client_factory()
+        with time_db_operation('totals'):
+            response = await client.rpc('visitor_totals').execute()
+        row = response.data[0] if response.data else {}
+        return {
+            'total_unique': int(row.get('total_unique') or 0),
+            'total_visits': int(row.get('total_visits') or 0),
+            'last_visit': row.get('last_visit')
+        }
+
+
+class ThreadedAsyncVisitorRepository:
+    """Adapta un VisitorRepository síncrono (memory, sqlite) a la interfaz async"""
+
+    def __init__(self, repository: VisitorRepository):
+        self.repository = repository
+
+    async def register(self, name: str, ip_address: str = None) -> Optional[dict]:
+        return await asyncio.to_thread(self.repository.register, name, ip_address)
+
+    async def list_by_last_visit(self, limit: int, after: Optional[PageKey] = None,
+                                 before: Optional[PageKey] = None,
+                                 columns: Sequence[str] = LISTING_COLUMNS) -> List[dict]:
+        return await asyncio.to_thread(self.repository.list_by_last_visit,
+                                       limit, after=after, before=before, columns=columns)
+
+    async def totals(self) -> dict:
+        return await asyncio.to_thread(self.repository.totals)
+
+
+def create_async_visitor_repository(repository: VisitorRepository):
+    """
+    Crea la variante async del repositorio configurado
+
+    Supabase usa su cliente async nativo; los backends locales se ejecutan
+    en el pool de hilos del loop de BD.
+    """
+    if isinstance(repository, GuardedRepository):
+        # Las llamadas async comparten el circuito de las sync
+        return GuardedRepository(create_async_visitor_repository(repository.repository),
+                                 repository.breaker)
+    if isinstance(repository, SupabaseVisitorRepository):
+        from database import get_async_supabase_client
+        return AsyncSupabaseVisitorRepository(get_async_supabase_client)
+    return ThreadedAsyncVisitorRepository(repository)
@@ -0,0 +1,65 @@
+"""
+Cálculo definitivo de name_key en Supabase tras migrations/006_visitor_name_key.sql
+
+La migración solo puede calcular en SQL la clave de los nombres ASCII; el
+resto queda con una clave provisional. Este script recorre la tabla por id,
+calcula la clave con normalize_name (la misma función con la que la
+aplicación registra las visitas) y envía las que no coinciden a la función
+rekey_visitors, que las corrige y fusiona los visitantes que pasan a
+compartir clave.
+
+Ejecutar con: python backfill_name_key.py
+Se puede repetir: una segunda ejecución no encuentra claves que corregir.
+"""
+from typing import Iterator, List
+
+from visitor_repository import normalize_name
+
+# Filas leídas (y como máximo claves corregidas) por viaje a la BD
+PAGE_SIZE = 1000
+
+
+def pending_keys(client, page_size: int = PAGE_SIZE) -> Iterator[List[dict]]:
+    """
+    Bloques de {id, name_key} cuya clave guardada no es normalize_name(name)
+
+    Args:
+        client: Cliente de Supabase
+        page_size: Filas por consulta (paginación keyset por id)
+    """
+    last_id = 0
+    while True:
+        rows = (client.table('visitors').select('id, name, name_key')
+                .gt('id', last_id).order('id').limit(page_size).execute().data)
+        changes = []
+        for row in rows:
+            key = normalize_name(row['name'])
+            if key != row['name_key']:
+                changes.append({'id': row['id'], 'name_key': key})
+        if changes:
+            yield changes
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+
+def backfill_name_keys(client, page_size: int = PAGE_SIZE) -> dict:
+    """
+    Corrige todas las claves que no coinciden con normalize_name
+
+    Returns:
+        dict: Claves corregidas ('updated') y filas fusionadas ('merged')
+    """
+    updated = merged = 0
+    for changes in pending_keys(client, page_size):
+        merged += client.rpc('rekey_visitors', {'p_keys': changes}).execute().data or 0
+        updated += len(changes)
+    return {'updated': updated, 'merged': merged}
+
+
+if __name__ == '__main__':  # pragma: no cover
+    from database import get_supabase_client
+
+    result = backfill_name_keys(get_supabase_client())
+    print(f"✅ name_key: {result['updated']} claves corregidas, "
+          f"{result['merged']} visitantes fusionados")
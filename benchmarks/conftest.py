@@ -0,0 +1,75 @@
+"""
+Fixtures de los benchmarks: repositorios locales sembrados con N visitantes
+
+Los tamaños 10 y 10k siempre se ejecutan; 1M solo con BENCH_LARGE=1 (la
+siembra tarda y ocupa varios cientos de MB). Las tablas se reutilizan
+durante toda la sesión.
+"""
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from visitor_repository import InMemoryVisitorRepository, SQLiteVisitorRepository
+
+SIZES = [10, 10_000] + ([1_000_000] if os.getenv('BENCH_LARGE') == '1' else [])
+SEED_BATCH = 10_000
+
+
+def seed(repository, rows: int):
+    """Siembra `rows` visitantes con últimas visitas distintas, por lotes"""
+    start = datetime(2025, 1, 1)
+    for offset in range(0, rows, SEED_BATCH):
+        repository.register_batch([
+            {'name': f'visitante-{i}', 'increment': 1 + i % 7,
+             'first_visit': start.isoformat(),
+             'last_visit': (start + timedelta(seconds=i)).isoformat(),
+             'ip_address': '10.0.0.1'}
+            for i in range(offset, min(offset + SEED_BATCH, rows))
+        ])
+    return repository
+
+
+@pytest.fixture(scope='session')
+def seeded_repositories(tmp_path_factory):
+    """Fábrica con caché: (backend, filas) -> repositorio sembrado"""
+    repositories = {}
+
+    def get(backend: str, rows: int):
+        key = (backend, rows)
+        if key not in repositories:
+            if backend == 'memory':
+                repository = InMemoryVisitorRepository()
+            else:
+                path = tmp_path_factory.mktemp('bench') / f'visitors-{rows}.db'
+                repository = SQLiteVisitorRepository(str(path))
+            repositories[key] = seed(repository, rows)
+        return repositories[key]
+
+    return get
+
+
+@pytest.fixture
+def app_client():
+    """Cliente de prueba de la aplicación (sin el repositorio de Supabase)"""
+    from app import app
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def use_repository():
+    """Instala un repositorio en la aplicación durante la prueba"""
+    patches = []
+
+    def install(repository):
+        p = patch('app.visitor_repository', repository)
+        p.start()
+        patches.append(p)
+        return repository
+
+    yield install
+    for p in patches:
+        p.stop()
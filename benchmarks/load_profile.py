@@ -0,0 +1,195 @@
+"""
+Perfil de carga concurrente con percentiles p50/p95/p99 y comparación con una línea base
+
+Sin --url la aplicación se ejecuta en proceso (un cliente de prueba por hilo)
+sobre un repositorio local sembrado: mide el costo de la aplicación sin red.
+Con --url se ataca un servidor real (p. ej. gunicorn con VISITOR_BACKEND=sqlite).
+
+Ejemplos:
+    python -m benchmarks.load_profile --rows 10000 --save benchmarks/baseline.json
+    python -m benchmarks.load_profile --rows 10000 --compare benchmarks/baseline.json
+    python -m benchmarks.load_profile --url http://127.0.0.1:8000 --duration 30
+
+Con --compare el proceso termina con código 1 si el p95 o el throughput de
+alguna ruta empeora más que --tolerance respecto de la línea base.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+# (método, ruta, peso): mezcla de tráfico parecida a la de producción
+PROFILE = [
+    ('GET', '/', 30),
+    ('POST', '/hello', 40),
+    ('GET', '/visitors', 25),
+    ('POST', '/reset', 5),
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, int(round(p / 100 * len(samples) + 0.5)) - 1))
+    return samples[rank]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> dict:
+    """Resumen por ruta: peticiones, errores, throughput y percentiles (ms)"""
+    routes = {}
+    for route, samples in sorted(latencies.items()):
+        samples.sort()
+        routes[route] = {
+            'requests': len(samples),
+            'errors': errors.get(route, 0),
+            'rps': round(len(samples) / elapsed, 1),
+            **{f'p{p}_ms': round(percentile(samples, p) * 1000, 3) for p in PERCENTILES},
+        }
+    return routes
+
+
+def in_process_requester(rows: int) -> Callable[[], Callable[[str, str, dict], int]]:
+    """Fábrica de clientes de prueba sobre un repositorio SQLite sembrado"""
+    import atexit
+    import shutil
+    import tempfile
+    from unittest.mock import patch
+
+    from benchmarks.conftest import seed
+    from visitor_repository import SQLiteVisitorRepository
+
+    directory = tempfile.mkdtemp(prefix='bench-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    path = f'{directory}/visitors.db'
+    repository = seed(SQLiteVisitorRepository(path), rows)
+    patch('app.visitor_repository', repository).start()
+    from app import app
+
+    def factory():
+        client = app.test_client()
+        return lambda method, route, data: client.open(route, method=method, data=data).status_code
+    return factory
+
+
+def http_requester(base_url: str) -> Callable[[], Callable[[str, str, dict], int]]:
+    """Fábrica de clientes HTTP contra un servidor en ejecución"""
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def factory():
+        opener = urllib.request.build_opener(NoRedirect)
+
+        def request(method, route, data):
+            body = urllib.parse.urlencode(data).encode() if data else None
+            req = urllib.request.Request(base_url.rstrip('/') + route, data=body, method=method)
+            try:
+                with opener.open(req, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return request
+    return factory
+
+
+def run(factory, concurrency: int, duration: float, names: int) -> dict:
+    """Ejecuta el perfil con `concurrency` hilos durante `duration` segundos"""
+    routes = [(m, r) for m, r, w in PROFILE for _ in range(w)]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        send = factory()
+        local = defaultdict(list)
+        local_errors = defaultdict(int)
+        while time.perf_counter() < deadline:
+            method, route = rng.choice(routes)
+            data = {'name': f'visitante-{rng.randrange(names)}'} if route == '/hello' else None
+            start = time.perf_counter()
+            status = send(method, route, data)
+            local[f'{method} {route}'].append(time.perf_counter() - start)
+            if status >= 400:
+                local_errors[f'{method} {route}'] += 1
+        with lock:
+            for key, samples in local.items():
+                latencies[key].extend(samples)
+            for key, count in local_errors.items():
+                errors[key] += count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Rutas cuyo p95 o throughput empeoró más que `tolerance` (fracción)"""
+    regressions = []
+    for route, base in baseline['routes'].items():
+        now = current['routes'].get(route)
+        if now is None:
+            continue
+        if now['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']} -> {now['p95_ms']} ms")
+        if now['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{route}: rps {base['rps']} -> {now['rps']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', help='Servidor a atacar (por defecto, la app en proceso)')
+    parser.add_argument('--rows', type=int, default=10_000, help='Filas sembradas (en proceso)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos de carga')
+    parser.add_argument('--save', help='Guardar el resultado como línea base JSON')
+    parser.add_argument('--compare', help='Línea base JSON contra la que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    factory = http_requester(args.url) if args.url else in_process_requester(args.rows)
+    result = {
+        'target': args.url or 'in-process',
+        'rows': None if args.url else args.rows,
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'routes': run(factory, args.concurrency, args.duration, max(1, min(args.rows, 1000))),
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for key in ('target', 'rows', 'concurrency'):
+            if baseline.get(key) != result[key]:
+                print(f'⚠️ {key} distinto de la línea base: {baseline.get(key)} vs {result[key]}',
+                      file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f'REGRESIÓN {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
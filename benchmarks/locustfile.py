@@ -0,0 +1,36 @@
+"""
+Escenario de Locust para pruebas de carga contra un servidor en ejecución
+
+    pip install -r benchmarks/requirements.txt
+    VISITOR_BACKEND=sqlite gunicorn -w 4 app:app
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 \\
+           --headless -u 50 -r 10 -t 1m --csv bench
+
+Los pesos de las tareas siguen la mezcla de tráfico de load_profile.PROFILE.
+"""
+import random
+
+from locust import HttpUser, between, task
+
+NAMES = 1000
+
+
+class Visitor(HttpUser):
+    wait_time = between(0.1, 0.5)
+
+    @task(30)
+    def index(self):
+        self.client.get('/')
+
+    @task(40)
+    def hello(self):
+        self.client.post('/hello', data={'name': f'visitante-{random.randrange(NAMES)}'})
+
+    @task(25)
+    def visitors(self):
+        self.client.get('/visitors')
+
+    @task(5)
+    def reset(self):
+        # /reset redirige a /: no se sigue para medir solo la ruta
+        self.client.post('/reset', allow_redirects=False)
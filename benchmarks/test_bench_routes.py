@@ -0,0 +1,66 @@
+"""
+Micro-benchmarks de las rutas y del registro de visitantes (pytest-benchmark)
+
+Ejecutar:
+    pytest benchmarks/ --benchmark-only
+    pytest benchmarks/ --benchmark-only --benchmark-compare   # contra la última corrida guardada
+"""
+import itertools
+
+import pytest
+
+from benchmarks.conftest import SIZES
+
+pytest.importorskip('pytest_benchmark')
+
+CASES = [(backend, n) for backend in ('memory', 'sqlite') for n in SIZES]
+
+
+@pytest.mark.parametrize('backend,rows', CASES)
+def test_register_visitor(benchmark, seeded_repositories, use_repository, backend, rows):
+    """Registro de un visitante existente (upsert) con N filas en la tabla"""
+    from app import register_visitor
+    use_repository(seeded_repositories(backend, rows))
+    names = itertools.cycle(f'visitante-{i}' for i in range(min(rows, 1000)))
+
+    result = benchmark(lambda: register_visitor(next(names), '10.0.0.2'))
+    assert result is not None
+
+
+@pytest.mark.parametrize('backend,rows', CASES)
+def test_list_visitors(benchmark, seeded_repositories, use_repository, app_client, backend, rows):
+    """GET /visitors (primera página de 50, totales y render) con N filas"""
+    use_repository(seeded_repositories(backend, rows))
+
+    response = benchmark(lambda: app_client.get('/visitors'))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('backend,rows', CASES)
+def test_list_visitors_deep_page(benchmark, seeded_repositories, use_repository, app_client,
+                                 backend, rows):
+    """GET /visitors con cursor a mitad de tabla: el keyset no depende de la profundidad"""
+    from pagination import encode_cursor
+    repository = use_repository(seeded_repositories(backend, rows))
+    middle = repository.list_by_last_visit(rows // 2 + 1)[-1]
+    url = f'/visitors?after={encode_cursor(middle)}'
+
+    response = benchmark(lambda: app_client.get(url))
+    assert response.status_code == 200
+
+
+def test_index(benchmark, app_client):
+    """GET / (contador de visitas y render)"""
+    assert benchmark(lambda: app_client.get('/')).status_code == 200
+
+
+def test_hello(benchmark, seeded_repositories, use_repository, app_client):
+    """POST /hello de un visitante existente"""
+    use_repository(seeded_repositories('memory', 10))
+    response = benchmark(lambda: app_client.post('/hello', data={'name': 'visitante-1'}))
+    assert response.status_code == 200
+
+
+def test_reset(benchmark, app_client):
+    """POST /reset"""
+    assert benchmark(lambda: app_client.post('/reset')).status_code == 302
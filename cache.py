@@ -0,0 +1,176 @@
+"""
+Caché TTL de lectura (read-through) con invalidación explícita
+
+Pensada para vistas de administración como /visitors, que toleran unos
+segundos de desactualización. Las consultas concurrentes de una misma clave
+ausente se agrupan (single-flight): solo una llega a la base de datos y el
+resto espera su resultado.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from visitor_repository import normalize_name
+
+
+class _InFlight:
+    """Carga en curso de una clave; los demás hilos esperan su resultado"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Caché acotada con expiración por tiempo y carga única por clave
+
+    Args:
+        ttl: Segundos de validez de cada entrada (0 desactiva el almacenamiento)
+        maxsize: Máximo de entradas; se descarta la menos usada recientemente
+        clock: Reloj monotónico (inyectable en pruebas)
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 256,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        # Se incrementa al invalidar; una carga iniciada antes no se guarda
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Retorna el valor vigente de `key` o lo carga con `loader`
+
+        Raises:
+            Exception: La misma que lance `loader` (también a los hilos en espera)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+                generation = self._generation
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and self.ttl > 0 and generation == self._generation:
+                    self._store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self) -> None:
+        """Descarta todas las entradas (llamar tras cada escritura)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """Retorna tamaño actual, aciertos y fallos"""
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class LastValueCache:
+    """
+    Último valor obtenido por clave, sin expiración ni invalidación
+
+    Respaldo para el modo degradado: si la base de datos no responde se sirve
+    la última versión conocida en lugar de una página vacía.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Any:
+        """Retorna el último valor de `key`, o None si nunca se obtuvo"""
+        with self._lock:
+            return self._entries.get(key)
+
+
+class VisitorLRU:
+    """
+    Últimas filas conocidas de los visitantes más activos, por name_key
+
+    Guarda lo que devolvió la base de datos en cada escritura (id, nombre,
+    visit_count, first_visit, IP), así que se mantiene coherente sin
+    consultas propias. Las colas write-behind y de spool numeran con ella
+    las visitas que todavía no llegaron a la BD.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """Retorna la fila conocida de `key` (name_key), o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def update(self, row: dict) -> None:
+        """Guarda la fila devuelta por la base de datos"""
+        key = row.get('name_key') or normalize_name(row['name'])
+        entry = {'id': row.get('id'), 'name': row['name'], 'visit_count': row['visit_count'],
+                 'first_visit': row.get('first_visit'), 'ip_address': row.get('ip_address')}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Retorna tamaño, aciertos, fallos y tasa de aciertos"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,222 @@
+"""
+Circuit breaker para la capa de base de datos (opcional: DB_CIRCUIT_BREAKER=1)
+
+Cuando Supabase está caído o lento, cada petición esperaba el timeout del
+cliente antes de fallar. El circuito cuenta los fallos (y las llamadas más
+lentas que DB_BREAKER_SLOW_CALL_MS) en una ventana deslizante; si la tasa de
+error supera el umbral se abre y las llamadas fallan al instante con
+CircuitOpenError. Pasado DB_BREAKER_OPEN_SECONDS deja pasar unas pocas
+llamadas de prueba (semiabierto): si salen bien se cierra, si no vuelve a
+abrirse.
+
+Variables de entorno:
+  - DB_CIRCUIT_BREAKER: 1 para activarlo (desactivado por defecto)
+  - DB_BREAKER_FAILURE_RATE: tasa de error que abre el circuito (0.5)
+  - DB_BREAKER_MIN_CALLS: llamadas mínimas en la ventana para evaluarla (10)
+  - DB_BREAKER_WINDOW_SECONDS: duración de la ventana deslizante (30)
+  - DB_BREAKER_OPEN_SECONDS: tiempo abierto antes de probar de nuevo (15)
+  - DB_BREAKER_HALF_OPEN_CALLS: llamadas de prueba en semiabierto (1)
+  - DB_BREAKER_SLOW_CALL_MS: llamadas más lentas cuentan como fallo (0 = no)
+"""
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Valor numérico del estado para /metrics
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """La llamada se rechazó sin intentarla porque el circuito está abierto"""
+
+
+class CircuitBreaker:
+    """
+    Circuito con ventana deslizante de resultados y prueba en semiabierto
+
+    Args:
+        failure_rate: Fracción de fallos en la ventana que abre el circuito
+        min_calls: Llamadas mínimas en la ventana antes de evaluar la tasa
+        window: Segundos que cuenta cada resultado en la ventana
+        open_timeout: Segundos abierto antes de pasar a semiabierto
+        half_open_calls: Llamadas de prueba concurrentes en semiabierto
+        slow_call_ms: Duración a partir de la cual una llamada es un fallo (0 = nunca)
+        clock: Reloj monotónico (inyectable en pruebas)
+    """
+
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 10, window: float = 30.0,
+                 open_timeout: float = 15.0, half_open_calls: int = 1,
+                 slow_call_ms: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.slow_call = slow_call_ms / 1000
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (instante, fallo) de las llamadas recientes, en orden
+        self._results: "deque[tuple]" = deque()
+        self._failures = 0
+
+        self.opened = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['CircuitBreaker']:
+        """Circuito configurado por variables de entorno, o None si está desactivado"""
+        if os.getenv('DB_CIRCUIT_BREAKER', '0') != '1':
+            return None
+        return cls(
+            failure_rate=float(os.getenv('DB_BREAKER_FAILURE_RATE', '0.5')),
+            min_calls=int(os.getenv('DB_BREAKER_MIN_CALLS', '10')),
+            window=float(os.getenv('DB_BREAKER_WINDOW_SECONDS', '30')),
+            open_timeout=float(os.getenv('DB_BREAKER_OPEN_SECONDS', '15')),
+            half_open_calls=int(os.getenv('DB_BREAKER_HALF_OPEN_CALLS', '1')),
+            slow_call_ms=float(os.getenv('DB_BREAKER_SLOW_CALL_MS', '0')),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def available(self) -> bool:
+        """True si una llamada se intentaría ahora (no reserva la prueba)"""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN
+                                       and self._probes < self.half_open_calls)
+
+    def acquire(self) -> None:
+        """
+        Autoriza una llamada (en semiabierto ocupa una de las pruebas)
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o no quedan pruebas
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self.rejected += 1
+        raise CircuitOpenError('Base de datos no disponible (circuito abierto)')
+
+    def record(self, elapsed: float, error: bool) -> None:
+        """Registra el resultado de una llamada autorizada con acquire()"""
+        failed = error or (self.slow_call > 0 and elapsed >= self.slow_call)
+        now = self._clock()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failed:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+            if self._state == OPEN:
+                # Llamada que empezó antes de abrirse el circuito
+                return
+
+            self._results.append((now, failed))
+            self._failures += failed
+            self._expire(now)
+            if (failed and len(self._results) >= self.min_calls
+                    and self._failures / len(self._results) >= self.failure_rate):
+                self._open(now)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta fn a través del circuito"""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(time.perf_counter() - start, error=True)
+            raise
+        self.record(time.perf_counter() - start, error=False)
+        return result
+
+    async def call_async(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Igual que call, esperando la corrutina que retorna fn"""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record(time.perf_counter() - start, error=True)
+            raise
+        self.record(time.perf_counter() - start, error=False)
+        return result
+
+    def stats(self) -> dict:
+        """Retorna estado, resultados en la ventana, aperturas y rechazos"""
+        with self._lock:
+            self._expire(self._clock())
+            return {'state': self._current_state(), 'calls': len(self._results),
+                    'failures': self._failures, 'opened': self.opened,
+                    'rejected': self.rejected}
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._results.clear()
+        self._failures = 0
+        self.opened += 1
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._results.clear()
+        self._failures = 0
+
+    def _expire(self, now: float) -> None:
+        while self._results and now - self._results[0][0] > self.window:
+            _, failed = self._results.popleft()
+            self._failures -= failed
+
+
+class GuardedRepository:
+    """
+    Repositorio cuyos métodos públicos pasan por un circuito
+
+    Envuelve tanto repositorios sync como async (los métodos corrutina se
+    envuelven con call_async).
+    """
+
+    def __init__(self, repository, breaker: CircuitBreaker):
+        self.repository = repository
+        self.breaker = breaker
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.repository, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        if inspect.iscoroutinefunction(attr):
+            async def guarded_async(*args, **kwargs):
+                return await self.breaker.call_async(attr, *args, **kwargs)
+            return guarded_async
+
+        def guarded(*args, **kwargs):
+            return self.breaker.call(attr, *args, **kwargs)
+        return guarded
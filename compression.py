@@ -0,0 +1,117 @@
+"""
+Compresión gzip/brotli de respuestas (opcional: RESPONSE_COMPRESSION=1)
+
+La codificación se negocia con Accept-Encoding (brotli primero si está
+instalado). Las respuestas completas solo se comprimen desde
+COMPRESSION_MIN_SIZE bytes. Las respuestas en streaming (/visitors en modo
+stream, /visitors/export) se comprimen bloque a bloque: cada fragmento se
+vacía al cliente en cuanto se produce, sin esperar al final.
+
+Variables de entorno:
+  - RESPONSE_COMPRESSION: 1 para activarla (desactivada por defecto)
+  - COMPRESSION_MIN_SIZE: tamaño mínimo en bytes (1024)
+  - COMPRESSION_LEVEL: nivel de gzip, 1-9 (6)
+  - COMPRESSION_BROTLI_QUALITY: calidad de brotli, 0-11 (4)
+"""
+import gzip
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+# Tipos que vale la pena comprimir (imágenes y binarios ya van comprimidos)
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'application/json',
+    'application/x-ndjson', 'application/javascript', 'image/svg+xml',
+})
+
+
+def choose_encoding() -> Optional[str]:
+    """Codificación a usar según Accept-Encoding de la petición, o None"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_body(data: bytes, encoding: str, level: int, brotli_quality: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=level)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: int,
+                    brotli_quality: int) -> Iterator[bytes]:
+    """Comprime un iterable de bytes vaciando el compresor tras cada bloque"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        for chunk in chunks:
+            out = compressor.process(chunk) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield compressor.flush()
+
+
+def init_app(app: Flask, enabled: bool = None, min_size: int = None, level: int = None,
+             brotli_quality: int = None) -> bool:
+    """
+    Instala la compresión en after_request si está activada
+
+    Returns:
+        bool: True si quedó instalada
+    """
+    if enabled is None:
+        enabled = os.getenv('RESPONSE_COMPRESSION', '0') == '1'
+    if not enabled:
+        return False
+    min_size = min_size if min_size is not None else int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    level = level if level is not None else int(os.getenv('COMPRESSION_LEVEL', '6'))
+    if brotli_quality is None:
+        brotli_quality = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+    @app.after_request
+    def _compress_response(response: Response) -> Response:
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        encoding = choose_encoding()
+
+        # La respuesta varía según Accept-Encoding aunque esta vez no se comprima
+        response.vary.add('Accept-Encoding')
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.iter_encoded(), encoding,
+                                                level, brotli_quality)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress_body(data, encoding, level, brotli_quality))
+
+        response.headers['Content-Encoding'] = encoding
+        # El cuerpo ya no es idéntico byte a byte: un ETag fuerte pasa a débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return True
@@ -0,0 +1,168 @@
+"""
+Contadores de la aplicación (visitas a / y saludos) con backends intercambiables
+
+Backends disponibles (variable de entorno COUNTER_BACKEND):
+  - local:  en memoria del proceso, seguro entre hilos (por defecto)
+  - shm:    archivo mapeado en memoria compartido por todos los workers de
+            gunicorn en el mismo host (COUNTER_SHM_PATH)
+  - sqlite: tabla en un archivo SQLite en modo WAL (COUNTER_SQLITE_PATH)
+"""
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Contadores que usa la aplicación
+COUNTER_NAMES = ('visits', 'greetings')
+
+
+class CounterBackend(ABC):
+    """Contadores con nombre, incrementables de forma atómica"""
+
+    @abstractmethod
+    def increment(self, name: str) -> int:
+        """Incrementa el contador y retorna el nuevo valor"""
+
+    @abstractmethod
+    def get(self, name: str) -> int:
+        """Retorna el valor actual del contador"""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Pone todos los contadores en cero"""
+
+
+class LocalCounters(CounterBackend):
+    """Contadores en memoria del proceso (cada worker cuenta por separado)"""
+
+    def __init__(self, names: Tuple[str, ...] = COUNTER_NAMES):
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = dict.fromkeys(names, 0)
+
+    def increment(self, name: str) -> int:
+        with self._lock:
+            value = self._values[name] = self._values[name] + 1
+        return value
+
+    def get(self, name: str) -> int:
+        return self._values[name]
+
+    def reset(self) -> None:
+        with self._lock:
+            for name in self._values:
+                self._values[name] = 0
+
+
+class SharedMemoryCounters(CounterBackend):
+    """
+    Contadores en un archivo mapeado en memoria, coherentes entre procesos
+
+    Cada contador ocupa 8 bytes. Las escrituras se serializan con un lock de
+    hilo más un lock POSIX (lockf) sobre el archivo, que excluye a los demás
+    workers aunque hayan heredado el descriptor con fork (--preload).
+    """
+
+    SLOT = struct.Struct('q')
+
+    def __init__(self, path: str, names: Tuple[str, ...] = COUNTER_NAMES):
+        if fcntl is None:  # pragma: no cover - Windows
+            raise RuntimeError("COUNTER_BACKEND=shm requiere un sistema POSIX")
+        self.path = path
+        self._slots = {name: i * self.SLOT.size for i, name in enumerate(names)}
+        size = len(names) * self.SLOT.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str) -> int:
+        offset = self._slots[name]
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                value = self.SLOT.unpack_from(self._map, offset)[0] + 1
+                self.SLOT.pack_into(self._map, offset, value)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return value
+
+    def get(self, name: str) -> int:
+        return self.SLOT.unpack_from(self._map, self._slots[name])[0]
+
+    def reset(self) -> None:
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map[:] = bytes(len(self._map))
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+
+class SQLiteCounters(CounterBackend):
+    """Contadores en una tabla SQLite en modo WAL (una conexión por hilo)"""
+
+    def __init__(self, path: str = 'counters.db'):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def increment(self, name: str) -> int:
+        conn = self._connect()
+        with conn:
+            return conn.execute(
+                'INSERT INTO counters (name, value) VALUES (?, 1) '
+                'ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value',
+                (name,)).fetchone()[0]
+
+    def get(self, name: str) -> int:
+        row = self._connect().execute(
+            'SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def reset(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE counters SET value = 0')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+
+def create_counters(backend: str = None) -> CounterBackend:
+    """
+    Crea los contadores configurados en COUNTER_BACKEND
+
+    Args:
+        backend: Nombre del backend; si es None se lee de COUNTER_BACKEND
+
+    Returns:
+        CounterBackend: Instancia del backend solicitado
+    """
+    backend = backend or os.getenv('COUNTER_BACKEND', 'local')
+    if backend == 'local':
+        return LocalCounters()
+    if backend == 'shm':
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        return SharedMemoryCounters(
+            os.getenv('COUNTER_SHM_PATH', os.path.join(shm_dir, 'python-flask-app-counters')))
+    if backend == 'sqlite':
+        return SQLiteCounters(os.getenv('COUNTER_SQLITE_PATH', 'counters.db'))
+    raise ValueError(f"COUNTER_BACKEND desconocido: {backend}")
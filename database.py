@@ -1,9 +1,20 @@
 """
 Configuración y cliente de Supabase
+
+Los clientes se crean en el primer uso y uno por proceso: importar este
+módulo no construye nada, y cada worker de gunicorn creado con fork (incluso
+con --preload) abre su propio pool de conexiones HTTP en lugar de heredar los
+sockets del proceso padre.
 """
 import os
-from supabase import create_client, Client
+import threading
+from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.utils import SyncClient as SyncSession
+from supabase import AsyncClient, Client
 
 # Cargar variables de entorno
 load_dotenv()
@@ -12,15 +23,91 @@ load_dotenv()
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
-# Validar que las variables de entorno estén configuradas
-if not SUPABASE_URL or not SUPABASE_KEY:  # pragma: no cover
-    raise ValueError(
-        "Las variables de entorno SUPABASE_URL y SUPABASE_KEY son requeridas. "
-        "Por favor, crea un archivo .env basado en .env.example"
-    )
+# Pool HTTP hacia PostgREST (conexiones keep-alive reutilizadas entre peticiones)
+POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '20'))
+POOL_KEEPALIVE = int(os.getenv('SUPABASE_POOL_KEEPALIVE', str(POOL_SIZE)))
+KEEPALIVE_EXPIRY = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', '30'))
+CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', '10'))
+HTTP2 = os.getenv('SUPABASE_HTTP2', '1') == '1'
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+_lock = threading.Lock()
+_supabase: Optional[Client] = None
+_async_supabase: Optional[AsyncClient] = None
+
+
+def _http_options() -> dict:
+    """Parámetros del pool HTTP compartidos por los clientes sync y async"""
+    return {
+        'limits': httpx.Limits(max_connections=POOL_SIZE,
+                               max_keepalive_connections=POOL_KEEPALIVE,
+                               keepalive_expiry=KEEPALIVE_EXPIRY),
+        'timeout': httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        'http2': HTTP2 and HTTP2_AVAILABLE,
+        'follow_redirects': True,
+    }
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """Cliente PostgREST con el pool HTTP configurado"""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return SyncSession(base_url=base_url, headers=headers, verify=verify,
+                           proxy=proxy, **_http_options())
+
+
+class PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    """Cliente PostgREST async con el pool HTTP configurado"""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return httpx.AsyncClient(base_url=base_url, headers=headers, verify=verify,
+                                 proxy=proxy, **_http_options())
+
+
+def _require_credentials() -> None:
+    # Validar que las variables de entorno estén configuradas
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError(
+            "Las variables de entorno SUPABASE_URL y SUPABASE_KEY son requeridas. "
+            "Por favor, crea un archivo .env basado en .env.example"
+        )
+
 
-# Crear cliente de Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def _pooled_postgrest(client_class):
+    """Reemplaza la fábrica de PostgREST del cliente de Supabase por la del pool"""
+    def init_postgrest_client(rest_url, headers, schema, timeout=None,
+                              verify=True, proxy=None):
+        return client_class(rest_url, headers=headers, schema=schema,
+                            verify=verify, proxy=proxy)
+    return staticmethod(init_postgrest_client)
+
+
+class PooledClient(Client):
+    """Cliente de Supabase cuyas consultas usan PooledPostgrestClient"""
+    _init_postgrest_client = _pooled_postgrest(PooledPostgrestClient)
+
+
+class PooledAsyncClient(AsyncClient):
+    """Cliente async de Supabase cuyas consultas usan PooledAsyncPostgrestClient"""
+    _init_postgrest_client = _pooled_postgrest(PooledAsyncPostgrestClient)
+
+
+def _reset_after_fork() -> None:
+    """En el proceso hijo se descartan los clientes (y sockets) del padre"""
+    global _lock, _supabase, _async_supabase
+    _lock = threading.Lock()
+    _supabase = None
+    _async_supabase = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 def test_connection():  # pragma: no cover
@@ -30,7 +117,7 @@ def test_connection():  # pragma: no cover
     try:
         # Intenta hacer una consulta simple a la tabla 'visitors'
         # Si la tabla no existe, esto fallará, lo cual está bien para testing
-        response = supabase.table('visitors').select("*").limit(1).execute()
+        response = get_supabase_client().table('visitors').select("*").limit(1).execute()
         print("✅ Conexión exitosa con Supabase")
         print(f"📊 Respuesta: {response}")
         return True
@@ -41,6 +128,29 @@ def test_connection():  # pragma: no cover
 
 def get_supabase_client() -> Client:
     """
-    Retorna el cliente de Supabase configurado
+    Retorna el cliente de Supabase del proceso, creándolo en el primer uso
+
+    Raises:
+        ValueError: Si faltan SUPABASE_URL o SUPABASE_KEY
+    """
+    global _supabase
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                _require_credentials()
+                _supabase = PooledClient.create(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    Retorna el cliente asíncrono de Supabase configurado
+
+    Sus conexiones quedan ligadas al event loop donde se crea, por eso debe
+    usarse siempre desde el mismo loop (ver async_repository.DatabaseLoop)
     """
-    return supabase
+    global _async_supabase
+    if _async_supabase is None:
+        _require_credentials()
+        _async_supabase = await PooledAsyncClient.create(SUPABASE_URL, SUPABASE_KEY)
+    return _async_supabase
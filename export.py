@@ -0,0 +1,93 @@
+"""
+Exportación en streaming de la tabla de visitantes (CSV / NDJSON)
+
+Las filas se leen por bloques con paginación keyset sobre (last_visit, id) y
+cada bloque se serializa y se envía antes de pedir el siguiente: la memoria
+usada no depende del tamaño de la tabla y el primer byte sale tras la
+primera consulta.
+
+Si la base de datos falla en esa primera consulta la ruta responde 503; si
+falla después, la conexión se corta sin cerrar la respuesta.
+"""
+import csv
+import io
+import json
+import logging
+from itertools import chain
+from typing import Iterable, Iterator, List
+
+from visitor_repository import LISTING_COLUMNS
+
+log = logging.getLogger('app.export')
+
+# Formatos soportados: tipo MIME y extensión del archivo descargado
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def iter_visitor_chunks(repository, chunk_size: int) -> Iterator[List[dict]]:
+    """
+    Recorre todos los visitantes por última visita (desc) en bloques
+
+    Args:
+        repository: VisitorRepository del que leer
+        chunk_size: Filas por consulta
+    """
+    after = None
+    while True:
+        rows = repository.list_by_last_visit(chunk_size, after=after)
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1]['last_visit'], rows[-1]['id'])
+
+
+def csv_chunks(chunks: Iterable[List[dict]]) -> Iterator[str]:
+    """Serializa los bloques como CSV (con cabecera), un fragmento por bloque"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LISTING_COLUMNS)
+    for rows in chunks:
+        writer.writerows([row.get(column) for column in LISTING_COLUMNS] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(chunks: Iterable[List[dict]]) -> Iterator[str]:
+    """Serializa los bloques como NDJSON (un objeto por línea)"""
+    for rows in chunks:
+        yield ''.join(json.dumps({column: row.get(column) for column in LISTING_COLUMNS},
+                                 ensure_ascii=False) + '\n' for row in rows)
+
+
+def export_visitors(repository, fmt: str, chunk_size: int) -> Iterator[str]:
+    """
+    Cuerpo de la exportación en el formato pedido
+
+    El primer bloque se lee antes de devolver el generador: si la base de
+    datos no responde, la excepción sale aquí y la ruta aún puede responder
+    503. Un fallo posterior, con la respuesta ya empezada, se registra y se
+    propaga para cortar la conexión: el cliente ve una transferencia
+    incompleta en lugar de un archivo truncado que parece completo.
+
+    Raises:
+        Exception: El error de la base de datos al leer el primer bloque
+    """
+    chunks = iter_visitor_chunks(repository, chunk_size)
+    first = next(chunks, None)
+    serialize = csv_chunks if fmt == 'csv' else ndjson_chunks
+    return _log_errors(serialize(chain([first] if first else [], chunks)), fmt)
+
+
+def _log_errors(body: Iterator[str], fmt: str) -> Iterator[str]:
+    try:
+        yield from body
+    except Exception as e:
+        log.error("❌ Error exportando visitors: %s", e, extra={'format': fmt})
+        raise
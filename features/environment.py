@@ -9,6 +9,7 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.abspath('.'))
 
 from app import app
+from visitor_repository import SupabaseVisitorRepository
 
 
 def before_all(context):
@@ -17,9 +18,12 @@ def before_all(context):
     context.app.config['TESTING'] = True
     context.client = app.test_client()
     
-    # Mock de Supabase para las pruebas
+    # Mock del cliente de Supabase detrás del repositorio de visitantes
     context.supabase_mock = MagicMock()
-    context.supabase_patcher = patch('app.supabase', context.supabase_mock)
+    context.supabase_patcher = patch(
+        'app.visitor_repository',
+        SupabaseVisitorRepository(context.supabase_mock)
+    )
     context.supabase_patcher.start()
 
 
@@ -29,7 +33,7 @@ def before_scenario(context, _scenario):
     context.supabase_mock.reset_mock()
     
     # Simular base de datos vacía por defecto
-    context.supabase_mock.table().select().eq().execute.return_value = MagicMock(data=[])
+    context.supabase_mock.rpc().execute.return_value = MagicMock(data=[])
     
     # Almacenar datos simulados de la BD
     context.database = {}
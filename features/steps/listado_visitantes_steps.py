@@ -3,21 +3,28 @@ from unittest.mock import MagicMock
 from bs4 import BeautifulSoup
 import re
 
-# Simula table().select().order().execute() devolviendo filas ordenadas por last_visit DESC
+# Simula table().select().order().order().limit().execute() devolviendo la página
+# ordenada por last_visit DESC
+# y rpc('visitor_totals').execute() para los totales
 def _set_visitors_query_result(mock, rows):
     rows_sorted = sorted(rows, key=lambda r: r["last_visit"], reverse=True)
     table_mock = mock.table.return_value
     select_mock = table_mock.select.return_value
-    order_mock  = select_mock.order.return_value
-    order_mock.execute.return_value = MagicMock(data=rows_sorted)
+    order_mock  = select_mock.order.return_value.order.return_value
+    order_mock.limit.return_value.execute.return_value = MagicMock(data=rows_sorted)
+    mock.rpc.return_value.execute.return_value = MagicMock(data=[{
+        "total_unique": len(rows),
+        "total_visits": sum(r["visit_count"] for r in rows),
+    }])
 
 @given('que la base de datos contiene visitantes')
 @given('que la base de datos contiene visitantes:')
 def step_seed_visitors(context):
     rows = []
     if getattr(context, "table", None):
-        for r in context.table:
+        for i, r in enumerate(context.table, start=1):
             rows.append({
+                "id": i,
                 "name": r["name"],
                 "first_visit": r["first_visit"],
                 "last_visit": r["last_visit"],
@@ -18,7 +18,7 @@ UTC_OFFSET = '+00:00'
 def step_database_is_empty(context):
     """Simula que la base de datos no tiene registros"""
     context.database = {}
-    context.supabase_mock.table().select().eq().execute.return_value = MagicMock(data=[])
+    context.supabase_mock.rpc().execute.return_value = MagicMock(data=[])
 
 
 @given('que visito la página principal')
@@ -58,16 +58,11 @@ def step_existing_visitor(context, nombre, visitas, tiempo=None):
     context.visitor_before = visitor.copy()
     context.visitor_count_before = len(context.database)
     
-    # Configurar mock para retornar este visitante
-    context.supabase_mock.table().select().eq().execute.return_value = MagicMock(
-        data=[visitor]
-    )
-    
-    # Configurar mock para UPDATE
+    # Configurar mock del upsert atómico (incrementa la visita existente)
     updated_visitor = visitor.copy()
     updated_visitor['visit_count'] = visitas + 1
     updated_visitor['last_visit'] = datetime.now().isoformat()
-    context.supabase_mock.table().update().eq().execute.return_value = MagicMock(
+    context.supabase_mock.rpc().execute.return_value = MagicMock(
         data=[updated_visitor]
     )
 
@@ -100,25 +95,17 @@ def step_submit_form_with_name(context, nombre=""):
     
     # Configurar comportamiento del mock según el caso
     if nombre in context.database:
-        # Visitante existente - retornar datos
+        # Visitante existente - el upsert devuelve la fila incrementada
         visitor = context.database[nombre]
-        context.supabase_mock.table().select().eq().execute.return_value = MagicMock(
-            data=[visitor]
-        )
-        
-        # Simular UPDATE
         updated = visitor.copy()
         updated['visit_count'] += 1
         updated['last_visit'] = datetime.now().isoformat()
-        context.supabase_mock.table().update().eq().execute.return_value = MagicMock(
+        context.supabase_mock.rpc().execute.return_value = MagicMock(
             data=[updated]
         )
         context.updated_visitor = updated
     else:
-        # Nuevo visitante
-        context.supabase_mock.table().select().eq().execute.return_value = MagicMock(data=[])
-        
-        # Simular INSERT
+        # Nuevo visitante - el upsert devuelve la fila insertada
         new_visitor = {
             'id': len(context.database) + 1,
             'name': nombre,
@@ -127,7 +114,7 @@ def step_submit_form_with_name(context, nombre=""):
             'last_visit': datetime.now().isoformat(),
             'ip_address': getattr(context, 'client_ip', '127.0.0.1')
         }
-        context.supabase_mock.table().insert().execute.return_value = MagicMock(
+        context.supabase_mock.rpc().execute.return_value = MagicMock(
             data=[new_visitor]
         )
         context.new_visitor = new_visitor
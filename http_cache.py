@@ -0,0 +1,59 @@
+"""
+Respuestas condicionales (ETag / Last-Modified) a partir de la versión de los datos
+
+El listado de visitantes solo cambia cuando se registra una visita, así que
+la versión se deriva de los totales (total_visits crece con cada registro) y
+de la última visita. Si el cliente ya tiene esa versión se responde
+304 Not Modified sin consultar la página ni renderizar la plantilla.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+
+# El navegador guarda la respuesta pero la revalida en cada uso
+REVALIDATE = 'no-cache'
+
+
+def data_version_etag(totals: dict) -> str:
+    """ETag (débil) de la versión de los datos de visitantes"""
+    return f"v{totals['total_unique']}.{totals['total_visits']}"
+
+
+def visitor_etag(row: dict) -> str:
+    """ETag (débil) de un visitante: sus campos públicos solo cambian con visit_count"""
+    return f"r{row['id']}.{row['visit_count']}"
+
+
+def last_modified(totals: dict) -> Optional[datetime]:
+    """Fecha de la última visita como Last-Modified (None si no hay o no se entiende)"""
+    value = totals.get('last_visit')
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    # Las columnas TIMESTAMP no llevan zona: se interpretan como UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def not_modified(etag: str, modified: Optional[datetime]) -> Optional[Response]:
+    """
+    Retorna una respuesta 304 si la petición ya tiene esta versión, o None
+
+    Si llegan If-None-Match e If-Modified-Since manda el ETag (RFC 9110).
+    """
+    if is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        return None
+    return set_validators(Response(status=304), etag, modified)
+
+
+def set_validators(response: Response, etag: str, modified: Optional[datetime]) -> Response:
+    """Añade ETag, Last-Modified y Cache-Control de revalidación a la respuesta"""
+    response.set_etag(etag, weak=True)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers['Cache-Control'] = REVALIDATE
+    return response
@@ -0,0 +1,63 @@
+"""
+Serialización y selección de campos de la API JSON de visitantes (/api/visitors)
+
+La serialización usa orjson si está instalado (varias veces más rápido que
+json con listas de filas) y json de la biblioteca estándar si no; ambas
+producen el mismo documento compacto en UTF-8.
+
+?fields=name,visit_count limita cada visitante a esos campos: la consulta a
+la BD pide solo esas columnas (más las que necesita el cursor).
+"""
+import json
+from typing import Iterable, List, Optional, Tuple
+
+from flask import Response
+
+from visitor_repository import LISTING_COLUMNS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+# Campos públicos de un visitante (la IP no se expone)
+API_FIELDS = LISTING_COLUMNS
+
+
+def dumps(data) -> bytes:
+    """Serializa `data` como JSON compacto en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def json_response(data, status: int = 200) -> Response:
+    """Respuesta application/json con `data` serializado"""
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def parse_fields(text: Optional[str]) -> Tuple[str, ...]:
+    """
+    ?fields=name,visit_count -> ('name', 'visit_count'); sin valor, API_FIELDS
+
+    Raises:
+        ValueError: Si algún campo no es público
+    """
+    if not text:
+        return API_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in text.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in API_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Campos no soportados: {', '.join(unknown) or text!r} "
+                         f"(disponibles: {', '.join(API_FIELDS)})")
+    return fields
+
+
+def query_columns(fields: Iterable[str], required: Iterable[str]) -> Tuple[str, ...]:
+    """Columnas a pedir a la BD: los campos solicitados más los `required`"""
+    return tuple(dict.fromkeys((*fields, *required)))
+
+
+def project(rows: Iterable[dict], fields: Tuple[str, ...]) -> List[dict]:
+    """Deja en cada fila solo `fields` (en ese orden)"""
+    return [{f: row.get(f) for f in fields} for row in rows]
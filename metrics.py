@@ -0,0 +1,213 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus (/metrics)
+
+Implementación mínima sin dependencias: contadores, histogramas y gauges
+calculados al momento de la lectura. Cada observación cuesta una búsqueda
+binaria y un lock sin contención, así que puede quedar siempre activa.
+
+Con varios workers de gunicorn cada proceso expone sus propias series.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from flask import Flask, Response, g, request
+from flask.signals import before_render_template, got_request_exception, template_rendered
+
+# Límites (segundos) pensados para latencias web y viajes HTTP a la BD
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    """Contador monotónico con etiquetas"""
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {value}'
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # etiquetas -> [conteos por bucket (+Inf al final), suma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                yield f'{self.name}_bucket{bucket_labels} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {total}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}'
+
+
+class CallbackMetric:
+    """
+    Métrica cuyo valor se lee de otro componente al servir /metrics
+    (p. ej. profundidad de la cola write-behind o aciertos de la caché)
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float],
+                 type: str = 'gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.type = type
+
+    def samples(self) -> Iterator[str]:
+        yield f'{self.name} {self.callback()}'
+
+
+class Registry:
+    """Conjunto de métricas expuestas en /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Registra una métrica; si ya existe con ese nombre la reemplaza"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones por ruta',
+    ('route', 'method')))
+REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'Peticiones atendidas por ruta y código de estado',
+    ('route', 'method', 'status')))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    'http_request_exceptions_total', 'Excepciones no controladas por ruta', ('route',)))
+DB_LATENCY = REGISTRY.register(Histogram(
+    'db_operation_duration_seconds', 'Latencia de las operaciones de base de datos',
+    ('operation',)))
+DB_ERRORS = REGISTRY.register(Counter(
+    'db_operation_errors_total', 'Operaciones de base de datos fallidas', ('operation',)))
+RATE_LIMITED = REGISTRY.register(Counter(
+    'http_requests_rate_limited_total', 'Peticiones rechazadas por límite de IP', ('route',)))
+TEMPLATE_LATENCY = REGISTRY.register(Histogram(
+    'template_render_duration_seconds', 'Tiempo de renderizado por plantilla', ('template',)))
+
+
+@contextmanager
+def time_db_operation(operation: str):
+    """Mide una operación de base de datos y cuenta sus errores"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        DB_ERRORS.inc(operation)
+        raise
+    finally:
+        DB_LATENCY.observe(time.perf_counter() - start, operation)
+
+
+def _route_label() -> str:
+    # La regla (p. ej. /visitors) y no la URL, para acotar la cardinalidad
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def init_app(app: Flask) -> None:
+    """Instala los hooks de medición y la ruta /metrics en la aplicación"""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = _route_label()
+            REQUEST_LATENCY.observe(time.perf_counter() - start, route, request.method)
+            REQUESTS.inc(route, request.method, str(response.status_code))
+        return response
+
+    def _template_started(sender, template, context, **extra):
+        g.setdefault('_template_starts', []).append(time.perf_counter())
+
+    def _template_finished(sender, template, context, **extra):
+        starts = g.get('_template_starts')
+        if starts:
+            TEMPLATE_LATENCY.observe(time.perf_counter() - starts.pop(), template.name or '-')
+
+    def _request_failed(sender, exception, **extra):
+        REQUEST_ERRORS.inc(_route_label())
+
+    before_render_template.connect(_template_started, app, weak=False)
+    template_rendered.connect(_template_finished, app, weak=False)
+    got_request_exception.connect(_request_failed, app, weak=False)
+
+    @app.get('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
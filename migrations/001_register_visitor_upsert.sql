@@ -0,0 +1,47 @@
+-- ============================================================================
+-- 001 - Registro atómico de visitantes (insert o incremento en una sola llamada)
+--
+-- Reemplaza el patrón SELECT + UPDATE/INSERT de register_visitor, que costaba
+-- dos viajes a Supabase y podía perder incrementos con peticiones concurrentes.
+-- ============================================================================
+BEGIN;
+
+-- Fusionar duplicados que pudo crear la condición de carrera anterior
+UPDATE visitors v
+   SET visit_count = d.total_visits,
+       first_visit = d.first_visit,
+       last_visit  = d.last_visit
+  FROM (
+        SELECT min(id)          AS keep_id,
+               sum(visit_count) AS total_visits,
+               min(first_visit) AS first_visit,
+               max(last_visit)  AS last_visit
+          FROM visitors
+         GROUP BY name
+        HAVING count(*) > 1
+       ) d
+ WHERE v.id = d.keep_id;
+
+DELETE FROM visitors v
+ USING visitors k
+ WHERE v.name = k.name
+   AND v.id > k.id;
+
+-- El upsert necesita un índice único sobre el nombre
+ALTER TABLE visitors ADD CONSTRAINT visitors_name_key UNIQUE (name);
+
+-- Inserta el visitante o incrementa su contador; devuelve la fila resultante
+CREATE OR REPLACE FUNCTION register_visitor(p_name text, p_ip_address text DEFAULT NULL)
+RETURNS SETOF visitors
+LANGUAGE sql
+AS $$
+    INSERT INTO visitors AS v (name, visit_count, first_visit, last_visit, ip_address)
+    VALUES (p_name, 1, now(), now(), p_ip_address)
+    ON CONFLICT (name) DO UPDATE
+       SET visit_count = v.visit_count + 1,
+           last_visit  = now(),
+           ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+    RETURNING v.*;
+$$;
+
+COMMIT;
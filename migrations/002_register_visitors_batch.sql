@@ -0,0 +1,21 @@
+-- ============================================================================
+-- 002 - Registro por lotes para el modo write-behind
+--
+-- Recibe los registros ya fusionados por nombre (un elemento por visitante) y
+-- aplica todos los incrementos en una sola sentencia.
+-- ============================================================================
+CREATE OR REPLACE FUNCTION register_visitors_batch(p_visits jsonb)
+RETURNS SETOF visitors
+LANGUAGE sql
+AS $$
+    INSERT INTO visitors AS v (name, visit_count, first_visit, last_visit, ip_address)
+    SELECT x.name, x.increment, x.first_visit, x.last_visit, x.ip_address
+      FROM jsonb_to_recordset(p_visits)
+           AS x(name text, increment integer, first_visit timestamp,
+                last_visit timestamp, ip_address text)
+    ON CONFLICT (name) DO UPDATE
+       SET visit_count = v.visit_count + EXCLUDED.visit_count,
+           last_visit  = GREATEST(v.last_visit, EXCLUDED.last_visit),
+           ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+    RETURNING v.*;
+$$;
@@ -0,0 +1,8 @@
+-- ============================================================================
+-- 003 - Índice para la paginación keyset de /visitors
+--
+-- Cada página filtra y ordena por (last_visit, id); con este índice la consulta
+-- lee solo las filas de la página, sin importar el tamaño de la tabla.
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS visitors_last_visit_id_idx
+    ON visitors (last_visit DESC, id DESC);
@@ -0,0 +1,14 @@
+-- ============================================================================
+-- 004 - Totales de /visitors calculados en la base de datos
+--
+-- Devuelve una sola fila con visitantes únicos y visitas acumuladas, en lugar
+-- de descargar todas las filas para contarlas y sumarlas en Python.
+-- ============================================================================
+CREATE OR REPLACE FUNCTION visitor_totals()
+RETURNS TABLE (total_unique bigint, total_visits bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT count(*), COALESCE(sum(visit_count), 0)
+      FROM visitors;
+$$;
@@ -0,0 +1,18 @@
+-- ============================================================================
+-- 005 - visitor_totals() devuelve también la última visita
+--
+-- max(last_visit) usa el índice (last_visit DESC, id DESC) de la migración
+-- 003. Junto con total_visits, que crece con cada registro, forma la versión
+-- de los datos de /visitors (ETag y Last-Modified, respuestas 304).
+-- El tipo de retorno cambia, por eso la función se elimina y se vuelve a crear.
+-- ============================================================================
+DROP FUNCTION IF EXISTS visitor_totals();
+
+CREATE FUNCTION visitor_totals()
+RETURNS TABLE (total_unique bigint, total_visits bigint, last_visit timestamp)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT count(*), COALESCE(sum(visit_count), 0), max(last_visit)
+      FROM visitors;
+$$;
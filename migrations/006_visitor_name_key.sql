@@ -0,0 +1,151 @@
+-- ============================================================================
+-- 006 - Clave normalizada de visitante (name_key) con índice único
+--
+-- "Ana ", "ana" y "ANA" eran tres visitantes distintos: el upsert comparaba el
+-- texto tal cual llegaba del formulario. name_key guarda el nombre sin
+-- espacios sobrantes, en minúsculas (casefold) y en Unicode NFC; la calcula la
+-- aplicación (visitor_repository.normalize_name) y el upsert busca por ella con
+-- un sondeo al índice único. name conserva la forma en que se vio primero.
+--
+-- SQL no reproduce casefold ("Straße" -> "strasse") ni la separación por
+-- espacios Unicode de normalize_name, así que aquí solo se calcula la clave
+-- de los nombres ASCII, donde ambas coinciden exactamente. El resto recibe
+-- una clave provisional única ('PENDIENTE:<id>', con mayúsculas: casefold
+-- nunca la produce) y justo después de esta migración hay que ejecutar
+--
+--     python backfill_name_key.py
+--
+-- que calcula con normalize_name la clave de todas las filas y envía las que
+-- no coinciden a rekey_visitors (definida abajo), que las corrige y fusiona
+-- los visitantes que pasan a compartir clave. Hasta entonces, una visita de
+-- un nombre no ASCII ya registrado crea una fila nueva que el script fusiona.
+-- ============================================================================
+BEGIN;
+
+ALTER TABLE visitors ADD COLUMN IF NOT EXISTS name_key text;
+
+-- translate() y no lower(): no depende del locale de la base de datos
+UPDATE visitors
+   SET name_key = CASE
+         WHEN name ~ '^[\x20-\x7E\t\n\r\v\f]*$'
+         THEN translate(btrim(regexp_replace(name, '[ \t\n\r\v\f]+', ' ', 'g'), ' '),
+                        'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+         ELSE 'PENDIENTE:' || id
+       END
+ WHERE name_key IS NULL;
+
+-- Fusionar los visitantes que ahora comparten clave en la fila más antigua
+-- (solo nombres ASCII: las claves provisionales son únicas)
+UPDATE visitors v
+   SET visit_count = d.total_visits,
+       first_visit = d.first_visit,
+       last_visit  = d.last_visit
+  FROM (
+        SELECT min(id)          AS keep_id,
+               sum(visit_count) AS total_visits,
+               min(first_visit) AS first_visit,
+               max(last_visit)  AS last_visit
+          FROM visitors
+         GROUP BY name_key
+        HAVING count(*) > 1
+       ) d
+ WHERE v.id = d.keep_id;
+
+DELETE FROM visitors v
+ USING visitors k
+ WHERE v.name_key = k.name_key
+   AND v.id > k.id;
+
+ALTER TABLE visitors ALTER COLUMN name_key SET NOT NULL;
+
+-- La unicidad pasa de name (migración 001) a name_key
+ALTER TABLE visitors DROP CONSTRAINT IF EXISTS visitors_name_key;
+CREATE UNIQUE INDEX IF NOT EXISTS visitors_name_key_idx ON visitors (name_key);
+
+-- La firma cambia: se elimina la versión (p_name, p_ip_address) de la 001
+DROP FUNCTION IF EXISTS register_visitor(text, text);
+
+CREATE FUNCTION register_visitor(p_name text, p_name_key text, p_ip_address text DEFAULT NULL)
+RETURNS SETOF visitors
+LANGUAGE sql
+AS $$
+    INSERT INTO visitors AS v (name, name_key, visit_count, first_visit, last_visit, ip_address)
+    VALUES (p_name, p_name_key, 1, now(), now(), p_ip_address)
+    ON CONFLICT (name_key) DO UPDATE
+       SET visit_count = v.visit_count + 1,
+           last_visit  = now(),
+           ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+    RETURNING v.*;
+$$;
+
+CREATE OR REPLACE FUNCTION register_visitors_batch(p_visits jsonb)
+RETURNS SETOF visitors
+LANGUAGE sql
+AS $$
+    INSERT INTO visitors AS v (name, name_key, visit_count, first_visit, last_visit, ip_address)
+    SELECT x.name, x.name_key, x.increment, x.first_visit, x.last_visit, x.ip_address
+      FROM jsonb_to_recordset(p_visits)
+           AS x(name text, name_key text, increment integer, first_visit timestamp,
+                last_visit timestamp, ip_address text)
+    ON CONFLICT (name_key) DO UPDATE
+       SET visit_count = v.visit_count + EXCLUDED.visit_count,
+           last_visit  = GREATEST(v.last_visit, EXCLUDED.last_visit),
+           ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+    RETURNING v.*;
+$$;
+
+-- Corrige claves ({id, name_key} calculadas con normalize_name por
+-- backfill_name_key.py) y fusiona en la fila más antigua los visitantes que
+-- pasan a compartir clave, incluidos los que ya la tenían. Devuelve el número
+-- de filas fusionadas (eliminadas).
+CREATE OR REPLACE FUNCTION rekey_visitors(p_keys jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    merged integer;
+BEGIN
+    CREATE TEMP TABLE visitor_rekey ON COMMIT DROP AS
+    WITH k AS (
+        SELECT * FROM jsonb_to_recordset(p_keys) AS x(id bigint, name_key text)
+    )
+    SELECT v.id, COALESCE(k.name_key, v.name_key) AS name_key,
+           v.visit_count, v.first_visit, v.last_visit
+      FROM visitors v
+      LEFT JOIN k ON k.id = v.id
+     WHERE k.id IS NOT NULL
+        OR v.name_key IN (SELECT name_key FROM k);
+
+    DELETE FROM visitors v
+     USING visitor_rekey r
+     WHERE v.id = r.id
+       AND r.id > (SELECT min(o.id) FROM visitor_rekey o WHERE o.name_key = r.name_key);
+    GET DIAGNOSTICS merged = ROW_COUNT;
+
+    -- Dos pasos para que ninguna fila tome una clave que otra aún no ha dejado
+    UPDATE visitors v
+       SET name_key = 'PENDIENTE:' || v.id
+      FROM visitor_rekey r
+     WHERE v.id = r.id;
+
+    UPDATE visitors v
+       SET name_key    = d.name_key,
+           visit_count = d.total_visits,
+           first_visit = d.first_visit,
+           last_visit  = d.last_visit
+      FROM (
+            SELECT name_key,
+                   min(id)          AS keep_id,
+                   sum(visit_count) AS total_visits,
+                   min(first_visit) AS first_visit,
+                   max(last_visit)  AS last_visit
+              FROM visitor_rekey
+             GROUP BY name_key
+           ) d
+     WHERE v.id = d.keep_id;
+
+    RETURN merged;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,51 @@
+-- ============================================================================
+-- 007 - Lotes idempotentes para el reenvío del spool local
+--
+-- El spool (spool.py) reenvía las visitas guardadas durante una caída con un
+-- identificador de lote. Si la respuesta se pierde después de aplicarse, el
+-- mismo lote vuelve a llegar: visitor_applied_batches lo registra en la misma
+-- transacción que los incrementos y el segundo envío no cambia nada.
+-- Sin p_batch_id la función se comporta como la de la migración 006.
+--
+-- Las filas de visitor_applied_batches solo sirven mientras un lote pueda
+-- reenviarse; se pueden purgar las que tengan más de unos días.
+-- ============================================================================
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS visitor_applied_batches (
+    batch_id   text PRIMARY KEY,
+    applied_at timestamp NOT NULL DEFAULT now()
+);
+
+-- La firma cambia: se elimina la versión (p_visits) de la 006
+DROP FUNCTION IF EXISTS register_visitors_batch(jsonb);
+
+CREATE FUNCTION register_visitors_batch(p_visits jsonb, p_batch_id text DEFAULT NULL)
+RETURNS SETOF visitors
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_batch_id IS NOT NULL THEN
+        INSERT INTO visitor_applied_batches (batch_id) VALUES (p_batch_id)
+        ON CONFLICT (batch_id) DO NOTHING;
+        IF NOT FOUND THEN
+            -- Lote ya aplicado: reenvío tras una respuesta perdida
+            RETURN;
+        END IF;
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO visitors AS v (name, name_key, visit_count, first_visit, last_visit, ip_address)
+    SELECT x.name, x.name_key, x.increment, x.first_visit, x.last_visit, x.ip_address
+      FROM jsonb_to_recordset(p_visits)
+           AS x(name text, name_key text, increment integer, first_visit timestamp,
+                last_visit timestamp, ip_address text)
+    ON CONFLICT (name_key) DO UPDATE
+       SET visit_count = v.visit_count + EXCLUDED.visit_count,
+           last_visit  = GREATEST(v.last_visit, EXCLUDED.last_visit),
+           ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+    RETURNING v.*;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,46 @@
+-- ============================================================================
+-- 008 - Lotes sin filas de retorno
+--
+-- register_visitors_batch acepta p_return_rows: con false aplica el lote y no
+-- devuelve filas (el reenvío del spool no las usa). Sin ese parámetro se
+-- comporta como la función de la migración 007.
+-- ============================================================================
+BEGIN;
+
+-- La firma cambia: se elimina la versión (p_visits, p_batch_id) de la 007
+DROP FUNCTION IF EXISTS register_visitors_batch(jsonb, text);
+
+CREATE FUNCTION register_visitors_batch(p_visits jsonb, p_batch_id text DEFAULT NULL,
+                                        p_return_rows boolean DEFAULT true)
+RETURNS SETOF visitors
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_batch_id IS NOT NULL THEN
+        INSERT INTO visitor_applied_batches (batch_id) VALUES (p_batch_id)
+        ON CONFLICT (batch_id) DO NOTHING;
+        IF NOT FOUND THEN
+            -- Lote ya aplicado: reenvío tras una respuesta perdida
+            RETURN;
+        END IF;
+    END IF;
+
+    -- El INSERT de la CTE se ejecuta completo aunque no se devuelvan filas
+    RETURN QUERY
+    WITH applied AS (
+        INSERT INTO visitors AS v (name, name_key, visit_count, first_visit, last_visit, ip_address)
+        SELECT x.name, x.name_key, x.increment, x.first_visit, x.last_visit, x.ip_address
+          FROM jsonb_to_recordset(p_visits)
+               AS x(name text, name_key text, increment integer, first_visit timestamp,
+                    last_visit timestamp, ip_address text)
+        ON CONFLICT (name_key) DO UPDATE
+           SET visit_count = v.visit_count + EXCLUDED.visit_count,
+               last_visit  = GREATEST(v.last_visit, EXCLUDED.last_visit),
+               ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+        RETURNING v.*
+    )
+    SELECT * FROM applied WHERE p_return_rows;
+END;
+$$;
+
+COMMIT;
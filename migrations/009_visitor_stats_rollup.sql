@@ -0,0 +1,110 @@
+-- ============================================================================
+-- 009 - Rollup de visitas por hora para /visitors/stats
+--
+-- visitor_stats_hourly acumula, por hora, las visitas y los visitantes nuevos.
+-- register_visitor y register_visitors_batch lo actualizan en la misma
+-- sentencia que el upsert, así /visitors/stats lee una fila por hora de la
+-- ventana pedida en lugar de recorrer visitors. Cada visita cuenta en la hora
+-- de su last_visit (en un lote, la del lote). Una fila es nueva si su
+-- visit_count coincide con el incremento aplicado.
+--
+-- El ranking por visit_count usa el índice visitors_visit_count_idx.
+--
+-- Relleno inicial estimado con las filas existentes: la primera visita de cada
+-- visitante cuenta en la hora de first_visit y el resto en la de last_visit.
+-- ============================================================================
+BEGIN;
+
+-- Sin registros concurrentes mientras se rellena y se cambian las funciones
+LOCK TABLE visitors IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TABLE IF NOT EXISTS visitor_stats_hourly (
+    bucket       timestamp PRIMARY KEY,
+    visits       bigint NOT NULL DEFAULT 0,
+    new_visitors bigint NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS visitors_visit_count_idx ON visitors (visit_count DESC, id);
+
+INSERT INTO visitor_stats_hourly (bucket, visits, new_visitors)
+SELECT bucket, sum(visits), sum(new_visitors)
+  FROM (SELECT date_trunc('hour', first_visit) AS bucket, 1 AS visits, 1 AS new_visitors
+          FROM visitors
+        UNION ALL
+        SELECT date_trunc('hour', last_visit), visit_count - 1, 0
+          FROM visitors
+         WHERE visit_count > 1) AS seed
+ GROUP BY bucket
+ON CONFLICT (bucket) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION register_visitor(p_name text, p_name_key text,
+                                            p_ip_address text DEFAULT NULL)
+RETURNS SETOF visitors
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO visitors AS v (name, name_key, visit_count, first_visit, last_visit, ip_address)
+        VALUES (p_name, p_name_key, 1, now(), now(), p_ip_address)
+        ON CONFLICT (name_key) DO UPDATE
+           SET visit_count = v.visit_count + 1,
+               last_visit  = now(),
+               ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+        RETURNING v.*
+    ), rollup AS (
+        INSERT INTO visitor_stats_hourly AS s (bucket, visits, new_visitors)
+        SELECT date_trunc('hour', u.last_visit), 1, (u.visit_count = 1)::int
+          FROM upserted AS u
+        ON CONFLICT (bucket) DO UPDATE
+           SET visits       = s.visits + EXCLUDED.visits,
+               new_visitors = s.new_visitors + EXCLUDED.new_visitors
+    )
+    SELECT * FROM upserted;
+$$;
+
+CREATE OR REPLACE FUNCTION register_visitors_batch(p_visits jsonb, p_batch_id text DEFAULT NULL,
+                                                   p_return_rows boolean DEFAULT true)
+RETURNS SETOF visitors
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_batch_id IS NOT NULL THEN
+        INSERT INTO visitor_applied_batches (batch_id) VALUES (p_batch_id)
+        ON CONFLICT (batch_id) DO NOTHING;
+        IF NOT FOUND THEN
+            -- Lote ya aplicado: reenvío tras una respuesta perdida
+            RETURN;
+        END IF;
+    END IF;
+
+    RETURN QUERY
+    WITH input AS (
+        SELECT *
+          FROM jsonb_to_recordset(p_visits)
+               AS x(name text, name_key text, increment integer, first_visit timestamp,
+                    last_visit timestamp, ip_address text)
+    ), applied AS (
+        INSERT INTO visitors AS v (name, name_key, visit_count, first_visit, last_visit, ip_address)
+        SELECT i.name, i.name_key, i.increment, i.first_visit, i.last_visit, i.ip_address
+          FROM input AS i
+        ON CONFLICT (name_key) DO UPDATE
+           SET visit_count = v.visit_count + EXCLUDED.visit_count,
+               last_visit  = GREATEST(v.last_visit, EXCLUDED.last_visit),
+               ip_address  = COALESCE(EXCLUDED.ip_address, v.ip_address)
+        RETURNING v.*
+    ), rollup AS (
+        -- Una fila por hora: ON CONFLICT no puede tocar dos veces la misma fila
+        INSERT INTO visitor_stats_hourly AS s (bucket, visits, new_visitors)
+        SELECT date_trunc('hour', i.last_visit), sum(i.increment),
+               count(*) FILTER (WHERE a.visit_count = i.increment)
+          FROM applied AS a
+          JOIN input AS i ON i.name_key = a.name_key
+         GROUP BY 1
+        ON CONFLICT (bucket) DO UPDATE
+           SET visits       = s.visits + EXCLUDED.visits,
+               new_visitors = s.new_visitors + EXCLUDED.new_visitors
+    )
+    SELECT * FROM applied WHERE p_return_rows;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,165 @@
+"""
+Paginación por cursor (keyset) del listado de visitantes
+
+El cursor codifica la clave (last_visit, id) de la fila límite de la página,
+así cada página es una consulta por índice sin OFFSET, sin importar el tamaño
+de la tabla.
+"""
+import base64
+import json
+import logging
+from typing import Iterator, Optional, Sequence, Tuple
+
+from visitor_repository import LISTING_COLUMNS
+
+Cursor = Tuple[str, int]
+
+log = logging.getLogger('app.pagination')
+
+
+def encode_cursor(row: dict) -> str:
+    """Codifica la clave (last_visit, id) de una fila como cursor opaco"""
+    raw = json.dumps([row['last_visit'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Decodifica un cursor generado por encode_cursor
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        last_visit, visitor_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+    if not isinstance(last_visit, str) or not isinstance(visitor_id, int):
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return last_visit, visitor_id
+
+
+def fetch_page(repository, limit: int, after: Optional[str] = None,
+               before: Optional[str] = None, columns: Sequence[str] = LISTING_COLUMNS) -> dict:
+    """
+    Obtiene una página del listado por última visita
+
+    Args:
+        repository: VisitorRepository del que leer
+        limit: Tamaño de página
+        after: Cursor de la página siguiente (filas más antiguas)
+        before: Cursor de la página anterior (filas más recientes)
+        columns: Columnas de cada fila (deben incluir id y last_visit)
+
+    Returns:
+        dict: rows, next_cursor y prev_cursor (None si no hay más páginas)
+
+    Raises:
+        ValueError: Si algún cursor no es válido
+    """
+    after_key, before_key = _decode_keys(after, before)
+    # Se pide una fila extra para saber si existe otra página en esa dirección
+    rows = repository.list_by_last_visit(limit + 1, after=after_key, before=before_key,
+                                         columns=columns)
+    return _build_page(rows, limit, after_key, before_key)
+
+
+async def fetch_page_async(repository, limit: int, after: Optional[str] = None,
+                           before: Optional[str] = None,
+                           columns: Sequence[str] = LISTING_COLUMNS) -> dict:
+    """Igual que fetch_page, sobre un repositorio asíncrono"""
+    after_key, before_key = _decode_keys(after, before)
+    rows = await repository.list_by_last_visit(limit + 1, after=after_key, before=before_key,
+                                               columns=columns)
+    return _build_page(rows, limit, after_key, before_key)
+
+
+def _decode_keys(after: Optional[str], before: Optional[str]):
+    return (decode_cursor(after) if after else None,
+            decode_cursor(before) if before else None)
+
+
+def _build_page(rows: list, limit: int, after_key: Optional[Cursor],
+                before_key: Optional[Cursor]) -> dict:
+    has_more = len(rows) > limit
+
+    if before_key:
+        rows = rows[-limit:]
+        has_next, has_prev = True, has_more
+    else:
+        rows = rows[:limit]
+        has_next, has_prev = has_more, after_key is not None
+
+    return {
+        'rows': rows,
+        'next_cursor': encode_cursor(rows[-1]) if rows and has_next else None,
+        'prev_cursor': encode_cursor(rows[0]) if rows and has_prev else None,
+    }
+
+
+class StreamedPage:
+    """
+    Página del listado cuyas filas se consultan por bloques mientras se iteran
+
+    Pensada para el render en streaming de /visitors: cada bloque se envía al
+    cliente antes de pedir el siguiente. next_cursor y prev_cursor quedan
+    disponibles al terminar la iteración (el paginador va después de la tabla).
+    Hacia atrás (`before`) la página se pide en una sola consulta.
+
+    Un fallo de la BD a mitad de la iteración se registra y se propaga: con
+    las cabeceras ya enviadas, la única forma de avisar al cliente es cortar
+    la transferencia para que no guarde (ni revalide) una tabla incompleta.
+
+    Raises:
+        ValueError: Al construirla, si algún cursor no es válido
+    """
+
+    def __init__(self, repository, limit: int, after: Optional[str] = None,
+                 before: Optional[str] = None, chunk_size: int = 100,
+                 columns: Sequence[str] = LISTING_COLUMNS):
+        self.repository = repository
+        self.limit = limit
+        self.columns = columns
+        self.chunk_size = max(1, chunk_size)
+        self.after_key, self.before_key = _decode_keys(after, before)
+        self.next_cursor = None
+        self.prev_cursor = None
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            if self.before_key or self.chunk_size >= self.limit:
+                yield from self._iter_single()
+            else:
+                yield from self._iter_chunks()
+        except Exception as e:
+            log.error("❌ Error consultando visitors: %s", e)
+            raise
+
+    def _iter_single(self) -> Iterator[dict]:
+        rows = self.repository.list_by_last_visit(
+            self.limit + 1, after=self.after_key, before=self.before_key, columns=self.columns)
+        page = _build_page(rows, self.limit, self.after_key, self.before_key)
+        self.next_cursor, self.prev_cursor = page['next_cursor'], page['prev_cursor']
+        yield from page['rows']
+
+    def _iter_chunks(self) -> Iterator[dict]:
+        key, sent, has_more = self.after_key, 0, False
+        while sent < self.limit:
+            remaining = self.limit - sent
+            wanted = min(self.chunk_size, remaining)
+            # En el último bloque se pide una fila extra para saber si hay otra página
+            probe = wanted + 1 if wanted == remaining else wanted
+            rows = self.repository.list_by_last_visit(probe, after=key, columns=self.columns)
+            chunk = rows[:remaining]
+            if chunk:
+                if sent == 0 and self.after_key is not None:
+                    self.prev_cursor = encode_cursor(chunk[0])
+                yield from chunk
+                sent += len(chunk)
+                key = (chunk[-1]['last_visit'], chunk[-1]['id'])
+            if len(rows) < probe:
+                break
+            has_more = len(rows) > remaining
+        if has_more:
+            self.next_cursor = encode_cursor({'last_visit': key[0], 'id': key[1]})
@@ -0,0 +1,189 @@
+"""
+Límite de peticiones por IP con token buckets (opcional: RATE_LIMIT=1)
+
+Cada regla (endpoint -> "N/periodo") da a cada IP un bucket de N fichas que
+se rellena a N por periodo. Sin fichas, la petición se rechaza con 429 y
+Retry-After en before_request, antes de tocar la base de datos.
+
+Los buckets viven en una tabla de tamaño fijo (RATE_LIMIT_SLOTS entradas de
+16 bytes) indexada por un hash de endpoint e IP: la memoria no crece con la
+cantidad de IPs. Dos IPs que caen en la misma entrada comparten bucket, lo
+que solo puede adelantar el límite para ellas.
+
+Backends (RATE_LIMIT_BACKEND):
+  - local: tabla en memoria del proceso (cada worker limita por separado)
+  - shm:   archivo mapeado en memoria compartido por los workers del host
+           (RATE_LIMIT_SHM_PATH), como COUNTER_BACKEND=shm
+
+Variables de entorno:
+  - RATE_LIMIT: 1 para activarlo (desactivado por defecto)
+  - RATE_LIMITS: reglas "endpoint=N/periodo" separadas por comas
+    (periodo: second, minute, hour). Por defecto "hello=30/minute"
+  - RATE_LIMIT_SLOTS: entradas de la tabla de buckets (65536, 1 MiB)
+"""
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from flask import Flask, abort, request
+
+from metrics import RATE_LIMITED
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+DEFAULT_RULES = 'hello=30/minute'
+
+# (capacidad, fichas por segundo)
+Rule = Tuple[float, float]
+
+
+def parse_rule(text: str) -> Rule:
+    """
+    "30/minute" -> (30, 0.5): 30 fichas que se rellenan en un minuto
+
+    Raises:
+        ValueError: Si el formato o el periodo no son válidos
+    """
+    count, _, period = text.strip().partition('/')
+    if period not in PERIODS or int(count) < 1:
+        raise ValueError(f"Regla de límite inválida: {text!r}")
+    return float(count), int(count) / PERIODS[period]
+
+
+def parse_rules(text: str) -> Dict[str, Rule]:
+    """Reglas "hello=30/minute,export_visitors_route=5/minute" -> {endpoint: regla}"""
+    rules = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        endpoint, _, rule = item.partition('=')
+        rules[endpoint.strip()] = parse_rule(rule)
+    return rules
+
+
+class TokenBuckets:
+    """
+    Tabla fija de token buckets en memoria del proceso
+
+    Cada entrada guarda (fichas, último relleno) como dos double. Una entrada
+    a cero es un bucket nuevo (lleno).
+    """
+
+    SLOT = struct.Struct('dd')
+
+    def __init__(self, slots: int = 65536, clock: Callable[[], float] = time.monotonic):
+        self.slots = slots
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buffer = self._allocate(slots * self.SLOT.size)
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        """
+        Consume una ficha del bucket de `key`
+
+        Returns:
+            float: 0 si se permitió; si no, segundos hasta la próxima ficha
+        """
+        offset = (zlib.crc32(key.encode()) % self.slots) * self.SLOT.size
+        with self._exclusive(offset):
+            now = self._clock()
+            tokens, last = self.SLOT.unpack_from(self._buffer, offset)
+            tokens = capacity if last == 0 else min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.SLOT.pack_into(self._buffer, offset, tokens, now)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    def _allocate(self, size: int):
+        return bytearray(size)
+
+    @contextmanager
+    def _exclusive(self, offset: int) -> Iterator[None]:
+        with self._lock:
+            yield
+
+
+class SharedMemoryTokenBuckets(TokenBuckets):
+    """
+    Tabla de buckets en un archivo mapeado en memoria, común a los workers
+
+    Cada actualización bloquea solo los 16 bytes de su entrada (lockf por
+    rango), así que IPs distintas no se esperan entre procesos.
+    """
+
+    def __init__(self, path: str, slots: int = 65536,
+                 clock: Callable[[], float] = time.monotonic):
+        if fcntl is None:  # pragma: no cover - Windows
+            raise RuntimeError("RATE_LIMIT_BACKEND=shm requiere un sistema POSIX")
+        self.path = path
+        super().__init__(slots, clock)
+
+    def _allocate(self, size: int):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        return mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def _exclusive(self, offset: int) -> Iterator[None]:
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+
+
+def create_token_buckets(backend: str = None) -> TokenBuckets:
+    """Crea la tabla de buckets configurada en RATE_LIMIT_BACKEND"""
+    backend = backend or os.getenv('RATE_LIMIT_BACKEND', 'local')
+    slots = int(os.getenv('RATE_LIMIT_SLOTS', '65536'))
+    if backend == 'local':
+        return TokenBuckets(slots)
+    if backend == 'shm':
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        return SharedMemoryTokenBuckets(
+            os.getenv('RATE_LIMIT_SHM_PATH', os.path.join(shm_dir, 'python-flask-app-ratelimit')),
+            slots)
+    raise ValueError(f"RATE_LIMIT_BACKEND desconocido: {backend}")
+
+
+def init_app(app: Flask, enabled: bool = None, rules: Dict[str, Rule] = None,
+             buckets: TokenBuckets = None) -> Optional[TokenBuckets]:
+    """
+    Instala el límite en before_request si está activado
+
+    Returns:
+        Optional[TokenBuckets]: La tabla de buckets, o None si no se instaló
+    """
+    if enabled is None:
+        enabled = os.getenv('RATE_LIMIT', '0') == '1'
+    if not enabled:
+        return None
+    rules = rules if rules is not None else parse_rules(os.getenv('RATE_LIMITS', DEFAULT_RULES))
+    buckets = buckets or create_token_buckets()
+
+    @app.before_request
+    def _rate_limit():
+        rule = rules.get(request.endpoint)
+        if rule is None:
+            return None
+        wait = buckets.take(f'{request.endpoint}|{request.remote_addr}', *rule)
+        if wait > 0:
+            RATE_LIMITED.inc(request.endpoint)
+            abort(429, description="Demasiadas peticiones, inténtalo más tarde",
+                  retry_after=math.ceil(wait))
+        return None
+
+    return buckets
@@ -0,0 +1,249 @@
+"""
+Spool local y durable de visitas (opcional: DB_SPOOL_PATH)
+
+Las visitas que no se pudieron escribir en la base de datos (error, circuito
+abierto o lote write-behind fallido) se guardan en un diario SQLite de solo
+inserción en el disco local, y un hilo las reenvía por lotes cuando la BD
+vuelve a responder:
+
+  - Cada lote se reclama con un identificador estable (id del spool + primera
+    fila). Si el envío falla o el proceso muere, el siguiente intento reenvía
+    exactamente ese lote con el mismo identificador, y la BD lo aplica una
+    sola vez (register_batch con batch_id, migración 007).
+  - El reenvío está limitado a DB_SPOOL_REPLAY_RATE visitas por segundo para
+    no saturar la BD mientras se recupera.
+
+Variables de entorno:
+  - DB_SPOOL_PATH: archivo SQLite del spool (vacío = sin spool durable)
+  - DB_SPOOL_REPLAY_INTERVAL_MS: intervalo entre comprobaciones (1000)
+  - DB_SPOOL_REPLAY_BATCH: filas del spool por lote (100)
+  - DB_SPOOL_REPLAY_RATE: visitas reenviadas por segundo como máximo (200)
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from visitor_repository import utc_now, with_name_key
+
+log = logging.getLogger('app.spool')
+
+
+class VisitSpool:
+    """
+    Diario SQLite de visitas pendientes de escribir en la BD
+
+    Varios procesos pueden compartir el archivo: reclamar un lote es una
+    transacción exclusiva y los reenvíos duplicados son idempotentes.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS spooled_visits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            increment INTEGER NOT NULL,
+            first_visit TEXT NOT NULL,
+            last_visit TEXT NOT NULL,
+            ip_address TEXT,
+            batch_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS spooled_visits_batch_idx ON spooled_visits (batch_id);
+        CREATE TABLE IF NOT EXISTS spool_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO spool_meta VALUES ('spool_id', ?)",
+                         (uuid.uuid4().hex,))
+        # Identifica este archivo en los batch_id (otros hosts tienen su propio spool)
+        self.spool_id = conn.execute(
+            "SELECT value FROM spool_meta WHERE key = 'spool_id'").fetchone()[0]
+        if hasattr(os, 'register_at_fork'):
+            # Las conexiones SQLite no se comparten con el proceso hijo
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def append_visit(self, name: str, ip_address: Optional[str] = None) -> None:
+        """Guarda una visita individual"""
+        now = utc_now()
+        self.append([{'name': name, 'increment': 1, 'first_visit': now,
+                      'last_visit': now, 'ip_address': ip_address}])
+
+    def append(self, visits: List[dict]) -> None:
+        """Guarda visitas con el formato de register_batch (durable al retornar)"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO spooled_visits (name, name_key, increment, first_visit, '
+                'last_visit, ip_address) VALUES (?, ?, ?, ?, ?, ?)',
+                [(v['name'], v['name_key'], v['increment'], v['first_visit'],
+                  v['last_visit'], v.get('ip_address')) for v in map(with_name_key, visits)])
+
+    def claim(self, limit: int) -> Tuple[Optional[str], List[dict]]:
+        """
+        Reclama el lote a reenviar: el pendiente de un intento anterior si
+        existe, o las `limit` filas más antiguas
+
+        Returns:
+            Tuple[Optional[str], List[dict]]: (batch_id, visitas fusionadas
+            por name_key), o (None, []) si el spool está vacío
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT batch_id FROM spooled_visits WHERE batch_id IS NOT NULL '
+                               'ORDER BY id LIMIT 1').fetchone()
+            if row is not None:
+                batch_id = row[0]
+            else:
+                first = conn.execute('SELECT min(id) FROM spooled_visits').fetchone()[0]
+                if first is None:
+                    conn.execute('COMMIT')
+                    return None, []
+                batch_id = f'{self.spool_id}:{first}'
+                conn.execute('UPDATE spooled_visits SET batch_id = ? WHERE id IN '
+                             '(SELECT id FROM spooled_visits ORDER BY id LIMIT ?)',
+                             (batch_id, limit))
+            rows = conn.execute('SELECT * FROM spooled_visits WHERE batch_id = ? ORDER BY id',
+                                (batch_id,)).fetchall()
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return batch_id, _coalesce(rows)
+
+    def ack(self, batch_id: str) -> None:
+        """Elimina un lote ya aplicado en la BD"""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM spooled_visits WHERE batch_id = ?', (batch_id,))
+
+    def stats(self) -> dict:
+        """Retorna filas y visitas pendientes"""
+        rows, visits = self._connect().execute(
+            'SELECT count(*), COALESCE(sum(increment), 0) FROM spooled_visits').fetchone()
+        return {'rows': rows, 'visits': visits}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Cada visita guardada debe sobrevivir a un corte de energía
+            conn.execute('PRAGMA synchronous=FULL')
+            self._local.conn = conn
+        return conn
+
+    def _reset_after_fork(self) -> None:
+        self._local = threading.local()
+
+
+def _coalesce(rows) -> List[dict]:
+    """Fusiona las filas de un lote por name_key (como la cola write-behind)"""
+    visits = {}
+    for r in rows:
+        visit = visits.get(r['name_key'])
+        if visit is None:
+            visits[r['name_key']] = {
+                'name': r['name'], 'name_key': r['name_key'], 'increment': r['increment'],
+                'first_visit': r['first_visit'], 'last_visit': r['last_visit'],
+                'ip_address': r['ip_address']}
+            continue
+        visit['increment'] += r['increment']
+        visit['first_visit'] = min(visit['first_visit'], r['first_visit'])
+        visit['last_visit'] = max(visit['last_visit'], r['last_visit'])
+        visit['ip_address'] = r['ip_address'] or visit['ip_address']
+    return list(visits.values())
+
+
+class SpoolReplayer:
+    """
+    Hilo que vacía el spool por lotes con un límite de visitas por segundo
+
+    Args:
+        spool: Spool a vaciar
+        flush_fn: Recibe (visitas, batch_id) y las aplica en la BD
+        batch_size: Filas del spool por lote
+        rate: Máximo de visitas reenviadas por segundo
+        interval_ms: Espera entre comprobaciones con el spool vacío o tras un error
+        can_replay: Si retorna False se espera (p. ej. circuito abierto)
+    """
+
+    def __init__(self, spool: VisitSpool, flush_fn: Callable[[List[dict], str], object],
+                 batch_size: int = 100, rate: float = 200.0, interval_ms: int = 1000,
+                 can_replay: Optional[Callable[[], bool]] = None):
+        self.spool = spool
+        self._flush_fn = flush_fn
+        self._batch_size = batch_size
+        self._rate = rate
+        self._interval = interval_ms / 1000
+        self._can_replay = can_replay
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.replayed = 0
+        self.errors = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_after_fork)
+
+    def start(self) -> None:
+        """Inicia el hilo de reenvío"""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='visit-spool-replay',
+                                            daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Detiene el hilo (lo pendiente queda en disco para el próximo arranque)"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def replay_once(self) -> int:
+        """
+        Reenvía un lote
+
+        Returns:
+            int: Visitas reenviadas (0 si el spool está vacío)
+
+        Raises:
+            Exception: La de flush_fn; el lote queda reclamado para reintentarlo
+        """
+        batch_id, visits = self.spool.claim(self._batch_size)
+        if not visits:
+            return 0
+        self._flush_fn(visits, batch_id)
+        self.spool.ack(batch_id)
+        count = sum(v['increment'] for v in visits)
+        self.replayed += count
+        return count
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            while not self._stopped.is_set() and (self._can_replay is None or self._can_replay()):
+                start = time.monotonic()
+                try:
+                    count = self.replay_once()
+                except Exception as e:
+                    self.errors += 1
+                    log.error("❌ Error al reenviar el spool de visitas: %s", e)
+                    break
+                if not count:
+                    break
+                # Límite de ritmo: el lote "ocupa" count / rate segundos
+                self._stopped.wait(max(0.0, count / self._rate - (time.monotonic() - start)))
+
+    def _restart_after_fork(self) -> None:
+        # El hilo no existe en el proceso hijo (p. ej. gunicorn --preload)
+        if self._thread is not None:
+            self._thread = None
+            self.start()
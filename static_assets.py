@@ -0,0 +1,177 @@
+"""
+Recursos estáticos con nombre por contenido, precomprimidos y servidos desde memoria
+
+Solo se publican los recursos que referencian las plantillas (ASSETS), bajo
+/assets/<nombre>.<hash>.<ext> con Cache-Control inmutable: el navegador no
+vuelve a pedirlos hasta que cambia su contenido (y con él la URL). Las
+variantes gzip/brotli se eligen según Accept-Encoding sin comprimir en cada
+petición ni tocar el disco.
+
+Build (en CI, antes de desplegar):
+    python static_assets.py
+genera static/dist/ con los archivos renombrados, sus .gz/.br y manifest.json.
+Si no existe el manifiesto, los recursos se preparan en memoria al arrancar.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, Response, abort, current_app, request, url_for
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+# Recursos que usan las plantillas (el resto de static/bootstrap no se publica)
+ASSETS = ('bootstrap/css/bootstrap.min.css', 'images/azure-icon.svg', 'favicon.ico')
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+# Un año e inmutable: la URL cambia con el contenido
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# /favicon.ico tiene URL fija: se guarda un día antes de revalidar
+FAVICON_CACHE = 'public, max-age=86400'
+
+# Content-Encoding en orden de preferencia y extensión de su archivo precomprimido
+ENCODINGS = ('br', 'gzip')
+_EXTENSIONS = {'br': 'br', 'gzip': 'gz'}
+
+
+class Asset:
+    """Un recurso en memoria con sus variantes comprimidas"""
+
+    def __init__(self, name: str, data: bytes, compressed: Dict[str, bytes]):
+        self.name = name
+        self.data = data
+        self.compressed = compressed
+        self.etag = hashlib.sha256(data).hexdigest()[:12]
+        root, ext = os.path.splitext(name)
+        self.hashed_name = f'{root}.{self.etag}{ext}'
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    def negotiate(self) -> Tuple[bytes, Optional[str]]:
+        """Variante más pequeña que acepta el cliente: (cuerpo, Content-Encoding)"""
+        for encoding in ENCODINGS:
+            body = self.compressed.get(encoding)
+            if body is not None and request.accept_encodings[encoding]:
+                return body, encoding
+        return self.data, None
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """Variantes gzip/brotli al nivel máximo, solo si reducen el tamaño"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+def build_assets(static_dir: str, names=ASSETS) -> Dict[str, Asset]:
+    """Lee y comprime los recursos en memoria"""
+    assets = {}
+    for name in names:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        assets[name] = Asset(name, data, compress(data))
+    return assets
+
+
+def write_dist(static_dir: str, names=ASSETS) -> Dict[str, str]:
+    """
+    Escribe static/dist/ con los nombres por contenido, sus variantes y el manifiesto
+
+    Returns:
+        Dict[str, str]: Manifiesto (nombre lógico -> nombre con hash)
+    """
+    dist = os.path.join(static_dir, DIST_DIR)
+    manifest = {}
+    for name, asset in build_assets(static_dir, names).items():
+        path = os.path.join(dist, asset.hashed_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(asset.data)
+        for encoding, body in asset.compressed.items():
+            with open(f'{path}.{_EXTENSIONS[encoding]}', 'wb') as f:
+                f.write(body)
+        manifest[name] = asset.hashed_name
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_assets(static_dir: str) -> Dict[str, Asset]:
+    """Carga static/dist/ si se generó en el build; si no, prepara los recursos en memoria"""
+    dist = os.path.join(static_dir, DIST_DIR)
+    try:
+        with open(os.path.join(dist, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return build_assets(static_dir)
+
+    assets = {}
+    for name, hashed_name in manifest.items():
+        path = os.path.join(dist, hashed_name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        compressed = {}
+        for encoding, extension in _EXTENSIONS.items():
+            if os.path.exists(f'{path}.{extension}'):
+                with open(f'{path}.{extension}', 'rb') as f:
+                    compressed[encoding] = f.read()
+        assets[name] = Asset(name, data, compressed)
+    return assets
+
+
+def send_asset(asset: Asset, cache_control: str) -> Response:
+    """Respuesta con la variante negociada, sin acceso a disco"""
+    if asset.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        body, encoding = asset.negotiate()
+        response = Response(body, content_type=asset.content_type)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    if asset.compressed:
+        response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(asset.etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def init_app(app: Flask) -> Dict[str, Asset]:
+    """Carga los recursos, registra /assets/ y la función asset_url de las plantillas"""
+    assets = load_assets(app.static_folder)
+    by_hashed_name = {asset.hashed_name: asset for asset in assets.values()}
+    app.extensions['static_assets'] = assets
+
+    @app.get('/assets/<path:filename>')
+    def static_asset(filename):
+        asset = by_hashed_name.get(filename)
+        if asset is None:
+            abort(404)
+        return send_asset(asset, IMMUTABLE)
+
+    @app.template_global()
+    def asset_url(name: str) -> str:
+        asset = assets.get(name)
+        if asset is None:
+            return url_for('static', filename=name)
+        return url_for('static_asset', filename=asset.hashed_name)
+
+    return assets
+
+
+def get_asset(name: str) -> Asset:
+    """Recurso cargado por init_app en la aplicación actual"""
+    return current_app.extensions['static_assets'][name]
+
+
+if __name__ == '__main__':  # pragma: no cover
+    static = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for logical, hashed in write_dist(static).items():
+        print(f'{logical} -> {DIST_DIR}/{hashed}')
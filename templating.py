@@ -0,0 +1,57 @@
+"""
+Compilación de plantillas Jinja al arrancar
+
+Variables de entorno:
+  - JINJA_BYTECODE_CACHE_DIR: directorio de la caché de bytecode. Los
+    procesos nuevos cargan el código ya compilado en lugar de volver a
+    parsear las plantillas.
+  - JINJA_PRECOMPILE=1: compila todas las plantillas al importar la
+    aplicación. Con gunicorn --preload los workers las heredan ya cargadas
+    y su primera petición no paga la compilación.
+"""
+import hashlib
+import os
+from typing import Optional
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache, TemplateNotFound
+
+
+def configure_templates(app: Flask, cache_dir: Optional[str] = None,
+                        precompile: Optional[bool] = None) -> int:
+    """
+    Instala la caché de bytecode y precompila las plantillas si se pide
+
+    Returns:
+        int: Número de plantillas precompiladas
+    """
+    cache_dir = cache_dir or os.getenv('JINJA_BYTECODE_CACHE_DIR')
+    if precompile is None:
+        precompile = os.getenv('JINJA_PRECOMPILE', '0') == '1'
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    if not precompile:
+        return 0
+    names = app.jinja_env.list_templates()
+    for name in names:
+        # get_template compila (o carga de la caché de bytecode) y guarda en memoria
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def template_version(app: Flask, name: str) -> str:
+    """
+    Versión de una plantilla, para que el ETag cambie al desplegar
+
+    Es un hash del código fuente: igual en todos los workers e instancias
+    aunque el despliegue cambie las fechas de modificación, y distinta en
+    cuanto cambia el contenido.
+    """
+    try:
+        source, _, _ = app.jinja_loader.get_source(app.jinja_env, name)
+    except TemplateNotFound:
+        return ''
+    return f"-{hashlib.sha256(source.encode('utf-8')).hexdigest()[:8]}"
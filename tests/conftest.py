@@ -0,0 +1,42 @@
+"""
+Fixtures compartidas por las pruebas
+"""
+import pytest
+from unittest.mock import patch
+from app import app
+from visitor_repository import InMemoryVisitorRepository
+
+
+def _seed(visitors, ip_address=None):
+    """Repositorio en memoria con los visitantes (name, visit_count, last_visit)"""
+    repository = InMemoryVisitorRepository()
+    repository.register_batch([
+        {'name': name, 'increment': count, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': last_visit, 'ip_address': ip_address}
+        for name, count, last_visit in visitors
+    ])
+    return repository
+
+
+@pytest.fixture
+def client():
+    """Fixture para crear un cliente de prueba"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def memory_repository():
+    """Repositorio en memoria con tres visitantes, usado por la aplicación"""
+    repository = _seed([('Ana Pérez', 3, '2025-10-30T10:30:00'),
+                        ('Luis', 5, '2025-10-29T12:00:00'),
+                        ('Carla', 1, '2025-10-31T08:15:00')], ip_address='10.0.0.1')
+    with patch('app.visitor_repository', repository):
+        yield repository
+
+
+@pytest.fixture
+def numbered_repository():
+    """Repositorio en memoria con 5 visitantes: V{i} con i + 1 visitas (V4 es el más reciente)"""
+    return _seed((f'V{i}', i + 1, f'2025-10-{10 + i:02d}T00:00:00') for i in range(5))
@@ -3,16 +3,20 @@ Pruebas unitarias para la aplicación Flask
 """
 import pytest
 from unittest.mock import patch, MagicMock
-from app import app, register_visitor
+from app import flush_visitors_batch, register_visitor
+from visitor_queue import VisitorWriteBehindQueue
+from cache import TTLCache, VisitorLRU
+from pagination import fetch_page
+from visitor_repository import SupabaseVisitorRepository
 from datetime import datetime
 
 
 @pytest.fixture
-def client():
-    """Fixture para crear un cliente de prueba"""
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
+def mock_supabase():
+    """Fixture que usa el repositorio de Supabase con un cliente simulado"""
+    supabase_client = MagicMock()
+    with patch('app.visitor_repository', SupabaseVisitorRepository(supabase_client)):
+        yield supabase_client
 
 
 def test_index_route(client):
@@ -64,6 +68,12 @@ def test_hello_without_name(client):
     assert response.location == '/'
 
 
+def test_hello_blank_name_redirects(client):
+    """Prueba que un nombre con solo espacios cuenta como vacío"""
+    response = client.post('/hello', data={'name': '   '}, follow_redirects=False)
+    assert response.status_code == 302
+
+
 def test_hello_without_name_follow_redirect(client):
     """Prueba el saludo sin nombre siguiendo la redirección"""
     response = client.post('/hello', data={'name': ''}, follow_redirects=True)
@@ -126,15 +136,11 @@ def test_reset_counters_method_not_allowed(client):
 # PRUEBAS DE REGISTRO DE VISITANTES (HU1)
 # ============================================================================
 
-@patch('app.supabase')
 def test_register_visitor_new_user(mock_supabase):
     """Prueba el registro de un nuevo visitante"""
-    # Configurar mock para simular que el visitante no existe
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(data=[])
-    
-    # Configurar mock para la inserción
-    mock_insert_response = MagicMock()
-    mock_insert_response.data = [{
+    # Configurar mock del upsert atómico (register_visitor RPC)
+    mock_rpc_response = MagicMock()
+    mock_rpc_response.data = [{
         'id': 1,
         'name': 'Test User',
         'visit_count': 1,
@@ -142,7 +148,7 @@ def test_register_visitor_new_user(mock_supabase):
         'last_visit': datetime.now().isoformat(),
         'ip_address': '127.0.0.1'
     }]
-    mock_supabase.table().insert().execute.return_value = mock_insert_response
+    mock_supabase.rpc().execute.return_value = mock_rpc_response
     
     # Ejecutar la función
     result = register_visitor('Test User', '127.0.0.1')
@@ -154,29 +160,18 @@ def test_register_visitor_new_user(mock_supabase):
     assert result['ip_address'] == '127.0.0.1'
 
 
-@patch('app.supabase')
 def test_register_visitor_existing_user(mock_supabase):
     """Prueba la actualización de un visitante existente"""
-    # Configurar mock para simular que el visitante existe
-    existing_visitor = {
+    # El servidor incrementa visit_count y devuelve la fila actualizada
+    updated_visitor = {
         'id': 1,
         'name': 'Existing User',
-        'visit_count': 5,
+        'visit_count': 6,
         'first_visit': '2025-10-25T10:00:00',
-        'last_visit': '2025-10-29T10:00:00',
+        'last_visit': datetime.now().isoformat(),
         'ip_address': '127.0.0.1'
     }
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(
-        data=[existing_visitor]
-    )
-    
-    # Configurar mock para la actualización
-    updated_visitor = existing_visitor.copy()
-    updated_visitor['visit_count'] = 6
-    updated_visitor['last_visit'] = datetime.now().isoformat()
-    mock_supabase.table().update().eq().execute.return_value = MagicMock(
-        data=[updated_visitor]
-    )
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[updated_visitor])
     
     # Ejecutar la función
     result = register_visitor('Existing User', '127.0.0.1')
@@ -187,19 +182,35 @@ def test_register_visitor_existing_user(mock_supabase):
     assert result['visit_count'] == 6
 
 
-@patch('app.supabase')
+def test_register_visitor_single_round_trip(mock_supabase):
+    """Prueba que el registro hace una sola llamada atómica a la BD"""
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[{
+        'id': 1, 'name': 'Solo Uno', 'visit_count': 2, 'ip_address': '10.0.0.1'
+    }])
+    mock_supabase.reset_mock()
+    
+    register_visitor('Solo Uno', '10.0.0.1')
+    
+    # Una sola llamada RPC, sin SELECT previo ni UPDATE/INSERT separados
+    mock_supabase.rpc.assert_called_once_with('register_visitor', {
+        'p_name': 'Solo Uno',
+        'p_name_key': 'solo uno',
+        'p_ip_address': '10.0.0.1'
+    })
+    mock_supabase.table.assert_not_called()
+
+
 def test_register_visitor_without_ip(mock_supabase):
     """Prueba el registro sin dirección IP"""
     # Configurar mock
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(data=[])
-    mock_insert_response = MagicMock()
-    mock_insert_response.data = [{
+    mock_rpc_response = MagicMock()
+    mock_rpc_response.data = [{
         'id': 1,
         'name': 'No IP User',
         'visit_count': 1,
         'ip_address': None
     }]
-    mock_supabase.table().insert().execute.return_value = mock_insert_response
+    mock_supabase.rpc().execute.return_value = mock_rpc_response
     
     # Ejecutar sin IP
     result = register_visitor('No IP User', None)
@@ -210,13 +221,30 @@ def test_register_visitor_without_ip(mock_supabase):
     assert result['ip_address'] is None
 
 
-@patch('app.supabase')
+def test_register_visitor_empty_response(mock_supabase):
+    """Prueba que una respuesta vacía del servidor retorna None"""
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[])
+    
+    assert register_visitor('Ghost', '127.0.0.1') is None
+
+
+def test_register_visitor_fills_lru_only_for_a_queue(memory_repository):
+    """Prueba que en modo síncrono la LRU no se llena: solo la leen las colas"""
+    lru = VisitorLRU(10)
+    with patch('app.visitor_lru', lru), patch('app.spool_queue', None):
+        register_visitor('Ana Pérez')
+        assert lru.stats()['size'] == 0
+
+    with patch('app.visitor_lru', lru), patch('app.spool_queue', MagicMock()):
+        register_visitor('Ana Pérez')
+        assert lru.get('ana pérez')['visit_count'] == 5
+
+
 def test_hello_registers_visitor(mock_supabase, client):
     """Prueba que la ruta /hello registra al visitante en la BD"""
     # Configurar mock para nuevo visitante
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(data=[])
-    mock_insert_response = MagicMock()
-    mock_insert_response.data = [{
+    mock_rpc_response = MagicMock()
+    mock_rpc_response.data = [{
         'id': 1,
         'name': 'John Doe',
         'visit_count': 1,
@@ -224,7 +252,7 @@ def test_hello_registers_visitor(mock_supabase, client):
         'last_visit': datetime.now().isoformat(),
         'ip_address': '127.0.0.1'
     }]
-    mock_supabase.table().insert().execute.return_value = mock_insert_response
+    mock_supabase.rpc().execute.return_value = mock_rpc_response
     
     # Hacer request
     response = client.post('/hello', data={'name': 'John Doe'})
@@ -235,28 +263,18 @@ def test_hello_registers_visitor(mock_supabase, client):
     assert b'Informaci' in response.data  # "Información de Visita"
 
 
-@patch('app.supabase')
 def test_hello_shows_visit_count(mock_supabase, client):
     """Prueba que se muestra el número de visitas correcto"""
-    # Simular visitante con 3 visitas previas
-    existing_visitor = {
+    # Simular visitante con 3 visitas previas, actualizado a 4 por el servidor
+    updated = {
         'id': 1,
         'name': 'Repeat Visitor',
-        'visit_count': 3,
+        'visit_count': 4,
         'first_visit': '2025-10-25T10:00:00',
         'last_visit': '2025-10-29T10:00:00',
         'ip_address': '127.0.0.1'
     }
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(
-        data=[existing_visitor]
-    )
-    
-    # Configurar actualización a 4 visitas
-    updated = existing_visitor.copy()
-    updated['visit_count'] = 4
-    mock_supabase.table().update().eq().execute.return_value = MagicMock(
-        data=[updated]
-    )
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[updated])
     
     # Hacer request
     response = client.post('/hello', data={'name': 'Repeat Visitor'})
@@ -269,13 +287,11 @@ def test_hello_shows_visit_count(mock_supabase, client):
     assert '4' in html  # El contador debe mostrar 4
 
 
-@patch('app.supabase')
 def test_hello_shows_first_visit_message(mock_supabase, client):
     """Prueba que se muestra mensaje de primera visita"""
     # Configurar mock para nuevo visitante
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(data=[])
-    mock_insert_response = MagicMock()
-    mock_insert_response.data = [{
+    mock_rpc_response = MagicMock()
+    mock_rpc_response.data = [{
         'id': 1,
         'name': 'First Timer',
         'visit_count': 1,
@@ -283,7 +299,7 @@ def test_hello_shows_first_visit_message(mock_supabase, client):
         'last_visit': datetime.now().isoformat(),
         'ip_address': '127.0.0.1'
     }]
-    mock_supabase.table().insert().execute.return_value = mock_insert_response
+    mock_supabase.rpc().execute.return_value = mock_rpc_response
     
     # Hacer request
     response = client.post('/hello', data={'name': 'First Timer'})
@@ -293,27 +309,18 @@ def test_hello_shows_first_visit_message(mock_supabase, client):
     assert b'primera visita' in response.data
 
 
-@patch('app.supabase')
 def test_hello_shows_return_visit_message(mock_supabase, client):
     """Prueba que se muestra mensaje de visita de retorno"""
-    # Simular visitante que regresa
-    existing_visitor = {
+    # Simular visitante que regresa (tercera visita tras el upsert)
+    updated = {
         'id': 1,
         'name': 'Return Visitor',
-        'visit_count': 2,
+        'visit_count': 3,
         'first_visit': '2025-10-25T10:00:00',
         'last_visit': '2025-10-29T10:00:00',
         'ip_address': '127.0.0.1'
     }
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(
-        data=[existing_visitor]
-    )
-    
-    updated = existing_visitor.copy()
-    updated['visit_count'] = 3
-    mock_supabase.table().update().eq().execute.return_value = MagicMock(
-        data=[updated]
-    )
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[updated])
     
     # Hacer request
     response = client.post('/hello', data={'name': 'Return Visitor'})
@@ -325,31 +332,27 @@ def test_hello_shows_return_visit_message(mock_supabase, client):
     assert 'visita #3' in html
 
 
-@patch('app.supabase')
 def test_hello_captures_ip_address(mock_supabase, client):
     """Prueba que se captura la dirección IP del visitante"""
-    # Configurar mock
-    mock_supabase.table().select().eq().execute.return_value = MagicMock(data=[])
-    
     captured_data = {}
     
-    def capture_insert(data):
+    def capture_rpc(fn, params):
         nonlocal captured_data
-        captured_data.update(data)
+        captured_data.update(params)
         mock_response = MagicMock()
         mock_response.data = [{
             'id': 1,
-            'name': data['name'],
+            'name': params['p_name'],
             'visit_count': 1,
-            'first_visit': data.get('first_visit'),
-            'last_visit': data.get('last_visit'),
-            'ip_address': data.get('ip_address')
+            'first_visit': datetime.now().isoformat(),
+            'last_visit': datetime.now().isoformat(),
+            'ip_address': params.get('p_ip_address')
         }]
         mock_execute = MagicMock()
         mock_execute.execute.return_value = mock_response
         return mock_execute
     
-    mock_supabase.table().insert.side_effect = capture_insert
+    mock_supabase.rpc.side_effect = capture_rpc
     
     # Hacer request
     response = client.post('/hello', data={'name': 'IP Test User'})
@@ -357,18 +360,220 @@ def test_hello_captures_ip_address(mock_supabase, client):
     # Verificaciones
     assert response.status_code == 200
     # En tests, la IP suele ser 127.0.0.1
-    assert 'ip_address' in captured_data
-    assert captured_data['ip_address'] is not None
+    assert 'p_ip_address' in captured_data
+    assert captured_data['p_ip_address'] is not None
 
 
-@patch('app.supabase')
 def test_register_visitor_database_error(mock_supabase):
     """Prueba el manejo de errores de base de datos"""
     # Simular un error de base de datos
-    mock_supabase.table().select().eq().execute.side_effect = Exception("Database error")
+    mock_supabase.rpc().execute.side_effect = Exception("Database error")
     
     # Ejecutar la función
     result = register_visitor('Error User', '127.0.0.1')
     
     # Debe retornar None o dict vacío en caso de error
     assert result is None or result == {}
+
+
+# ============================================================================
+# PRUEBAS DEL MODO WRITE-BEHIND
+# ============================================================================
+
+def test_register_visitor_write_behind_skips_database(mock_supabase):
+    """Prueba que en modo write-behind el registro no espera a la BD"""
+    write_queue = VisitorWriteBehindQueue(MagicMock(return_value=[]))
+    with patch('app.write_queue', write_queue):
+        result = register_visitor('Queued User', '127.0.0.1')
+
+    assert result['visit_count'] == 1
+    mock_supabase.rpc.assert_not_called()
+    assert write_queue.stats()['queue_depth'] == 1
+
+
+def test_register_visitor_write_behind_full_falls_back(mock_supabase):
+    """Prueba que con la cola llena se registra de forma síncrona"""
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[{
+        'id': 1, 'name': 'Overflow', 'visit_count': 1, 'ip_address': None
+    }])
+    write_queue = VisitorWriteBehindQueue(MagicMock(), max_pending=0)
+    with patch('app.write_queue', write_queue):
+        result = register_visitor('Overflow')
+
+    assert result['name'] == 'Overflow'
+    assert write_queue.stats()['rejected'] == 1
+
+
+def test_flush_visitors_batch_uses_batch_rpc(mock_supabase):
+    """Prueba que el lote se envía con una sola llamada RPC"""
+    mock_supabase.rpc().execute.return_value = MagicMock(data=[{'name': 'A', 'visit_count': 2}])
+    mock_supabase.reset_mock()
+
+    rows = flush_visitors_batch([{'name': 'A', 'increment': 2}])
+
+    assert rows == [{'name': 'A', 'visit_count': 2}]
+    mock_supabase.rpc.assert_called_once_with(
+        'register_visitors_batch', {'p_visits': [{'name': 'A', 'name_key': 'a', 'increment': 2}]}
+    )
+
+
+# ============================================================================
+# PRUEBAS DEL LISTADO PAGINADO (/visitors)
+# ============================================================================
+
+def test_visitors_page_limit_and_next_link(memory_repository, client):
+    """Prueba que ?limit= trae solo una página y enlaza a la siguiente"""
+    response = client.get('/visitors?limit=2')
+    html = response.data.decode('utf-8')
+
+    assert response.status_code == 200
+    assert 'Carla' in html and 'Ana' in html and 'Luis' not in html
+    assert 'rel="next"' in html and 'rel="prev"' not in html
+    # Los totales cubren toda la tabla, no solo la página
+    assert 'Total de visitas: <strong>9</strong>' in html
+
+
+def test_visitors_follow_next_cursor(memory_repository, client):
+    """Prueba que el cursor de la siguiente página continúa el orden"""
+    first = fetch_page(memory_repository, 2)
+    response = client.get(f"/visitors?limit=2&after={first['next_cursor']}")
+    html = response.data.decode('utf-8')
+
+    assert 'Luis' in html and 'Carla' not in html
+    assert 'rel="prev"' in html and 'rel="next"' not in html
+
+
+def test_visitors_dates_come_formatted(memory_repository, client):
+    """Prueba que la tabla muestra las dos fechas formateadas por la plantilla"""
+    html = client.get('/visitors').data.decode('utf-8')
+
+    assert '<td>2025-10-01 00:00:00</td>' in html
+    assert '<td>2025-10-30 10:30:00</td>' in html
+    assert '2025-10-30T10:30:00' not in html
+
+
+def test_visitors_invalid_cursor(memory_repository, client):
+    """Prueba que un cursor inválido responde 400"""
+    response = client.get('/visitors?after=basura')
+    assert response.status_code == 400
+
+
+def test_visitors_cache_serves_repeated_reads(memory_repository, client):
+    """Prueba que con caché activa las lecturas repetidas no consultan el repositorio"""
+    with patch('app.visitors_cache', TTLCache(ttl=60)), \
+         patch.object(memory_repository, 'totals', wraps=memory_repository.totals) as totals:
+        client.get('/visitors')
+        client.get('/visitors')
+        assert totals.call_count == 1
+
+        # Registrar un visitante invalida la caché
+        register_visitor('Nuevo')
+        html = client.get('/visitors').data.decode('utf-8')
+        assert totals.call_count == 2
+        assert 'Nuevo' in html
+
+
+def test_visitors_page_cache_follows_totals_version(memory_repository, client):
+    """Prueba que unos totales recargados no se sirven con una página cacheada anterior"""
+    now = [0]
+    with patch('app.visitors_cache', TTLCache(ttl=10, clock=lambda: now[0])):
+        client.get('/visitors?limit=1')
+        now[0] = 5
+        client.get('/visitors?limit=2')       # página cacheada hasta t=15
+
+        memory_repository.register('Nuevo')   # escritura de otro worker: no invalida
+        now[0] = 11                           # los totales caducan, la página no
+        html = client.get('/visitors?limit=2').data.decode('utf-8')
+
+    assert 'Nuevo' in html
+    assert 'Total de visitas: <strong>10</strong>' in html
+
+
+def test_visitors_etag_matches_rendered_rows(memory_repository, client):
+    """Prueba que tras una escritura de otro worker el ETag viejo no da 304 y el nuevo describe las filas"""
+    now = [0]
+    with patch('app.visitors_cache', TTLCache(ttl=10, clock=lambda: now[0])):
+        client.get('/visitors?limit=1')
+        now[0] = 5
+        old_etag = client.get('/visitors?limit=2').headers['ETag']
+
+        memory_repository.register('Nuevo')
+        now[0] = 11
+        response = client.get('/visitors?limit=2', headers={'If-None-Match': old_etag})
+        assert response.status_code == 200
+        assert 'Nuevo' in response.data.decode('utf-8')
+        assert response.headers['ETag'] != old_etag
+
+        revalidated = client.get('/visitors?limit=2',
+                                 headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_visitors_stream_render(memory_repository, client):
+    """Prueba el render en streaming: misma página y paginador tras la tabla"""
+    with patch('app.VISITORS_RENDER_MODE', 'stream'), patch('app.VISITORS_STREAM_CHUNK_SIZE', 1):
+        response = client.get('/visitors?limit=2')
+        assert response.is_streamed
+        html = response.get_data(as_text=True)
+
+    assert html.index('Carla') < html.index('Ana') and 'Luis' not in html
+    assert 'rel="next"' in html and 'rel="prev"' not in html
+    assert 'Total de visitas: <strong>9</strong>' in html
+
+
+def test_visitors_not_modified_skips_page_query(memory_repository, client):
+    """Prueba que con el ETag vigente /visitors responde 304 sin consultar la página"""
+    first = client.get('/visitors')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"v3.9')
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert first.last_modified is not None
+
+    with patch.object(memory_repository, 'list_by_last_visit') as listing:
+        response = client.get('/visitors', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    listing.assert_not_called()
+
+    # Una visita nueva cambia la versión
+    memory_repository.register('Nuevo')
+    assert client.get('/visitors', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_visitors_if_modified_since(memory_repository, client):
+    """Prueba la revalidación por fecha de la última visita"""
+    modified = client.get('/visitors').headers['Last-Modified']
+    response = client.get('/visitors', headers={'If-Modified-Since': modified})
+    assert response.status_code == 304
+
+
+def test_visitors_stream_render_not_modified(memory_repository, client):
+    """Prueba que el render en streaming también responde 304"""
+    with patch('app.VISITORS_RENDER_MODE', 'stream'):
+        etag = client.get('/visitors').headers['ETag']
+        response = client.get('/visitors', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_visitors_stream_render_error_aborts_and_is_not_revalidated(memory_repository, client):
+    """Prueba que un fallo a mitad del streaming corta la respuesta y no deja un 304 pendiente"""
+    with patch('app.VISITORS_RENDER_MODE', 'stream'), patch('app.VISITORS_STREAM_CHUNK_SIZE', 1):
+        with patch.object(memory_repository, 'list_by_last_visit',
+                          side_effect=[memory_repository.list_by_last_visit(1),
+                                       ConnectionError('caído')]):
+            with pytest.raises(ConnectionError):
+                client.get('/visitors?limit=2').get_data()
+
+        # Sin una respuesta completa el navegador no guarda la página ni su ETag:
+        # la siguiente petición, ya con la BD recuperada, recibe la tabla entera
+        response = client.get('/visitors?limit=2')
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+    assert 'Carla' in html and 'Ana' in html
+
+
+def test_visitors_stream_render_invalid_cursor(memory_repository, client):
+    """Prueba que en streaming un cursor inválido responde 400 antes de enviar la página"""
+    with patch('app.VISITORS_RENDER_MODE', 'stream'):
+        response = client.get('/visitors?after=basura')
+    assert response.status_code == 400
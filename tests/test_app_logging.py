@@ -0,0 +1,83 @@
+"""
+Pruebas unitarias para el logging con cola y muestreo
+"""
+import io
+import json
+import logging
+import queue
+import pytest
+from app_logging import (REQUEST_LOGGER, DroppingQueueHandler, SamplingFilter,
+                         configure_logging, stop_logging)
+
+
+@pytest.fixture
+def output():
+    """Configura el logging hacia un buffer y restaura la configuración al final"""
+    stream = io.StringIO()
+    yield stream
+    configure_logging()
+
+
+def _lines(stream):
+    stop_logging()  # vacía la cola del escritor de fondo
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_include_extra_fields(output):
+    """Prueba que cada registro es una línea JSON con los campos de `extra`"""
+    configure_logging(level='INFO', fmt='json', stream=output)
+    logging.getLogger('app').error('Error al registrar %s', 'Ana', extra={'visitor': 'Ana'})
+
+    [entry] = _lines(output)
+    assert entry['level'] == 'ERROR'
+    assert entry['logger'] == 'app'
+    assert entry['msg'] == 'Error al registrar Ana'
+    assert entry['visitor'] == 'Ana'
+
+
+def test_success_messages_are_debug_only(output):
+    """Prueba que los mensajes DEBUG no se emiten con el nivel por defecto"""
+    configure_logging(level='INFO', stream=output)
+    logging.getLogger('app').debug('Nuevo visitante registrado')
+    assert _lines(output) == []
+
+
+def test_request_lines_off_by_default(output):
+    """Prueba que las líneas por petición están desactivadas salvo muestreo"""
+    configure_logging(level='INFO', sample_rate=0, stream=output)
+    request_log = logging.getLogger(REQUEST_LOGGER)
+
+    assert not request_log.isEnabledFor(logging.INFO)
+    request_log.info('Request for index page received')
+    request_log.warning('Cola llena')
+
+    assert [e['msg'] for e in _lines(output)] == ['Cola llena']
+
+
+def test_request_lines_with_full_sampling(output):
+    """Prueba que con muestreo 1 se emiten todas las líneas por petición"""
+    configure_logging(level='INFO', sample_rate=1, stream=output)
+    for _ in range(3):
+        logging.getLogger(REQUEST_LOGGER).info('Request for index page received')
+    assert len(_lines(output)) == 3
+
+
+def test_sampling_filter_keeps_warnings():
+    """Prueba que el muestreo nunca descarta advertencias ni errores"""
+    sampling = SamplingFilter(0)
+    info = logging.LogRecord('app.request', logging.INFO, '', 0, 'x', None, None)
+    warning = logging.LogRecord('app.request', logging.WARNING, '', 0, 'x', None, None)
+    assert not sampling.filter(info)
+    assert sampling.filter(warning)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Prueba que con la cola llena los registros se descartan y se cuentan"""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord('app', logging.INFO, '', 0, 'x', None, None)
+
+    handler.handle(record)
+    handler.handle(record)
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
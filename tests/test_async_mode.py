@@ -0,0 +1,95 @@
+"""
+Pruebas del modo de servicio async (APP_SERVING_MODE=async)
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app import app, hello_async, list_visitors_async
+from async_repository import (AsyncSupabaseVisitorRepository, DatabaseLoop,
+                              ThreadedAsyncVisitorRepository)
+from visitor_repository import InMemoryVisitorRepository
+
+pytest.importorskip('asgiref', reason="Las vistas async de Flask requieren flask[async]")
+
+
+@pytest.fixture(scope='module')
+def db_loop():
+    """Loop de BD compartido por las pruebas del módulo"""
+    loop = DatabaseLoop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def async_client(db_loop):
+    """Cliente de prueba con las vistas async y un repositorio en memoria"""
+    repository = InMemoryVisitorRepository()
+    with patch('app.db_loop', db_loop), \
+         patch('app.async_visitor_repository', ThreadedAsyncVisitorRepository(repository)), \
+         patch.dict(app.view_functions, {'hello': hello_async,
+                                         'list_visitors': list_visitors_async}):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client, repository
+
+
+def test_async_hello_registers_visitor(async_client):
+    """Prueba que /hello async registra y muestra la visita"""
+    client, repository = async_client
+    client.post('/hello', data={'name': 'Async Ana'})
+    response = client.post('/hello', data={'name': 'Async Ana'})
+
+    assert response.status_code == 200
+    assert 'visita #2' in response.data.decode('utf-8')
+    totals = repository.totals()
+    assert (totals['total_unique'], totals['total_visits']) == (1, 2)
+
+
+def test_async_hello_without_name_redirects(async_client):
+    """Prueba que /hello async sin nombre redirige al inicio"""
+    client, _ = async_client
+    response = client.post('/hello', data={'name': ''})
+
+    assert response.status_code == 302
+    assert response.location == '/'
+
+
+def test_async_visitors_listing(async_client):
+    """Prueba que /visitors async muestra la página y los totales"""
+    client, repository = async_client
+    for name in ('Luis', 'Carla', 'Carla'):
+        repository.register(name)
+
+    html = client.get('/visitors').data.decode('utf-8')
+
+    assert 'Visitantes únicos: <strong>2</strong>' in html
+    assert 'Total de visitas: <strong>3</strong>' in html
+
+
+def test_async_visitors_invalid_cursor(async_client):
+    """Prueba que un cursor inválido responde 400 también en modo async"""
+    client, _ = async_client
+    assert client.get('/visitors?after=basura').status_code == 400
+
+
+def test_async_visitors_not_modified(async_client):
+    """Prueba que /visitors async responde 304 con el ETag vigente"""
+    client, repository = async_client
+    repository.register('Luis')
+
+    etag = client.get('/visitors').headers['ETag']
+    assert client.get('/visitors', headers={'If-None-Match': etag}).status_code == 304
+
+    repository.register('Luis')
+    assert client.get('/visitors', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_async_supabase_repository_uses_async_client(db_loop):
+    """Prueba que el repositorio async espera las consultas del cliente async"""
+    client = MagicMock()
+    client.rpc.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=[{'total_unique': 4, 'total_visits': 10}]))
+    repository = AsyncSupabaseVisitorRepository(AsyncMock(return_value=client))
+
+    assert db_loop.call(repository.totals()) == {
+        'total_unique': 4, 'total_visits': 10, 'last_visit': None}
+    client.rpc.assert_called_with('visitor_totals')
@@ -0,0 +1,35 @@
+"""
+Pruebas unitarias para el cálculo definitivo de name_key en Supabase
+"""
+from unittest.mock import MagicMock
+from backfill_name_key import backfill_name_keys, pending_keys
+
+
+def _client(*pages):
+    """Cliente de Supabase simulado que devuelve `pages` en consultas sucesivas"""
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.gt.return_value
+    query.order.return_value.limit.return_value.execute.side_effect = [
+        MagicMock(data=page) for page in pages]
+    return client
+
+
+def test_pending_keys_only_mismatched_with_normalize_name():
+    """Prueba que solo se corrigen las claves distintas de normalize_name, por páginas de id"""
+    client = _client(
+        [{'id': 1, 'name': 'Ana', 'name_key': 'ana'},
+         {'id': 4, 'name': 'Straße', 'name_key': 'PENDIENTE:4'}],
+        [{'id': 7, 'name': 'STRASSE', 'name_key': 'strasse'}])
+
+    assert list(pending_keys(client, page_size=2)) == [[{'id': 4, 'name_key': 'strasse'}]]
+    client.table.return_value.select.return_value.gt.assert_called_with('id', 4)
+
+
+def test_backfill_sends_changes_to_rekey():
+    """Prueba que las claves corregidas van a rekey_visitors y se suman las fusiones"""
+    client = _client([{'id': 3, 'name': ' JOSÉ ', 'name_key': 'PENDIENTE:3'}])
+    client.rpc.return_value.execute.return_value = MagicMock(data=1)
+
+    assert backfill_name_keys(client) == {'updated': 1, 'merged': 1}
+    client.rpc.assert_called_once_with('rekey_visitors',
+                                       {'p_keys': [{'id': 3, 'name_key': 'josé'}]})
@@ -0,0 +1,127 @@
+"""
+Pruebas unitarias para la caché TTL con single-flight
+"""
+import threading
+import pytest
+from unittest.mock import MagicMock
+from cache import TTLCache, VisitorLRU
+
+
+class FakeClock:
+    """Reloj controlable para simular el paso del tiempo"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_within_ttl_and_expiry():
+    """Prueba que la entrada se reutiliza dentro del TTL y se recarga al expirar"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=2, clock=clock)
+    loader = MagicMock(side_effect=[1, 2])
+
+    assert cache.get_or_load('k', loader) == 1
+    clock.now = 1.5
+    assert cache.get_or_load('k', loader) == 1
+    clock.now = 2.5
+    assert cache.get_or_load('k', loader) == 2
+    assert loader.call_count == 2
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 2}
+
+
+def test_invalidate_forces_reload():
+    """Prueba que invalidar descarta las entradas vigentes"""
+    cache = TTLCache(ttl=60)
+    loader = MagicMock(side_effect=['viejo', 'nuevo'])
+
+    cache.get_or_load('k', loader)
+    cache.invalidate()
+
+    assert cache.get_or_load('k', loader) == 'nuevo'
+
+
+def test_maxsize_evicts_least_recently_used():
+    """Prueba que la caché no supera maxsize"""
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.get_or_load('a', lambda: 1)
+    cache.get_or_load('b', lambda: 2)
+    cache.get_or_load('a', lambda: 1)
+    cache.get_or_load('c', lambda: 3)
+
+    assert cache.stats()['size'] == 2
+    assert cache.get_or_load('a', lambda: 'recargado') == 1
+    assert cache.get_or_load('b', lambda: 'recargado') == 'recargado'
+
+
+def test_zero_ttl_does_not_store():
+    """Prueba que con TTL 0 cada lectura va al loader"""
+    cache = TTLCache(ttl=0)
+    loader = MagicMock(return_value=1)
+    cache.get_or_load('k', loader)
+    cache.get_or_load('k', loader)
+
+    assert loader.call_count == 2
+
+
+def test_concurrent_misses_share_one_load():
+    """Prueba que N fallos concurrentes de la misma clave hacen una sola carga"""
+    cache = TTLCache(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return 'listado'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('k', slow_loader)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    while cache.stats()['misses'] < 8:
+        release.wait(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ['listado'] * 8
+
+
+def test_loader_error_is_not_cached():
+    """Prueba que un error del loader se propaga y no se guarda"""
+    cache = TTLCache(ttl=60)
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('k', MagicMock(side_effect=RuntimeError("BD caída")))
+
+    assert cache.get_or_load('k', lambda: 'ok') == 'ok'
+
+
+def test_invalidation_during_load_discards_result():
+    """Prueba que una carga iniciada antes de invalidar no queda en caché"""
+    cache = TTLCache(ttl=60)
+
+    def loader():
+        cache.invalidate()  # una escritura llega mientras se consulta
+        return 'desactualizado'
+
+    assert cache.get_or_load('k', loader) == 'desactualizado'
+    assert cache.get_or_load('k', lambda: 'fresco') == 'fresco'
+
+
+def test_visitor_lru_keyed_by_name_key_and_bounded():
+    """Prueba la LRU de visitantes: clave normalizada, límite y tasa de aciertos"""
+    lru = VisitorLRU(maxsize=2)
+    lru.update({'id': 1, 'name': 'Ana', 'visit_count': 3, 'ip_address': '10.0.0.1'})
+    lru.update({'id': 2, 'name': 'Luis', 'name_key': 'luis', 'visit_count': 1})
+
+    assert lru.get('ana')['visit_count'] == 3
+    lru.update({'id': 3, 'name': 'Carla', 'visit_count': 1})  # descarta a Luis
+
+    assert lru.get('luis') is None
+    assert lru.stats() == {'size': 2, 'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
+
@@ -0,0 +1,175 @@
+"""
+Pruebas unitarias para el circuit breaker de la base de datos y el modo degradado
+"""
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from cache import LastValueCache
+from circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError,
+                             GuardedRepository)
+from visitor_queue import VisitorWriteBehindQueue
+from visitor_repository import InMemoryVisitorRepository
+
+
+class FakeClock:
+    """Reloj manual para avanzar el tiempo en las pruebas"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail():
+    raise ConnectionError('Supabase caído')
+
+
+def _trip(breaker, calls):
+    for _ in range(calls):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_opens_at_failure_rate_and_fails_fast(clock):
+    """Prueba que el circuito se abre al superar la tasa y rechaza sin llamar"""
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, clock=clock)
+    breaker.call(lambda: 'ok')
+    breaker.call(lambda: 'ok')
+    _trip(breaker, 1)
+    assert breaker.state == CLOSED  # 1 de 3: aún sin llamadas suficientes
+
+    _trip(breaker, 1)
+    assert breaker.state == OPEN
+
+    fn = MagicMock()
+    with pytest.raises(CircuitOpenError):
+        breaker.call(fn)
+    fn.assert_not_called()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    """Prueba la llamada de prueba tras open_timeout"""
+    breaker = CircuitBreaker(min_calls=1, open_timeout=10, clock=clock)
+    _trip(breaker, 1)
+    clock.now = 9
+    assert not breaker.available
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.available
+    _trip(breaker, 1)
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+    assert breaker.stats()['opened'] == 2
+
+
+def test_half_open_limits_concurrent_probes(clock):
+    """Prueba que en semiabierto solo pasan half_open_calls llamadas a la vez"""
+    breaker = CircuitBreaker(min_calls=1, open_timeout=1, half_open_calls=1, clock=clock)
+    _trip(breaker, 1)
+    clock.now = 1
+
+    breaker.acquire()
+    assert not breaker.available
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.record(0.01, error=False)
+    assert breaker.state == CLOSED
+
+
+def test_old_failures_leave_the_window(clock):
+    """Prueba que los fallos fuera de la ventana no cuentan"""
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window=30, clock=clock)
+    _trip(breaker, 1)
+    clock.now = 31
+    breaker.call(lambda: 'ok')
+    assert breaker.stats() == {'state': CLOSED, 'calls': 1, 'failures': 0,
+                               'opened': 0, 'rejected': 0}
+
+
+def test_slow_calls_count_as_failures(clock):
+    """Prueba que una llamada más lenta que slow_call_ms cuenta como fallo"""
+    breaker = CircuitBreaker(min_calls=1, slow_call_ms=100, clock=clock)
+    breaker.acquire()
+    breaker.record(0.2, error=False)
+    assert breaker.state == OPEN
+
+
+def test_guarded_repository_sync_and_async(clock):
+    """Prueba que los métodos sync y async del repositorio pasan por el circuito"""
+    class AsyncRepository:
+        async def totals(self):
+            raise ConnectionError('caído')
+
+    breaker = CircuitBreaker(min_calls=1, clock=clock)
+    repository = GuardedRepository(InMemoryVisitorRepository(), breaker)
+    assert repository.register('Ana')['visit_count'] == 1
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(GuardedRepository(AsyncRepository(), breaker).totals())
+    with pytest.raises(CircuitOpenError):
+        repository.totals()
+
+
+def test_queue_waits_while_circuit_open():
+    """Prueba que el envío periódico de la cola se pospone con el circuito abierto"""
+    flush_fn = MagicMock(return_value=[])
+    available = MagicMock(return_value=False)
+    q = VisitorWriteBehindQueue(flush_fn, flush_interval_ms=5, can_flush=available)
+    q.submit('Ana')
+    q.start()
+    deadline = time.monotonic() + 2
+    while available.call_count < 3 and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    flush_fn.assert_not_called()
+    q.close()  # al apagar se envía lo pendiente igualmente
+    flush_fn.assert_called_once()
+
+
+def test_open_circuit_spools_registration(client, clock):
+    """Prueba que /hello guarda la visita en el spool sin esperar a la BD"""
+    breaker = CircuitBreaker(min_calls=1, clock=clock)
+    failing = MagicMock()
+    failing.register.side_effect = ConnectionError('caído')
+    spool = VisitorWriteBehindQueue(MagicMock(return_value=[]))
+
+    with patch('app.visitor_repository', GuardedRepository(failing, breaker)), \
+         patch('app.spool_queue', spool):
+        client.post('/hello', data={'name': 'Ana'})  # abre el circuito
+        response = client.post('/hello', data={'name': 'Ana'})
+
+    assert response.status_code == 200
+    assert failing.register.call_count == 1
+    assert spool.stats()['pending_visits'] == 1
+
+
+def test_open_circuit_serves_last_listing(client, clock):
+    """Prueba que /visitors sirve la última versión conocida si el circuito está abierto"""
+    breaker = CircuitBreaker(min_calls=1, clock=clock)
+    repository = InMemoryVisitorRepository()
+    repository.register('Ana')
+
+    with patch('app.visitor_repository', GuardedRepository(repository, breaker)), \
+         patch('app.last_listing', LastValueCache()):
+        fresh = client.get('/visitors')
+        breaker._open(clock())
+        stale = client.get('/visitors')
+
+    assert 'ETag' in fresh.headers
+    assert stale.status_code == 200
+    assert 'ETag' not in stale.headers
+    html = stale.data.decode('utf-8')
+    assert 'Ana' in html
+    assert 'última versión conocida' in html
@@ -0,0 +1,93 @@
+"""
+Pruebas unitarias para la compresión de respuestas
+"""
+import gzip
+import zlib
+import pytest
+from flask import Flask, Response, stream_with_context
+from compression import compress_stream, init_app
+
+
+@pytest.fixture
+def compression_client():
+    """Aplicación mínima con la compresión activada"""
+    app = Flask(__name__)
+    init_app(app, enabled=True, min_size=100, level=6)
+
+    @app.get('/big')
+    def big():
+        return '<tr><td>Ana</td></tr>' * 200
+
+    @app.get('/small')
+    def small():
+        return 'hola'
+
+    @app.get('/stream')
+    def stream():
+        return Response(stream_with_context(f'linea {i}\n' for i in range(500)),
+                        mimetype='text/plain')
+
+    @app.get('/etag')
+    def etag():
+        response = Response('x' * 500, mimetype='text/plain')
+        response.set_etag('abc')
+        return response
+
+    with app.test_client() as compression_client:
+        yield compression_client
+
+
+def test_disabled_by_default(monkeypatch):
+    """Prueba que sin RESPONSE_COMPRESSION=1 no se instala"""
+    monkeypatch.delenv('RESPONSE_COMPRESSION', raising=False)
+    assert init_app(Flask(__name__)) is False
+
+
+def test_gzip_large_response(compression_client):
+    """Prueba que una respuesta grande se comprime si el cliente acepta gzip"""
+    response = compression_client.get('/big', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == b'<tr><td>Ana</td></tr>' * 200
+    assert int(response.headers['Content-Length']) == len(response.data)
+
+
+def test_small_or_not_accepted_responses_untouched(compression_client):
+    """Prueba el umbral mínimo y la negociación sin Accept-Encoding"""
+    small = compression_client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    plain = compression_client.get('/big', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+
+def test_streamed_response_is_compressed_incrementally(compression_client):
+    """Prueba que el streaming se comprime por bloques y se puede descomprimir"""
+    response = compression_client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    body = b''.join(response.response)
+    assert gzip.decompress(body).decode() == ''.join(f'linea {i}\n' for i in range(500))
+
+
+def test_stream_chunks_are_flushed():
+    """Prueba que cada bloque produce salida descomprimible sin esperar al final"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = compress_stream(iter([b'primero ', b'segundo']), 'gzip', 6, 4)
+    assert decompressor.decompress(next(chunks)) == b'primero '
+
+
+def test_strong_etag_becomes_weak(compression_client):
+    """Prueba que el ETag fuerte pasa a débil al cambiar el cuerpo"""
+    response = compression_client.get('/etag', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['ETag'] == 'W/"abc"'
+
+
+def test_brotli_preferred(compression_client):
+    """Prueba que brotli tiene preferencia cuando está disponible"""
+    brotli = pytest.importorskip('brotli')
+    response = compression_client.get('/big', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == b'<tr><td>Ana</td></tr>' * 200
@@ -0,0 +1,87 @@
+"""
+Pruebas unitarias para los backends de contadores
+"""
+import multiprocessing
+import os
+import threading
+import pytest
+from counters import (LocalCounters, SharedMemoryCounters, SQLiteCounters,
+                      create_counters)
+
+
+@pytest.fixture(params=['local', 'shm', 'sqlite'])
+def counters(request, tmp_path):
+    """Fixture con cada backend de contadores"""
+    if request.param == 'local':
+        return LocalCounters()
+    if request.param == 'shm':
+        if os.name != 'posix':
+            pytest.skip("El backend shm requiere POSIX")
+        return SharedMemoryCounters(str(tmp_path / 'counters.shm'))
+    return SQLiteCounters(str(tmp_path / 'counters.db'))
+
+
+def test_increment_get_and_reset(counters):
+    """Prueba incrementar, leer y reiniciar los contadores"""
+    assert counters.increment('visits') == 1
+    assert counters.increment('visits') == 2
+    assert counters.increment('greetings') == 1
+    assert counters.get('visits') == 2
+
+    counters.reset()
+
+    assert counters.get('visits') == 0
+    assert counters.get('greetings') == 0
+    assert counters.increment('visits') == 1
+
+
+def test_concurrent_increments_are_atomic(counters):
+    """Prueba que incrementos desde varios hilos no se pierden"""
+    def worker():
+        for _ in range(200):
+            counters.increment('visits')
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counters.get('visits') == 800
+
+
+def _increment_in_child(path, times):
+    shared = SharedMemoryCounters(path)
+    for _ in range(times):
+        shared.increment('greetings')
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="El backend shm requiere POSIX")
+def test_shared_memory_is_coherent_across_processes(tmp_path):
+    """Prueba que varios procesos comparten los mismos contadores y el reinicio"""
+    path = str(tmp_path / 'counters.shm')
+    parent = SharedMemoryCounters(path)
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_increment_in_child, args=(path, 250)) for _ in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    assert parent.get('greetings') == 750
+
+    SharedMemoryCounters(path).reset()
+    assert parent.get('greetings') == 0
+
+
+def test_create_counters_backends(tmp_path, monkeypatch):
+    """Prueba que la fábrica respeta COUNTER_BACKEND"""
+    monkeypatch.setenv('COUNTER_SQLITE_PATH', str(tmp_path / 'c.db'))
+    monkeypatch.setenv('COUNTER_SHM_PATH', str(tmp_path / 'c.shm'))
+    assert isinstance(create_counters(), LocalCounters)
+    assert isinstance(create_counters('sqlite'), SQLiteCounters)
+    if os.name == 'posix':
+        assert isinstance(create_counters('shm'), SharedMemoryCounters)
+
+    with pytest.raises(ValueError):
+        create_counters('redis')
@@ -0,0 +1,66 @@
+"""
+Pruebas unitarias para la creación diferida del cliente de Supabase
+"""
+import asyncio
+import pytest
+import database
+
+FAKE_URL = 'https://example.supabase.co'
+FAKE_KEY = 'eyJhbGciOiJIUzI1NiJ9.e30.x'
+
+
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    """Credenciales falsas y sin clientes creados"""
+    monkeypatch.setattr(database, 'SUPABASE_URL', FAKE_URL)
+    monkeypatch.setattr(database, 'SUPABASE_KEY', FAKE_KEY)
+    monkeypatch.setattr(database, '_supabase', None)
+    monkeypatch.setattr(database, '_async_supabase', None)
+
+
+def test_client_created_on_first_use(fresh_clients):
+    """Prueba que el cliente se crea en el primer uso y se reutiliza"""
+    assert database._supabase is None
+
+    client = database.get_supabase_client()
+
+    assert database.get_supabase_client() is client
+
+
+def test_client_uses_configured_pool(fresh_clients):
+    """Prueba que PostgREST usa el pool HTTP configurado con keep-alive"""
+    session = database.get_supabase_client().postgrest.session
+    pool = session._transport._pool
+
+    assert pool._max_connections == database.POOL_SIZE
+    assert pool._max_keepalive_connections == database.POOL_KEEPALIVE
+    assert session.timeout.connect == database.CONNECT_TIMEOUT
+    assert session.timeout.read == database.READ_TIMEOUT
+
+
+def test_fork_discards_parent_client(fresh_clients):
+    """Prueba que tras un fork el hijo crea su propio cliente"""
+    parent = database.get_supabase_client()
+
+    database._reset_after_fork()
+
+    assert database.get_supabase_client() is not parent
+
+
+def test_missing_credentials_raise_on_use(monkeypatch):
+    """Prueba que faltar credenciales falla al usar el cliente, no al importar"""
+    monkeypatch.setattr(database, 'SUPABASE_URL', None)
+    monkeypatch.setattr(database, '_supabase', None)
+
+    with pytest.raises(ValueError):
+        database.get_supabase_client()
+
+
+def test_async_client_uses_configured_pool(fresh_clients):
+    """Prueba que el cliente async también usa el pool configurado"""
+    async def get_session():
+        client = await database.get_async_supabase_client()
+        return client.postgrest.session
+
+    session = asyncio.run(get_session())
+    assert session._transport._pool._max_connections == database.POOL_SIZE
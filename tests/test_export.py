@@ -0,0 +1,106 @@
+"""
+Pruebas unitarias para la exportación en streaming de visitantes
+"""
+import csv
+import io
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from export import export_visitors, iter_visitor_chunks
+from visitor_repository import InMemoryVisitorRepository
+
+
+def test_chunks_cover_table_with_keyset(numbered_repository):
+    """Prueba que los bloques recorren toda la tabla sin repetir filas"""
+    chunks = list(iter_visitor_chunks(numbered_repository, 2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert [r['name'] for c in chunks for r in c] == ['V4', 'V3', 'V2', 'V1', 'V0']
+
+
+def test_chunks_use_cursor_of_previous_chunk():
+    """Prueba que cada consulta continúa desde la última fila del bloque anterior"""
+    repo = MagicMock()
+    repo.list_by_last_visit.side_effect = [
+        [{'id': 2, 'last_visit': 'b'}, {'id': 1, 'last_visit': 'a'}], []]
+
+    list(iter_visitor_chunks(repo, 2))
+
+    assert repo.list_by_last_visit.call_args_list[1].kwargs['after'] == ('a', 1)
+
+
+def test_csv_stream_yields_one_fragment_per_chunk(numbered_repository):
+    """Prueba que el CSV se genera incrementalmente con cabecera"""
+    fragments = list(export_visitors(numbered_repository, 'csv', 2))
+    assert len(fragments) == 3
+
+    rows = list(csv.DictReader(io.StringIO(''.join(fragments))))
+    assert [r['name'] for r in rows] == ['V4', 'V3', 'V2', 'V1', 'V0']
+    assert rows[0]['visit_count'] == '5'
+
+
+def test_csv_empty_table_has_header():
+    """Prueba que sin visitantes el CSV contiene solo la cabecera"""
+    body = ''.join(export_visitors(InMemoryVisitorRepository(), 'csv', 10))
+    assert body.strip() == 'id,name,first_visit,last_visit,visit_count'
+
+
+def test_database_error_mid_stream_is_raised():
+    """Prueba que un fallo a mitad de la descarga se propaga tras lo ya enviado"""
+    repo = MagicMock()
+    repo.list_by_last_visit.side_effect = [
+        [{'id': 1, 'name': 'Ana', 'last_visit': 'a'}], Exception('Connection error')]
+
+    body = export_visitors(repo, 'ndjson', 1)
+    assert json.loads(next(body))['name'] == 'Ana'
+    with pytest.raises(Exception, match='Connection error'):
+        next(body)
+
+
+def test_database_error_on_first_chunk_is_raised_before_streaming():
+    """Prueba que el primer bloque se lee al crear la exportación"""
+    repo = MagicMock()
+    repo.list_by_last_visit.side_effect = ConnectionError('caído')
+
+    with pytest.raises(ConnectionError):
+        export_visitors(repo, 'csv', 10)
+
+
+def test_export_route_ndjson(client, numbered_repository):
+    """Prueba la descarga NDJSON desde la ruta"""
+    with patch('app.visitor_repository', numbered_repository):
+        response = client.get('/visitors/export?format=ndjson')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'visitors.ndjson' in response.headers['Content-Disposition']
+    names = [json.loads(line)['name'] for line in response.get_data(as_text=True).splitlines()]
+    assert names == ['V4', 'V3', 'V2', 'V1', 'V0']
+
+
+def test_export_route_rejects_unknown_format(client):
+    """Prueba que un formato desconocido responde 400"""
+    response = client.get('/visitors/export?format=xml')
+    assert response.status_code == 400
+
+
+def test_export_route_database_down_is_503(client):
+    """Prueba que con la BD caída la descarga responde 503 en lugar de un 200 vacío"""
+    with patch('app.visitor_repository') as failing:
+        failing.list_by_last_visit.side_effect = ConnectionError('caído')
+        response = client.get('/visitors/export')
+
+    assert response.status_code == 503
+    assert 'Content-Disposition' not in response.headers
+
+
+def test_export_route_mid_stream_error_aborts_transfer(client):
+    """Prueba que un fallo con la descarga empezada corta la respuesta"""
+    with patch('app.visitor_repository') as failing:
+        failing.list_by_last_visit.side_effect = [
+            [{'id': 1, 'name': 'Ana', 'last_visit': 'a'}], ConnectionError('caído')]
+        with patch('app.VISITORS_EXPORT_CHUNK_SIZE', 1):
+            response = client.get('/visitors/export?format=ndjson')
+            assert response.status_code == 200
+            with pytest.raises(ConnectionError):
+                response.get_data()
@@ -0,0 +1,56 @@
+"""
+Pruebas unitarias para las respuestas condicionales y la precompilación de plantillas
+"""
+import os
+from datetime import datetime, timezone
+from flask import Flask
+from http_cache import data_version_etag, last_modified
+from templating import configure_templates, template_version
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_etag_changes_with_every_visit():
+    """Prueba que el ETag cambia al registrar visitas, nuevas o repetidas"""
+    before = data_version_etag({'total_unique': 2, 'total_visits': 5})
+    assert data_version_etag({'total_unique': 2, 'total_visits': 6}) != before
+    assert data_version_etag({'total_unique': 3, 'total_visits': 6}) != before
+
+
+def test_last_modified_parses_timestamps():
+    """Prueba que last_visit se convierte en una fecha UTC"""
+    assert last_modified({'last_visit': '2025-10-31T08:15:00'}) == \
+        datetime(2025, 10, 31, 8, 15, tzinfo=timezone.utc)
+    assert last_modified({'last_visit': '2025-10-31T10:15:00+02:00'}).utcoffset() is not None
+    assert last_modified({'last_visit': None}) is None
+    assert last_modified({'last_visit': 'ayer'}) is None
+
+
+def test_precompile_templates_with_bytecode_cache(tmp_path):
+    """Prueba que la precompilación deja bytecode en disco para otros procesos"""
+    app = Flask(__name__, root_path=PROJECT_ROOT)
+    compiled = configure_templates(app, cache_dir=str(tmp_path), precompile=True)
+
+    assert compiled == len(app.jinja_env.list_templates()) > 0
+    assert any(tmp_path.iterdir())
+
+
+def test_template_version_hashes_source(tmp_path):
+    """Prueba que la versión depende del contenido y no de la fecha de la plantilla"""
+    (tmp_path / 'templates').mkdir()
+    template = tmp_path / 'templates' / 'page.html'
+    template.write_text('<p>{{ name }}</p>')
+    app = Flask(__name__, root_path=str(tmp_path))
+    version = template_version(app, 'page.html')
+
+    os.utime(template, (0, 0))
+    assert template_version(app, 'page.html') == version
+    template.write_text('<p>{{ name }}!</p>')
+    assert template_version(app, 'page.html') not in ('', version)
+
+
+def test_template_version_missing_file():
+    """Prueba que una plantilla inexistente no rompe el ETag"""
+    app = Flask(__name__, root_path=PROJECT_ROOT)
+    assert template_version(app, 'visitors.html').startswith('-')
+    assert template_version(app, 'no-existe.html') == ''
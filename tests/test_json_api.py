@@ -0,0 +1,96 @@
+"""
+Pruebas unitarias para la API JSON de visitantes (/api/visitors)
+"""
+import json
+import pytest
+from unittest.mock import patch
+import json_api
+from json_api import dumps, parse_fields
+
+
+def test_list_paginates_like_visitors(client, memory_repository):
+    """Prueba el orden por última visita, los cursores y los totales"""
+    first = client.get('/api/visitors?limit=2').get_json()
+    assert [v['name'] for v in first['visitors']] == ['Carla', 'Ana Pérez']
+    assert (first['total_unique'], first['total_visits']) == (3, 9)
+    assert first['prev_cursor'] is None
+
+    second = client.get(f"/api/visitors?limit=2&after={first['next_cursor']}").get_json()
+    assert [v['name'] for v in second['visitors']] == ['Luis']
+    assert second['next_cursor'] is None
+
+
+def test_list_fields_projection(client, memory_repository):
+    """Prueba que ?fields= limita los campos y la consulta a la BD"""
+    with patch.object(memory_repository, 'list_by_last_visit',
+                      wraps=memory_repository.list_by_last_visit) as listing:
+        data = client.get('/api/visitors?fields=name,visit_count').get_json()
+
+    assert data['visitors'][0] == {'name': 'Carla', 'visit_count': 1}
+    assert listing.call_args.kwargs['columns'] == ('name', 'visit_count', 'id', 'last_visit')
+
+
+def test_list_conditional_get(client, memory_repository):
+    """Prueba el 304 con el ETag mientras no haya registros nuevos"""
+    etag = client.get('/api/visitors').headers['ETag']
+
+    assert client.get('/api/visitors', headers={'If-None-Match': etag}).status_code == 304
+    memory_repository.register('Luis')
+    assert client.get('/api/visitors', headers={'If-None-Match': etag}).status_code == 200
+
+
+@pytest.mark.parametrize('query', ['fields=ip_address', 'after=basura'])
+def test_list_bad_request_is_json(client, memory_repository, query):
+    """Prueba que los parámetros inválidos responden 400 en JSON"""
+    response = client.get(f'/api/visitors?{query}')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_visitor_by_normalized_name(client, memory_repository):
+    """Prueba la búsqueda por nombre normalizado y ?fields="""
+    response = client.get('/api/visitors/ ANA  pérez?fields=name,visit_count')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'name': 'Ana Pérez', 'visit_count': 3}
+    assert client.get('/api/visitors/nadie').status_code == 404
+
+
+def test_visitor_conditional_get(client, memory_repository):
+    """Prueba que el ETag del visitante cambia solo con sus visitas"""
+    etag = client.get('/api/visitors/luis').headers['ETag']
+    memory_repository.register('Carla')
+    assert client.get('/api/visitors/luis',
+                      headers={'If-None-Match': etag}).status_code == 304
+
+    memory_repository.register('Luis')
+    assert client.get('/api/visitors/luis',
+                      headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_database_error_is_503(client):
+    """Prueba que un fallo de la BD responde 503 en JSON"""
+    with patch('app.visitor_repository') as failing:
+        failing.totals.side_effect = ConnectionError('caído')
+        failing.get_visitor.side_effect = ConnectionError('caído')
+        assert client.get('/api/visitors').status_code == 503
+        assert client.get('/api/visitors/ana').status_code == 503
+
+
+def test_dumps_without_orjson_matches():
+    """Prueba que la serialización con json produce el mismo documento"""
+    data = {'visitors': [{'name': 'Ana Pérez', 'visit_count': 3}], 'next_cursor': None}
+
+    with patch.object(json_api, 'orjson', None):
+        fallback = dumps(data)
+    assert fallback == dumps(data)
+    assert json.loads(fallback) == data
+
+
+def test_parse_fields():
+    """Prueba el parseo de ?fields="""
+    assert parse_fields(None) == json_api.API_FIELDS
+    assert parse_fields('name, name,visit_count') == ('name', 'visit_count')
+    with pytest.raises(ValueError):
+        parse_fields(',')
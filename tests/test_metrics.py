@@ -0,0 +1,95 @@
+"""
+Pruebas unitarias para las métricas en formato Prometheus
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from metrics import (DB_ERRORS, DB_LATENCY, REQUEST_LATENCY, REQUESTS, TEMPLATE_LATENCY,
+                     Counter, Histogram, Registry, time_db_operation)
+from visitor_repository import SupabaseVisitorRepository
+
+
+def test_histogram_buckets_are_cumulative():
+    """Prueba el formato de texto de un histograma con etiquetas"""
+    registry = Registry()
+    histogram = registry.register(Histogram('lat', 'Latencia', ('route',), buckets=(0.1, 1.0)))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.5, '/a')
+    histogram.observe(5, '/a')
+
+    text = registry.render()
+    assert '# TYPE lat histogram' in text
+    assert 'lat_bucket{route="/a",le="0.1"} 1' in text
+    assert 'lat_bucket{route="/a",le="1.0"} 2' in text
+    assert 'lat_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'lat_count{route="/a"} 3' in text
+    assert 'lat_sum{route="/a"} 5.55' in text
+
+
+def test_counter_escapes_label_values():
+    """Prueba que los valores de etiqueta se escapan"""
+    registry = Registry()
+    counter = registry.register(Counter('c_total', 'Contador', ('name',)))
+    counter.inc('a"b')
+    counter.inc('a"b', amount=2)
+    assert 'c_total{name="a\\"b"} 3' in registry.render()
+
+
+def test_time_db_operation_counts_errors():
+    """Prueba que una operación fallida se mide y se cuenta como error"""
+    before_count = DB_LATENCY.count('prueba')
+    before_errors = DB_ERRORS.value('prueba')
+
+    with pytest.raises(RuntimeError):
+        with time_db_operation('prueba'):
+            raise RuntimeError('boom')
+
+    assert DB_LATENCY.count('prueba') == before_count + 1
+    assert DB_ERRORS.value('prueba') == before_errors + 1
+
+
+def test_request_and_template_metrics(client):
+    """Prueba que cada petición registra su ruta, estado y plantilla"""
+    before_latency = REQUEST_LATENCY.count('/', 'GET')
+    before_requests = REQUESTS.value('/', 'GET', '200')
+    before_template = TEMPLATE_LATENCY.count('index.html')
+
+    client.get('/')
+
+    assert REQUEST_LATENCY.count('/', 'GET') == before_latency + 1
+    assert REQUESTS.value('/', 'GET', '200') == before_requests + 1
+    assert TEMPLATE_LATENCY.count('index.html') == before_template + 1
+
+
+def test_unmatched_routes_share_a_label(client):
+    """Prueba que las URLs inexistentes no crean una serie por URL"""
+    before = REQUESTS.value('unmatched', 'GET', '404')
+    client.get('/no-existe-1')
+    client.get('/no-existe-2')
+    assert REQUESTS.value('unmatched', 'GET', '404') == before + 2
+
+
+def test_supabase_operations_are_measured(client):
+    """Prueba que las llamadas a Supabase se miden por operación"""
+    supabase_client = MagicMock()
+    supabase_client.rpc.return_value.execute.return_value = MagicMock(
+        data=[{'name': 'Ana', 'visit_count': 1, 'ip_address': None,
+               'first_visit': '2025-01-01T10:00:00', 'last_visit': '2025-01-01T10:00:00'}])
+    before = DB_LATENCY.count('register')
+
+    with patch('app.visitor_repository', SupabaseVisitorRepository(supabase_client)):
+        client.post('/hello', data={'name': 'Ana'})
+
+    assert DB_LATENCY.count('register') == before + 1
+
+
+def test_metrics_endpoint(client):
+    """Prueba que /metrics expone las series en formato Prometheus"""
+    client.get('/')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_requests_total{route="/",method="GET",status="200"}' in text
+    assert '# TYPE visitors_cache_hits_total counter' in text
@@ -0,0 +1,80 @@
+"""
+Pruebas unitarias para la paginación keyset del listado
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from pagination import StreamedPage, decode_cursor, encode_cursor, fetch_page
+
+
+def test_cursor_roundtrip():
+    """Prueba que un cursor se decodifica a la misma clave"""
+    cursor = encode_cursor({'last_visit': '2025-10-30T10:30:00+00:00', 'id': 42})
+    assert decode_cursor(cursor) == ('2025-10-30T10:30:00+00:00', 42)
+
+
+@pytest.mark.parametrize('cursor', ['no-es-base64!', 'W10', 'WyJhIiwiYiJd'])
+def test_decode_invalid_cursor(cursor):
+    """Prueba que un cursor manipulado produce ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_fetch_page_forward_and_back(numbered_repository):
+    """Prueba recorrer páginas hacia adelante y volver atrás"""
+    first = fetch_page(numbered_repository, 2)
+    assert [r['name'] for r in first['rows']] == ['V4', 'V3']
+    assert first['prev_cursor'] is None
+
+    second = fetch_page(numbered_repository, 2, after=first['next_cursor'])
+    assert [r['name'] for r in second['rows']] == ['V2', 'V1']
+    assert second['prev_cursor'] is not None
+
+    last = fetch_page(numbered_repository, 2, after=second['next_cursor'])
+    assert [r['name'] for r in last['rows']] == ['V0']
+    assert last['next_cursor'] is None
+
+    back = fetch_page(numbered_repository, 2, before=second['prev_cursor'])
+    assert [r['name'] for r in back['rows']] == ['V4', 'V3']
+    assert back['prev_cursor'] is None
+    assert back['next_cursor'] is not None
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 10])
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 6])
+def test_streamed_page_matches_fetch_page(numbered_repository, limit, chunk_size):
+    """Prueba que la página por bloques da las mismas filas y cursores"""
+    for after in (None, fetch_page(numbered_repository, 1)['next_cursor']):
+        expected = fetch_page(numbered_repository, limit, after=after)
+        page = StreamedPage(numbered_repository, limit, after=after, chunk_size=chunk_size)
+
+        assert list(page) == expected['rows']
+        assert page.next_cursor == expected['next_cursor']
+        assert page.prev_cursor == expected['prev_cursor']
+
+
+def test_streamed_page_queries_in_chunks(numbered_repository):
+    """Prueba que cada bloque es una consulta acotada y la última pide una fila extra"""
+    with patch.object(numbered_repository, 'list_by_last_visit',
+                      wraps=numbered_repository.list_by_last_visit) as listing:
+        rows = list(StreamedPage(numbered_repository, 4, chunk_size=2))
+
+    assert [r['name'] for r in rows] == ['V4', 'V3', 'V2', 'V1']
+    assert [c.args[0] for c in listing.call_args_list] == [2, 3]
+
+
+def test_streamed_page_raises_on_error():
+    """Prueba que un fallo a mitad de la iteración se propaga tras las filas ya dadas"""
+    repo = MagicMock()
+    repo.list_by_last_visit.side_effect = [
+        [{'id': 1, 'last_visit': '2025-10-01T00:00:00'}], Exception('Connection error')]
+
+    rows = iter(StreamedPage(repo, 3, chunk_size=1))
+    assert next(rows)['id'] == 1
+    with pytest.raises(Exception, match='Connection error'):
+        next(rows)
+
+
+def test_streamed_page_rejects_invalid_cursor(numbered_repository):
+    """Prueba que el cursor se valida al construir la página (antes de enviar nada)"""
+    with pytest.raises(ValueError):
+        StreamedPage(numbered_repository, 2, after='basura')
@@ -0,0 +1,87 @@
+"""
+Pruebas unitarias para el límite de peticiones por IP
+"""
+import pytest
+from flask import Flask
+from rate_limit import (SharedMemoryTokenBuckets, TokenBuckets, init_app, parse_rule,
+                        parse_rules)
+
+
+class FakeClock:
+    """Reloj manual para avanzar el tiempo en las pruebas"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rules():
+    """Prueba el formato de las reglas por endpoint"""
+    assert parse_rule('30/minute') == (30.0, 0.5)
+    assert parse_rules('hello=2/second, export_visitors_route=60/hour') == {
+        'hello': (2.0, 2.0), 'export_visitors_route': (60.0, 60 / 3600)}
+    with pytest.raises(ValueError):
+        parse_rule('10/day')
+
+
+def test_bucket_allows_burst_then_refills():
+    """Prueba la ráfaga inicial, el rechazo con espera y el relleno"""
+    clock = FakeClock()
+    buckets = TokenBuckets(slots=1024, clock=clock)
+
+    assert [buckets.take('hello|10.0.0.1', 3, 1.0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('hello|10.0.0.1', 3, 1.0) == pytest.approx(1.0)
+    assert buckets.take('hello|10.0.0.2', 3, 1.0) == 0  # otra IP, otro bucket
+
+    clock.now += 0.5
+    assert buckets.take('hello|10.0.0.1', 3, 1.0) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.take('hello|10.0.0.1', 3, 1.0) == 0
+
+
+def test_shared_memory_buckets_shared_between_instances(tmp_path):
+    """Prueba que dos workers con el mismo archivo comparten los buckets"""
+    clock = FakeClock()
+    path = str(tmp_path / 'ratelimit')
+    worker_a = SharedMemoryTokenBuckets(path, slots=1024, clock=clock)
+    worker_b = SharedMemoryTokenBuckets(path, slots=1024, clock=clock)
+
+    assert worker_a.take('hello|10.0.0.1', 2, 0.1) == 0
+    assert worker_b.take('hello|10.0.0.1', 2, 0.1) == 0
+    assert worker_a.take('hello|10.0.0.1', 2, 0.1) > 0
+
+
+def test_over_limit_rejected_before_view():
+    """Prueba el 429 con Retry-After sin ejecutar la vista"""
+    calls = []
+    app = Flask(__name__)
+
+    @app.post('/hello')
+    def hello():
+        calls.append(1)
+        return 'ok'
+
+    @app.get('/')
+    def index():
+        return 'ok'
+
+    init_app(app, enabled=True, rules={'hello': parse_rule('2/minute')},
+             buckets=TokenBuckets(slots=1024))
+    client = app.test_client()
+
+    statuses = [client.post('/hello').status_code for _ in range(3)]
+    rejected = client.post('/hello')
+
+    assert statuses == [200, 200, 429]
+    assert rejected.headers['Retry-After'] == '30'
+    assert len(calls) == 2
+    assert client.get('/').status_code == 200  # sin regla, sin límite
+    assert client.post('/hello', environ_base={'REMOTE_ADDR': '10.9.9.9'}).status_code == 200
+
+
+def test_disabled_by_default(monkeypatch):
+    """Prueba que sin RATE_LIMIT=1 no se instala nada"""
+    monkeypatch.delenv('RATE_LIMIT', raising=False)
+    assert init_app(Flask(__name__)) is None
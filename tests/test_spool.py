@@ -0,0 +1,121 @@
+"""
+Pruebas unitarias para el spool durable de visitas y su reenvío
+"""
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from spool import SpoolReplayer, VisitSpool
+from visitor_repository import SQLiteVisitorRepository
+
+
+@pytest.fixture
+def spool(tmp_path):
+    """Spool en un archivo temporal"""
+    return VisitSpool(str(tmp_path / 'spool.db'))
+
+
+def test_claim_coalesces_and_is_stable_until_ack(spool):
+    """Prueba que el lote reclamado se repite igual hasta confirmarlo"""
+    spool.append_visit('Ana', '10.0.0.1')
+    spool.append_visit('ana ')
+    spool.append_visit('Luis')
+
+    batch_id, visits = spool.claim(10)
+    assert [(v['name'], v['increment']) for v in visits] == [('Ana', 2), ('Luis', 1)]
+    assert visits[0]['ip_address'] == '10.0.0.1'
+
+    spool.append_visit('Carla')
+    assert spool.claim(10) == (batch_id, visits)
+
+    spool.ack(batch_id)
+    next_id, remaining = spool.claim(10)
+    assert next_id != batch_id
+    assert [v['name'] for v in remaining] == ['Carla']
+
+
+def test_claim_respects_limit_and_empty_spool(spool):
+    """Prueba el tamaño del lote y el spool vacío"""
+    assert spool.claim(10) == (None, [])
+    for name in ('A', 'B', 'C'):
+        spool.append_visit(name)
+
+    batch_id, visits = spool.claim(2)
+    assert [v['name'] for v in visits] == ['A', 'B']
+    assert spool.stats() == {'rows': 3, 'visits': 3}
+
+
+def test_spool_survives_reopen(tmp_path):
+    """Prueba que las visitas y el lote reclamado persisten en disco"""
+    path = str(tmp_path / 'spool.db')
+    first = VisitSpool(path)
+    first.append_visit('Ana')
+    batch_id, _ = first.claim(10)
+
+    reopened = VisitSpool(path)
+    assert reopened.spool_id == first.spool_id
+    assert reopened.claim(10)[0] == batch_id
+
+
+def test_replay_after_lost_ack_is_idempotent(spool, tmp_path):
+    """Prueba que reenviar un lote ya aplicado no duplica las visitas"""
+    repository = SQLiteVisitorRepository(str(tmp_path / 'visitors.db'))
+    spool.append_visit('Ana')
+    spool.append_visit('Ana')
+
+    # El proceso muere tras aplicar el lote y antes de confirmarlo
+    batch_id, visits = spool.claim(10)
+    repository.register_batch(visits, batch_id=batch_id)
+
+    replayer = SpoolReplayer(spool, lambda v, b: repository.register_batch(v, batch_id=b))
+    assert replayer.replay_once() == 2
+    assert spool.stats()['rows'] == 0
+    assert repository.totals()['total_visits'] == 2
+
+
+def test_replay_failure_keeps_batch(spool):
+    """Prueba que un reenvío fallido deja el lote para el siguiente intento"""
+    spool.append_visit('Ana')
+    replayer = SpoolReplayer(spool, MagicMock(side_effect=ConnectionError('caído')))
+
+    with pytest.raises(ConnectionError):
+        replayer.replay_once()
+    assert spool.stats()['rows'] == 1
+
+
+def test_replayer_waits_for_database_and_limits_rate(spool):
+    """Prueba que el hilo espera a can_replay y reenvía a ritmo limitado"""
+    for i in range(4):
+        spool.append_visit(f'V{i}')
+    flush_fn = MagicMock()
+    ready = {'value': False}
+    replayer = SpoolReplayer(spool, flush_fn, batch_size=2, rate=20, interval_ms=10,
+                             can_replay=lambda: ready['value'])
+    replayer.start()
+    try:
+        time.sleep(0.05)
+        flush_fn.assert_not_called()
+
+        ready['value'] = True
+        start = time.monotonic()
+        deadline = start + 3
+        while spool.stats()['rows'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        elapsed = time.monotonic() - start
+    finally:
+        replayer.close()
+
+    assert flush_fn.call_count == 2
+    # 2 visitas a 20/s: el segundo lote espera ~0.1 s tras el primero
+    assert elapsed >= 0.09
+
+
+def test_failed_registration_goes_to_spool(client, spool):
+    """Prueba que /hello guarda la visita en el spool si la BD falla"""
+    failing = MagicMock()
+    failing.register.side_effect = ConnectionError('caído')
+
+    with patch('app.visitor_repository', failing), patch('app.visit_spool', spool):
+        response = client.post('/hello', data={'name': 'Ana'})
+
+    assert response.status_code == 200
+    assert spool.stats() == {'rows': 1, 'visits': 1}
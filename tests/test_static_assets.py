@@ -0,0 +1,74 @@
+"""
+Pruebas unitarias para los recursos estáticos con hash y precomprimidos
+"""
+import gzip
+import os
+import pytest
+from app import app
+from static_assets import IMMUTABLE, load_assets, write_dist
+
+
+@pytest.fixture
+def css_url():
+    """URL con hash de la hoja de estilos de Bootstrap"""
+    with app.test_request_context():
+        return app.jinja_env.globals['asset_url']('bootstrap/css/bootstrap.min.css')
+
+
+def test_templates_reference_hashed_urls(client, css_url):
+    """Prueba que las plantillas enlazan los recursos por su nombre con hash"""
+    html = client.get('/').data.decode('utf-8')
+    assert css_url.startswith('/assets/bootstrap/css/bootstrap.min.')
+    assert css_url in html
+    assert "/static/bootstrap" not in html
+
+
+def test_asset_is_immutable_and_negotiates_encoding(client, css_url):
+    """Prueba la cabecera inmutable y la elección de gzip/identidad"""
+    plain = client.get(css_url, headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get(css_url, headers={'Accept-Encoding': 'gzip'})
+
+    assert plain.headers['Cache-Control'] == IMMUTABLE
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+    assert 'Content-Encoding' not in plain.headers
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.data) == plain.data
+    assert len(gzipped.data) < len(plain.data)
+
+
+def test_brotli_preferred_when_available(client, css_url):
+    """Prueba que brotli tiene preferencia si el cliente lo acepta"""
+    brotli = pytest.importorskip('brotli')
+    response = client.get(css_url, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data).startswith(b'@charset')
+
+
+def test_unknown_asset_is_404(client):
+    """Prueba que solo se publican los recursos referenciados"""
+    assert client.get('/assets/bootstrap/css/bootstrap.css').status_code == 404
+
+
+def test_favicon_cached_and_revalidated(client):
+    """Prueba que el favicon sale de memoria con caché y responde 304 a su ETag"""
+    response = client.get('/favicon.ico')
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+
+    again = client.get('/favicon.ico', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+def test_build_writes_manifest_and_precompressed_files(tmp_path):
+    """Prueba que el build genera el manifiesto y que se carga igual que en memoria"""
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body { color: red; }\n' * 50)
+
+    manifest = write_dist(str(tmp_path), names=('css/site.css',))
+    hashed = tmp_path / 'dist' / manifest['css/site.css']
+    assert hashed.exists()
+    assert os.path.exists(f'{hashed}.gz')
+
+    asset = load_assets(str(tmp_path))['css/site.css']
+    assert asset.hashed_name == manifest['css/site.css']
+    assert gzip.decompress(asset.compressed['gzip']) == asset.data
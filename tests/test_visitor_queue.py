@@ -0,0 +1,170 @@
+"""
+Pruebas unitarias para la cola write-behind de visitantes
+"""
+import queue
+import pytest
+from unittest.mock import MagicMock
+from cache import VisitorLRU
+from visitor_queue import VisitorWriteBehindQueue
+
+
+def _echo_flush(rows_by_name):
+    """Simula la BD: acumula incrementos y retorna las filas resultantes"""
+    def flush(visits):
+        rows = []
+        for v in visits:
+            row = rows_by_name.setdefault(v['name'], {
+                'name': v['name'], 'visit_count': 0, 'first_visit': v['first_visit']
+            })
+            row['visit_count'] += v['increment']
+            rows.append(dict(row))
+        return rows
+    return flush
+
+
+def test_submit_coalesces_by_name():
+    """Prueba que varias visitas del mismo nombre se fusionan en un registro"""
+    flush_fn = MagicMock(return_value=[])
+    q = VisitorWriteBehindQueue(flush_fn)
+
+    q.submit('Ana', '10.0.0.1')
+    q.submit('Ana', '10.0.0.2')
+    visitor = q.submit('Ana')
+
+    assert visitor['visit_count'] == 3
+    assert visitor['ip_address'] == '10.0.0.2'
+    assert q.stats()['queue_depth'] == 1
+    assert q.stats()['pending_visits'] == 3
+
+    q.flush()
+    batch = flush_fn.call_args[0][0]
+    assert len(batch) == 1
+    assert batch[0]['increment'] == 3
+
+
+def test_submit_coalesces_name_variants():
+    """Prueba que "Ana " y "ana" se fusionan con el nombre visto primero"""
+    flush_fn = MagicMock(return_value=[])
+    q = VisitorWriteBehindQueue(flush_fn)
+
+    q.submit('Ana ')
+    visitor = q.submit('ana')
+
+    assert visitor['name'] == 'Ana'
+    assert visitor['visit_count'] == 2
+    q.flush()
+    assert [(v['name'], v['name_key'], v['increment'])
+            for v in flush_fn.call_args[0][0]] == [('Ana', 'ana', 2)]
+
+
+def test_local_visit_number_uses_known_rows():
+    """Prueba que el número de visita local parte de la última fila conocida"""
+    db = {}
+    q = VisitorWriteBehindQueue(_echo_flush(db))
+
+    q.submit('Luis')
+    q.submit('Luis')
+    q.flush()
+    visitor = q.submit('Luis')
+
+    assert db['Luis']['visit_count'] == 2
+    assert visitor['visit_count'] == 3
+
+
+def test_shared_lru_numbers_from_database_rows():
+    """Prueba que la cola numera a partir de las filas que la app ya conoce"""
+    lru = VisitorLRU()
+    lru.update({'id': 7, 'name': 'Ana', 'visit_count': 41, 'first_visit': '2025-01-01'})
+    q = VisitorWriteBehindQueue(MagicMock(return_value=[]), known=lru)
+
+    visitor = q.submit('ana')
+
+    assert visitor['visit_count'] == 42
+    assert visitor['first_visit'] == '2025-01-01'
+    assert lru.stats()['hits'] == 1
+
+
+def test_bounded_queue_rejects_new_names():
+    """Prueba que la cola llena rechaza nombres nuevos pero fusiona los existentes"""
+    q = VisitorWriteBehindQueue(MagicMock(), max_pending=2)
+    q.submit('A')
+    q.submit('B')
+
+    with pytest.raises(queue.Full):
+        q.submit('C')
+    assert q.submit('A')['visit_count'] == 2
+    assert q.stats()['rejected'] == 1
+
+
+def test_failed_flush_requeues_batch():
+    """Prueba que un envío fallido devuelve las visitas a la cola"""
+    flush_fn = MagicMock(side_effect=Exception("Database error"))
+    q = VisitorWriteBehindQueue(flush_fn)
+    q.submit('Carla')
+
+    assert q.flush() == 0
+    q.submit('Carla')
+
+    stats = q.stats()
+    assert stats['flush_errors'] == 1
+    assert stats['pending_visits'] == 2
+
+
+def test_failed_flush_handed_off_counts_as_error():
+    """Prueba que un lote entregado a on_flush_error cuenta como fallo y no se reencola"""
+    handed_off = []
+    q = VisitorWriteBehindQueue(MagicMock(side_effect=Exception("Database error")),
+                                on_flush_error=handed_off.append)
+    q.submit('Carla')
+    q.submit('carla ')
+
+    assert q.flush() == 0
+    assert [v['increment'] for v in handed_off[0]] == [2]
+    stats = q.stats()
+    assert (stats['flushes'], stats['flushed_visits']) == (0, 0)
+    assert (stats['flush_errors'], stats['handed_off_visits']) == (1, 2)
+    assert stats['pending_visits'] == 0
+
+
+def test_failed_hand_off_requeues_batch():
+    """Prueba que si on_flush_error también falla el lote vuelve a la cola"""
+    q = VisitorWriteBehindQueue(MagicMock(side_effect=Exception("Database error")),
+                                on_flush_error=MagicMock(side_effect=OSError("disco lleno")))
+    q.submit('Carla')
+
+    assert q.flush() == 0
+    stats = q.stats()
+    assert (stats['flush_errors'], stats['handed_off_visits']) == (1, 0)
+    assert stats['pending_visits'] == 1
+
+
+def test_close_flushes_pending():
+    """Prueba que al cerrar se envía lo pendiente"""
+    db = {}
+    q = VisitorWriteBehindQueue(_echo_flush(db), flush_interval_ms=60000)
+    q.start()
+    q.submit('Pedro')
+    q.close()
+
+    assert db['Pedro']['visit_count'] == 1
+    assert q.stats()['queue_depth'] == 0
+    assert q.stats()['flushes'] == 1
+
+
+def test_batch_size_triggers_background_flush():
+    """Prueba que alcanzar flush_max_items despierta al hilo de envío"""
+    db = {}
+    q = VisitorWriteBehindQueue(_echo_flush(db), flush_interval_ms=60000,
+                                flush_max_items=2)
+    q.start()
+    q.submit('X')
+    q.submit('Y')
+
+    for _ in range(100):
+        if q.stats()['flushes']:
+            break
+        q._stopped.wait(0.01)
+    q.close()
+
+    assert db['X']['visit_count'] == 1
+    assert db['Y']['visit_count'] == 1
@@ -0,0 +1,361 @@
+"""
+Pruebas unitarias para los backends del repositorio de visitantes
+"""
+import sqlite3
+import threading
+from datetime import datetime, timezone
+import pytest
+from unittest.mock import MagicMock
+from visitor_repository import (LISTING_COLUMNS, InMemoryVisitorRepository,
+                                SQLiteVisitorRepository, SupabaseVisitorRepository,
+                                create_visitor_repository, normalize_name)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repository(request, tmp_path):
+    """Fixture con cada backend local del repositorio"""
+    if request.param == 'memory':
+        return InMemoryVisitorRepository()
+    return SQLiteVisitorRepository(str(tmp_path / 'visitors.db'))
+
+
+def test_register_new_and_existing(repository):
+    """Prueba que registrar dos veces incrementa visit_count sin duplicar"""
+    first = repository.register('Ana', '10.0.0.1')
+    second = repository.register('Ana', None)
+
+    assert first['visit_count'] == 1
+    assert second['visit_count'] == 2
+    assert second['id'] == first['id']
+    assert second['ip_address'] == '10.0.0.1'
+    assert repository.totals() == {'total_unique': 1, 'total_visits': 2,
+                                   'last_visit': second['last_visit']}
+
+
+def test_register_batch_applies_increments(repository):
+    """Prueba que un lote suma los incrementos por visitante"""
+    repository.register('Luis')
+    rows = repository.register_batch([
+        {'name': 'Luis', 'increment': 3, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': '2099-01-01T00:00:00', 'ip_address': '10.0.0.9'},
+        {'name': 'Carla', 'increment': 2, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': '2025-10-02T00:00:00', 'ip_address': None},
+    ])
+
+    counts = {r['name']: r['visit_count'] for r in rows}
+    assert counts == {'Luis': 4, 'Carla': 2}
+    assert repository.totals() == {'total_unique': 2, 'total_visits': 6,
+                                   'last_visit': '2099-01-01T00:00:00'}
+
+
+@pytest.mark.parametrize('variant', ['ana', 'Ana ', '  ANA', 'aNa\t'])
+def test_normalize_name_variants(variant):
+    """Prueba que espacios y mayúsculas no cambian la clave del visitante"""
+    assert normalize_name(variant) == 'ana'
+
+
+def test_normalize_name_unicode():
+    """Prueba NFC (compuesto = descompuesto), casefold y espacios internos"""
+    assert normalize_name('Jose\u0301') == normalize_name('JOSÉ')
+    assert normalize_name('Straße') == normalize_name('STRASSE')
+    assert normalize_name('María  José') == 'maría josé'
+
+
+def test_register_merges_name_variants(repository):
+    """Prueba que "Ana " y "ana" son el mismo visitante y se conserva el primer nombre"""
+    repository.register('Ana ')
+    repository.register('ana')
+    rows = repository.register_batch([
+        {'name': 'ANA', 'increment': 2, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': '2099-01-01T00:00:00', 'ip_address': None},
+    ])
+
+    assert [(r['name'], r['visit_count']) for r in rows] == [('Ana', 4)]
+    assert [r['name'] for r in repository.list_by_last_visit(10)] == ['Ana']
+    assert repository.totals()['total_unique'] == 1
+
+
+def test_sqlite_migrates_legacy_file(tmp_path):
+    """Prueba que un archivo sin name_key se migra fusionando los duplicados"""
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE visitors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            visit_count INTEGER NOT NULL DEFAULT 1,
+            first_visit TEXT NOT NULL,
+            last_visit TEXT NOT NULL,
+            ip_address TEXT
+        );
+        INSERT INTO visitors (name, visit_count, first_visit, last_visit) VALUES
+            ('Ana', 2, '2025-10-01T00:00:00', '2025-10-05T00:00:00'),
+            ('ana ', 3, '2025-09-01T00:00:00', '2025-10-02T00:00:00'),
+            ('Luis', 1, '2025-10-03T00:00:00', '2025-10-03T00:00:00');
+    ''')
+    conn.commit()
+    conn.close()
+
+    repository = SQLiteVisitorRepository(path)
+    rows = {r['name']: r for r in repository.list_by_last_visit(10)}
+
+    assert set(rows) == {'Ana', 'Luis'}
+    assert rows['Ana']['visit_count'] == 5
+    assert rows['Ana']['first_visit'] == '2025-09-01T00:00:00'
+    assert repository.register('ANA')['visit_count'] == 6
+
+
+def test_register_batch_with_batch_id_applies_once(repository):
+    """Prueba que un lote reenviado con el mismo batch_id no se aplica dos veces"""
+    visits = [{'name': 'Ana', 'increment': 2, 'first_visit': '2025-10-01T00:00:00',
+               'last_visit': '2025-10-01T00:00:00', 'ip_address': None}]
+
+    assert repository.register_batch(visits, batch_id='spool:1')[0]['visit_count'] == 2
+    assert repository.register_batch(visits, batch_id='spool:1') == []
+    repository.register_batch(visits, batch_id='spool:2')
+
+    assert repository.totals()['total_visits'] == 4
+
+
+def test_supabase_batch_id_param():
+    """Prueba que el batch_id se envía a la función del lote"""
+    client = MagicMock()
+    SupabaseVisitorRepository(client).register_batch([{'name': 'A', 'increment': 1}],
+                                                     batch_id='spool:7')
+    client.rpc.assert_called_with('register_visitors_batch', {
+        'p_visits': [{'name': 'A', 'name_key': 'a', 'increment': 1}],
+        'p_batch_id': 'spool:7'})
+
+
+def test_register_batch_without_returning(repository):
+    """Prueba que returning=False aplica el lote sin devolver filas"""
+    visits = [{'name': 'Ana', 'increment': 3, 'first_visit': '2025-10-01T00:00:00',
+               'last_visit': '2025-10-01T00:00:00', 'ip_address': None}]
+
+    assert repository.register_batch(visits, returning=False) == []
+    assert repository.register('ana')['visit_count'] == 4
+
+
+def test_supabase_batch_without_returning_param():
+    """Prueba que returning=False pide a la función del lote no devolver filas"""
+    client = MagicMock()
+    SupabaseVisitorRepository(client).register_batch([{'name': 'A', 'increment': 1}],
+                                                     returning=False)
+    client.rpc.assert_called_with('register_visitors_batch', {
+        'p_visits': [{'name': 'A', 'name_key': 'a', 'increment': 1}],
+        'p_return_rows': False})
+
+
+def test_list_page_columns_are_projected(repository):
+    """Prueba que el listado trae solo las columnas pedidas"""
+    repository.register_batch([{'name': 'Ana', 'increment': 1,
+                                'first_visit': '2025-10-28T09:10:00.123456',
+                                'last_visit': '2025-10-30T10:30:00.654321',
+                                'ip_address': '10.0.0.1'}])
+
+    [row] = repository.list_by_last_visit(10, columns=('name', 'last_visit'))
+    assert list(row) == ['name', 'last_visit']
+    # last_visit llega completa: la usa el cursor
+    assert row['last_visit'] == '2025-10-30T10:30:00.654321'
+
+
+def test_supabase_listing_selects_requested_columns():
+    """Prueba que el select de PostgREST lleva solo las columnas pedidas"""
+    client = MagicMock()
+    SupabaseVisitorRepository(client).list_by_last_visit(5, columns=LISTING_COLUMNS)
+
+    client.table.return_value.select.assert_called_with(
+        'id, name, first_visit, last_visit, visit_count')
+
+
+def test_rollup_counts_visits_and_new_visitors(repository):
+    """Prueba que registrar mantiene el rollup por hora (visitas y nuevos)"""
+    repository.register_batch([
+        {'name': 'Ana', 'increment': 2, 'first_visit': '2025-10-30T10:05:00',
+         'last_visit': '2025-10-30T10:40:00', 'ip_address': None},
+        {'name': 'Luis', 'increment': 1, 'first_visit': '2025-10-30T11:00:00',
+         'last_visit': '2025-10-30T11:00:00', 'ip_address': None}])
+    repository.register_batch([
+        {'name': 'ana', 'increment': 3, 'first_visit': '2025-10-30T11:20:00',
+         'last_visit': '2025-10-30T11:30:00', 'ip_address': None}], returning=False)
+
+    assert repository.hourly_stats('2025-10-30T00:00:00') == [
+        {'bucket': '2025-10-30T10:00:00', 'visits': 2, 'new_visitors': 1},
+        {'bucket': '2025-10-30T11:00:00', 'visits': 4, 'new_visitors': 1}]
+    assert repository.hourly_stats('2025-10-30T11:00:00')[0]['visits'] == 4
+
+
+def test_top_visitors(repository):
+    """Prueba el ranking por visit_count (empates por antigüedad)"""
+    repository.register_batch([
+        {'name': n, 'increment': c, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': '2025-10-01T00:00:00', 'ip_address': '10.0.0.1'}
+        for n, c in [('Ana', 2), ('Luis', 5), ('Carla', 2)]])
+
+    assert repository.top_visitors(2) == [
+        {'name': 'Luis', 'visit_count': 5, 'last_visit': '2025-10-01T00:00:00'},
+        {'name': 'Ana', 'visit_count': 2, 'last_visit': '2025-10-01T00:00:00'}]
+
+
+def test_sqlite_rollup_is_seeded_for_existing_files(tmp_path):
+    """Prueba el relleno estimado del rollup en archivos anteriores a él"""
+    path = str(tmp_path / 'old.db')
+    SQLiteVisitorRepository(path).register_batch([
+        {'name': 'Ana', 'increment': 3, 'first_visit': '2025-10-01T08:10:00',
+         'last_visit': '2025-10-02T09:30:00', 'ip_address': None}])
+    conn = sqlite3.connect(path)
+    conn.execute('DROP TABLE visitor_stats_hourly')
+    conn.commit()
+    conn.close()
+
+    assert SQLiteVisitorRepository(path).hourly_stats('2025-10-01T00:00:00') == [
+        {'bucket': '2025-10-01T08:00:00', 'visits': 1, 'new_visitors': 1},
+        {'bucket': '2025-10-02T09:00:00', 'visits': 2, 'new_visitors': 0}]
+
+
+def test_get_visitor_by_name_key(repository):
+    """Prueba la búsqueda de un visitante por name_key con proyección"""
+    repository.register('Ana Pérez', '10.0.0.1')
+
+    assert repository.get_visitor('ana pérez', ('name', 'visit_count')) == {
+        'name': 'Ana Pérez', 'visit_count': 1}
+    assert repository.get_visitor('luis') is None
+
+
+def test_supabase_get_visitor():
+    """Prueba que la búsqueda de Supabase filtra por name_key"""
+    client = MagicMock()
+    client.table().select().eq().limit().execute.return_value = MagicMock(data=[])
+
+    assert SupabaseVisitorRepository(client).get_visitor('ana', ('name',)) is None
+    client.table().select.assert_called_with('name')
+    client.table().select().eq.assert_called_with('name_key', 'ana')
+
+
+def test_register_stamps_utc(repository):
+    """Prueba que las fechas de la aplicación usan UTC, como now() en la BD"""
+    row = repository.register('Ana')
+
+    stamped = datetime.fromisoformat(row['last_visit'])
+    utc = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert stamped.tzinfo is None
+    assert abs((utc - stamped).total_seconds()) < 5
+
+
+def test_list_by_last_visit_orders_desc(repository):
+    """Prueba que el listado viene ordenado por última visita descendente"""
+    repository.register_batch([
+        {'name': n, 'increment': 1, 'first_visit': lv, 'last_visit': lv, 'ip_address': None}
+        for n, lv in [('Ana', '2025-10-30T10:30:00'), ('Luis', '2025-10-29T12:00:00'),
+                      ('Carla', '2025-10-31T08:15:00')]
+    ])
+
+    names = [r['name'] for r in repository.list_by_last_visit(10)]
+    assert names == ['Carla', 'Ana', 'Luis']
+
+
+def test_list_by_last_visit_keyset(repository):
+    """Prueba los cursores after/before sobre (last_visit, id)"""
+    repository.register_batch([
+        {'name': f'V{i}', 'increment': 1, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': f'2025-10-{10 + i:02d}T00:00:00', 'ip_address': None}
+        for i in range(6)
+    ])
+    first = repository.list_by_last_visit(2)
+    assert [r['name'] for r in first] == ['V5', 'V4']
+
+    key = (first[-1]['last_visit'], first[-1]['id'])
+    second = repository.list_by_last_visit(2, after=key)
+    assert [r['name'] for r in second] == ['V3', 'V2']
+
+    key = (second[0]['last_visit'], second[0]['id'])
+    back = repository.list_by_last_visit(2, before=key)
+    assert [r['name'] for r in back] == ['V5', 'V4']
+
+
+def test_keyset_follows_updates_and_ties(repository):
+    """Prueba que una visita nueva mueve la fila y que los empates se ordenan por id"""
+    repository.register_batch([
+        {'name': n, 'increment': 1, 'first_visit': '2025-10-01T00:00:00',
+         'last_visit': '2025-10-01T00:00:00', 'ip_address': None}
+        for n in ('A', 'B', 'C')])
+    repository.register_batch([
+        {'name': 'A', 'increment': 1, 'first_visit': '2025-10-02T00:00:00',
+         'last_visit': '2025-10-02T00:00:00', 'ip_address': None}])
+
+    rows = repository.list_by_last_visit(10)
+    assert [r['name'] for r in rows] == ['A', 'C', 'B']
+    key = (rows[1]['last_visit'], rows[1]['id'])
+    assert [r['name'] for r in repository.list_by_last_visit(10, after=key)] == ['B']
+    assert [r['name'] for r in repository.list_by_last_visit(10, before=key)] == ['A']
+
+
+def test_concurrent_registrations_lose_no_visits(repository):
+    """Prueba que registros concurrentes del mismo nombre no pierden incrementos"""
+    def worker():
+        for _ in range(25):
+            repository.register('Concurrente')
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    totals = repository.totals()
+    assert (totals['total_unique'], totals['total_visits']) == (1, 100)
+
+
+def test_supabase_totals_and_listing():
+    """Prueba las consultas del backend de Supabase con un cliente simulado"""
+    client = MagicMock()
+    select_mock = client.table.return_value.select.return_value
+    page_mock = select_mock.order.return_value.order.return_value.limit.return_value
+    page_mock.execute.return_value = MagicMock(data=[{'name': 'Ana'}])
+    client.rpc.return_value.execute.return_value = MagicMock(
+        data=[{'total_unique': 2, 'total_visits': 5, 'last_visit': '2025-10-31T08:15:00'}]
+    )
+    repository = SupabaseVisitorRepository(client)
+
+    assert repository.list_by_last_visit(10) == [{'name': 'Ana'}]
+    assert repository.totals() == {'total_unique': 2, 'total_visits': 5,
+                                   'last_visit': '2025-10-31T08:15:00'}
+    select_mock.order.assert_called_with('last_visit', desc=True)
+    select_mock.order.return_value.order.return_value.limit.assert_called_with(10)
+    client.rpc.assert_called_with('visitor_totals')
+    # Los totales no descargan filas de la tabla
+    select_mock.execute.assert_not_called()
+
+
+def test_supabase_totals_empty_response():
+    """Prueba que sin respuesta del agregado los totales son cero"""
+    client = MagicMock()
+    client.rpc.return_value.execute.return_value = MagicMock(data=[])
+
+    assert SupabaseVisitorRepository(client).totals() == {
+        'total_unique': 0, 'total_visits': 0, 'last_visit': None}
+
+
+def test_supabase_keyset_filter():
+    """Prueba el filtro PostgREST del cursor keyset"""
+    client = MagicMock()
+    repository = SupabaseVisitorRepository(client)
+    repository.list_by_last_visit(5, after=('2025-10-30T10:30:00', 7))
+
+    client.table().select().or_.assert_called_with(
+        'last_visit.lt."2025-10-30T10:30:00",'
+        'and(last_visit.eq."2025-10-30T10:30:00",id.lt.7)'
+    )
+
+
+def test_create_visitor_repository_backends(tmp_path, monkeypatch):
+    """Prueba que la fábrica respeta VISITOR_BACKEND"""
+    monkeypatch.setenv('VISITOR_SQLITE_PATH', str(tmp_path / 'v.db'))
+    assert isinstance(create_visitor_repository('memory'), InMemoryVisitorRepository)
+    assert isinstance(create_visitor_repository('sqlite'), SQLiteVisitorRepository)
+
+    monkeypatch.setenv('VISITOR_BACKEND', 'memory')
+    assert isinstance(create_visitor_repository(), InMemoryVisitorRepository)
+
+    with pytest.raises(ValueError):
+        create_visitor_repository('oracle')
@@ -0,0 +1,112 @@
+"""
+Pruebas unitarias para /visitors/stats y las estadísticas desde el rollup por hora
+"""
+from datetime import datetime
+import pytest
+from unittest.mock import MagicMock, patch
+from visitor_repository import InMemoryVisitorRepository, SupabaseVisitorRepository
+from visitor_stats import build_stats
+
+NOW = datetime(2025, 10, 30, 11, 45)
+
+
+@pytest.fixture
+def repository():
+    """Repositorio en memoria con visitas en tres horas de dos días"""
+    repository = InMemoryVisitorRepository()
+    repository.register_batch([
+        {'name': 'Ana', 'increment': 3, 'first_visit': '2025-10-29T22:10:00',
+         'last_visit': '2025-10-29T22:10:00', 'ip_address': None},
+        {'name': 'Luis', 'increment': 1, 'first_visit': '2025-10-30T10:05:00',
+         'last_visit': '2025-10-30T10:05:00', 'ip_address': None}])
+    repository.register_batch([
+        {'name': 'Ana', 'increment': 2, 'first_visit': '2025-10-30T11:30:00',
+         'last_visit': '2025-10-30T11:30:00', 'ip_address': None}])
+    return repository
+
+
+def test_hourly_series_is_zero_filled(repository):
+    """Prueba la serie por hora: una entrada por hora, con ceros donde no hubo visitas"""
+    stats = build_stats(repository, hours=3, days=1, top=1, now=NOW)
+
+    assert stats['hourly'] == [
+        {'hour': '2025-10-30T09:00:00', 'visits': 0, 'new_visitors': 0, 'returning_visits': 0},
+        {'hour': '2025-10-30T10:00:00', 'visits': 1, 'new_visitors': 1, 'returning_visits': 0},
+        {'hour': '2025-10-30T11:00:00', 'visits': 2, 'new_visitors': 0, 'returning_visits': 2}]
+
+
+def test_daily_series_and_top(repository):
+    """Prueba la suma por día y el ranking por visit_count"""
+    stats = build_stats(repository, hours=1, days=2, top=1, now=NOW)
+
+    assert stats['daily'] == [
+        {'date': '2025-10-29', 'visits': 3, 'new_visitors': 1, 'returning_visits': 2},
+        {'date': '2025-10-30', 'visits': 3, 'new_visitors': 1, 'returning_visits': 2}]
+    assert [v['name'] for v in stats['top']] == ['Ana']
+
+
+def test_stats_read_rollup_not_visitors():
+    """Prueba que las estadísticas no recorren la tabla de visitantes"""
+    repository = MagicMock()
+    repository.hourly_stats.return_value = []
+    repository.top_visitors.return_value = []
+
+    build_stats(repository, hours=24, days=7, top=5, now=NOW)
+
+    repository.hourly_stats.assert_called_once_with('2025-10-24T00:00:00')
+    repository.top_visitors.assert_called_once_with(5)
+    repository.list_by_last_visit.assert_not_called()
+
+
+def test_supabase_stats_queries():
+    """Prueba las consultas de Supabase al rollup y al ranking"""
+    client = MagicMock()
+    repository = SupabaseVisitorRepository(client)
+    repository.hourly_stats('2025-10-30T00:00:00')
+    repository.top_visitors(10)
+
+    client.table.assert_any_call('visitor_stats_hourly')
+    client.table().select().gte.assert_called_with('bucket', '2025-10-30T00:00:00')
+    client.table().select().order.assert_any_call('visit_count', desc=True)
+
+
+def test_supabase_hourly_stats_pages_past_max_rows():
+    """Prueba que con max-rows=1000 de PostgREST la ventana de 90 días llega completa"""
+    buckets = [{'bucket': f'hora-{i:04d}', 'visits': 1, 'new_visitors': 0}
+               for i in range(2160)]
+    query = MagicMock()
+    query.select.return_value = query.gte.return_value = query.order.return_value = query
+    # PostgREST corta cada respuesta en 1000 filas aunque el rango pida más
+    query.range.side_effect = lambda start, end: MagicMock(**{
+        'execute.return_value': MagicMock(data=buckets[start:min(end + 1, start + 1000)])})
+    client = MagicMock()
+    client.table.return_value = query
+
+    rows = SupabaseVisitorRepository(client).hourly_stats('2025-08-01T00:00:00')
+
+    assert rows == buckets
+    assert [c.args for c in query.range.call_args_list] == [(0, 999), (1000, 1999), (2000, 2999)]
+
+
+def test_stats_endpoint(client, repository):
+    """Prueba que /visitors/stats responde JSON y acota los parámetros"""
+    with patch('app.visitor_repository', repository):
+        response = client.get('/visitors/stats?hours=1000&days=2&top=0')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['hourly']) == 168
+    assert len(data['daily']) == 2
+    assert len(data['top']) == 1
+
+
+def test_stats_endpoint_database_error(client):
+    """Prueba que un fallo de la BD responde 503 en JSON"""
+    failing = MagicMock()
+    failing.hourly_stats.side_effect = ConnectionError('caído')
+
+    with patch('app.visitor_repository', failing):
+        response = client.get('/visitors/stats')
+
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Estadísticas no disponibles'}
@@ -0,0 +1,207 @@
+"""
+Cola write-behind para el registro de visitantes
+
+En este modo /hello no espera a Supabase: los registros se acumulan en memoria,
+se fusionan por visitante (name_key) y un hilo en segundo plano los envía en
+bloque.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from cache import VisitorLRU
+from visitor_repository import clean_name, normalize_name, utc_now
+
+log = logging.getLogger('app.visitor_queue')
+
+
+class VisitorWriteBehindQueue:
+    """
+    Cola acotada que fusiona registros por name_key y los envía por lotes
+
+    Args:
+        flush_fn: Función que recibe la lista de registros pendientes y
+            retorna las filas resultantes de la base de datos
+        flush_interval_ms: Intervalo máximo entre envíos (milisegundos)
+        flush_max_items: Número de nombres pendientes que fuerza un envío
+        max_pending: Máximo de nombres distintos en cola antes de rechazar
+        max_known: Máximo de visitantes conocidos para numerar visitas localmente
+            (si no se pasa `known`)
+        known: Filas conocidas compartidas con la aplicación (VisitorLRU)
+        can_flush: Si retorna False el envío periódico se pospone (p. ej.
+            mientras el circuito de la BD está abierto)
+        on_flush_error: Recibe los registros de un envío fallido en lugar de
+            volver a encolarlos (p. ej. el spool durable); si también falla,
+            el lote vuelve a la cola
+    """
+
+    def __init__(self, flush_fn: Callable[[List[dict]], List[dict]],
+                 flush_interval_ms: int = 200, flush_max_items: int = 100,
+                 max_pending: int = 10000, max_known: int = 10000,
+                 can_flush: Optional[Callable[[], bool]] = None,
+                 known: Optional[VisitorLRU] = None,
+                 on_flush_error: Optional[Callable[[List[dict]], None]] = None):
+        self._flush_fn = flush_fn
+        self._on_flush_error = on_flush_error
+        self._can_flush = can_flush
+        self._flush_interval = flush_interval_ms / 1000
+        self._flush_max_items = flush_max_items
+        self._max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # nombre -> registro pendiente (incremento acumulado, última visita, IP)
+        self._pending: Dict[str, dict] = {}
+        # name_key -> última fila conocida de la BD (visit_count, first_visit)
+        self._known = known if known is not None else VisitorLRU(max_known)
+
+        self._flushes = 0
+        self._flush_errors = 0
+        self._flushed_visits = 0
+        self._handed_off_visits = 0
+        self._rejected = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self) -> None:
+        """Inicia el hilo que vacía la cola periódicamente"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='visitor-write-behind',
+                                            daemon=True)
+            self._thread.start()
+
+    def submit(self, name: str, ip_address: str = None) -> dict:
+        """
+        Encola una visita y retorna la fila del visitante calculada localmente
+
+        Raises:
+            queue.Full: Si la cola alcanzó max_pending nombres distintos
+        """
+        now = utc_now()
+        key = normalize_name(name)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                if len(self._pending) >= self._max_pending:
+                    self._rejected += 1
+                    raise queue.Full(f"Cola write-behind llena ({self._max_pending})")
+                entry = {'name': clean_name(name), 'name_key': key, 'increment': 0,
+                         'first_visit': now, 'last_visit': now, 'ip_address': ip_address}
+                self._pending[key] = entry
+            entry['increment'] += 1
+            entry['last_visit'] = now
+            entry['ip_address'] = ip_address or entry['ip_address']
+
+            known = self._known.get(key)
+            visitor = {
+                'name': known['name'] if known else entry['name'],
+                'visit_count': (known['visit_count'] if known else 0) + entry['increment'],
+                'first_visit': known['first_visit'] if known else entry['first_visit'],
+                'last_visit': now,
+                'ip_address': entry['ip_address'],
+            }
+            should_flush = len(self._pending) >= self._flush_max_items
+
+        if should_flush:
+            self._wakeup.set()
+        return visitor
+
+    def flush(self) -> int:
+        """
+        Envía todos los registros pendientes en un solo lote
+
+        Returns:
+            int: Número de visitantes enviados (0 si no había o si falló)
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                rows = self._flush_fn(list(batch.values())) or []
+            except Exception as e:
+                with self._lock:
+                    self._flush_errors += 1
+                log.error("❌ Error al vaciar la cola de visitantes: %s", e,
+                          extra={'batch_size': len(batch)})
+                self._hand_off(batch)
+                return 0
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with self._lock:
+                for row in rows:
+                    self._known.update(row)
+                self._flushes += 1
+                self._flushed_visits += sum(e['increment'] for e in batch.values())
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            return len(batch)
+
+    def close(self) -> None:
+        """Detiene el hilo y envía lo pendiente (llamar al apagar el proceso)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        """Retorna contadores de profundidad de cola y latencia de envío"""
+        with self._lock:
+            return {
+                'queue_depth': len(self._pending),
+                'pending_visits': sum(e['increment'] for e in self._pending.values()),
+                'flushes': self._flushes,
+                'flush_errors': self._flush_errors,
+                'flushed_visits': self._flushed_visits,
+                'handed_off_visits': self._handed_off_visits,
+                'rejected': self._rejected,
+                'last_flush_ms': self._last_flush_ms,
+                'max_flush_ms': self._max_flush_ms,
+                'avg_flush_ms': self._total_flush_ms / self._flushes if self._flushes else 0.0,
+            }
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            if self._can_flush is None or self._can_flush():
+                self.flush()
+
+    def _hand_off(self, batch: Dict[str, dict]) -> None:
+        """Entrega un lote fallido a on_flush_error, o lo devuelve a la cola"""
+        if self._on_flush_error is not None:
+            try:
+                self._on_flush_error(list(batch.values()))
+            except Exception as e:
+                log.error("❌ Error al entregar un lote fallido: %s", e,
+                          extra={'batch_size': len(batch)})
+            else:
+                with self._lock:
+                    self._handed_off_visits += sum(e['increment'] for e in batch.values())
+                return
+        self._requeue(batch)
+
+    def _requeue(self, batch: Dict[str, dict]) -> None:
+        """Devuelve a la cola un lote fallido, fusionándolo con lo nuevo"""
+        with self._lock:
+            for key, failed in batch.items():
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = failed
+                else:
+                    entry['increment'] += failed['increment']
+                    entry['first_visit'] = failed['first_visit']
+                    entry['ip_address'] = entry['ip_address'] or failed['ip_address']
@@ -0,0 +1,579 @@
+"""
+Repositorio de visitantes con backends intercambiables
+
+Backends disponibles (variable de entorno VISITOR_BACKEND):
+  - supabase: tabla `visitors` en Supabase (por defecto)
+  - memory:   diccionario en memoria, seguro entre hilos
+  - sqlite:   archivo SQLite en modo WAL (VISITOR_SQLITE_PATH)
+"""
+import bisect
+import heapq
+import os
+import sqlite3
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from metrics import time_db_operation
+
+# Columnas del listado (/visitors y exportación); id forma parte del cursor.
+# Las fechas llegan sin formatear: last_visit también la usa el cursor
+LISTING_COLUMNS = ('id', 'name', 'first_visit', 'last_visit', 'visit_count')
+
+# Columnas que usan /hello y la VisitorLRU tras registrar una visita
+REGISTER_COLUMNS = ('id', 'name', 'name_key', 'visit_count', 'first_visit', 'last_visit',
+                    'ip_address')
+
+# Columnas del ranking de /visitors/stats
+TOP_COLUMNS = ('name', 'visit_count', 'last_visit')
+
+# Clave de paginación keyset: (last_visit, id)
+PageKey = Tuple[str, int]
+
+
+def utc_now() -> str:
+    """
+    Fecha actual en UTC sin zona, como la guarda `timestamp` en Postgres
+
+    Las filas que fecha la aplicación (backends locales, cola write-behind,
+    spool) usan el mismo reloj que now() en la BD (sesiones en UTC): el orden
+    keyset, las horas del rollup y Last-Modified no dependen de la zona del host.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def clean_name(name: str) -> str:
+    """Nombre a mostrar: Unicode NFC, sin espacios en los extremos ni repetidos"""
+    return ' '.join(unicodedata.normalize('NFC', name).split())
+
+
+def normalize_name(name: str) -> str:
+    """
+    Clave única del visitante (columna name_key): nombre limpio y casefold
+
+    "Ana ", "ana" y "ANA" son el mismo visitante; las búsquedas y los upserts
+    usan esta clave, indexada como única.
+    """
+    return unicodedata.normalize('NFC', clean_name(name).casefold())
+
+
+def with_name_key(visit: dict) -> dict:
+    """Registro de un lote con name limpio y name_key calculada"""
+    return {**visit, 'name': clean_name(visit['name']),
+            'name_key': visit.get('name_key') or normalize_name(visit['name'])}
+
+
+def hour_bucket(timestamp: str) -> str:
+    """Hora (bucket del rollup) de una fecha ISO 8601: 2025-10-30T10:42:07 -> 2025-10-30T10:00:00"""
+    return f'{timestamp[:10]}T{timestamp[11:13]}:00:00'
+
+
+def keyset_filter(op: str, key: PageKey) -> str:
+    """Filtro PostgREST `or` para (last_visit, id) <op> key (op: lt, gt)"""
+    last_visit, visitor_id = key
+    return (f'last_visit.{op}."{last_visit}",'
+            f'and(last_visit.eq."{last_visit}",id.{op}.{int(visitor_id)})')
+
+
+class VisitorRepository(ABC):
+    """Operaciones de persistencia de visitantes que usa la aplicación"""
+
+    @abstractmethod
+    def register(self, name: str, ip_address: str = None) -> Optional[dict]:
+        """
+        Inserta el visitante o incrementa su visit_count; retorna la fila
+
+        El visitante se identifica por normalize_name(name); una fila nueva
+        guarda clean_name(name) como nombre a mostrar.
+        """
+
+    @abstractmethod
+    def register_batch(self, visits: List[dict], batch_id: Optional[str] = None,
+                       returning: bool = True) -> List[dict]:
+        """
+        Aplica un lote de visitas fusionadas por nombre (name, increment,
+        first_visit, last_visit, ip_address); retorna las filas resultantes
+
+        Con `batch_id` el lote se aplica una sola vez: si ese identificador
+        ya se aplicó, no cambia nada y retorna una lista vacía (reenvíos
+        idempotentes del spool). Con `returning=False` la BD no devuelve las
+        filas y se retorna una lista vacía.
+        """
+
+    @abstractmethod
+    def list_by_last_visit(self, limit: int, after: Optional[PageKey] = None,
+                           before: Optional[PageKey] = None,
+                           columns: Sequence[str] = LISTING_COLUMNS) -> List[dict]:
+        """
+        Retorna hasta `limit` visitantes ordenados por (last_visit, id) desc
+
+        Con `after` retorna las filas inmediatamente más antiguas que esa clave;
+        con `before`, las inmediatamente más recientes (siempre en orden desc).
+        Cada fila trae solo `columns`.
+        """
+
+    @abstractmethod
+    def get_visitor(self, name_key: str,
+                    columns: Sequence[str] = LISTING_COLUMNS) -> Optional[dict]:
+        """Retorna `columns` del visitante con esa name_key, o None si no existe"""
+
+    @abstractmethod
+    def totals(self) -> dict:
+        """
+        Retorna {'total_unique': int, 'total_visits': int, 'last_visit': str | None}
+
+        total_visits crece con cada registro y last_visit es la visita más
+        reciente: juntos identifican la versión de los datos (ETag de /visitors)
+        """
+
+    @abstractmethod
+    def hourly_stats(self, since: str) -> List[dict]:
+        """
+        Retorna el rollup por hora desde `since` (inclusive), en orden:
+        [{'bucket': str, 'visits': int, 'new_visitors': int}]
+
+        Lo mantienen register y register_batch: cada visita suma en la hora
+        de su last_visit, y una fila nueva cuenta como visitante nuevo. Las
+        horas sin visitas no aparecen.
+        """
+
+    @abstractmethod
+    def top_visitors(self, limit: int) -> List[dict]:
+        """Retorna los `limit` visitantes con más visitas (TOP_COLUMNS)"""
+
+
+class SupabaseVisitorRepository(VisitorRepository):
+    """
+    Repositorio sobre la tabla `visitors` de Supabase
+
+    Sin `client` explícito se usa el cliente del proceso de database.py, que
+    se crea en la primera consulta y no al importar la aplicación.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        # Import diferido: los backends locales no requieren el SDK de Supabase
+        from database import get_supabase_client
+        return get_supabase_client()
+
+    def register(self, name: str, ip_address: str = None) -> Optional[dict]:
+        # Insertar o incrementar en una sola operación atómica del servidor
+        # (función register_visitor, ver migrations/006_visitor_name_key.sql)
+        with time_db_operation('register'):
+            response = self.client.rpc('register_visitor', {
+                'p_name': clean_name(name),
+                'p_name_key': normalize_name(name),
+                'p_ip_address': ip_address
+            }).execute()
+        return response.data[0] if response.data else None
+
+    def register_batch(self, visits: List[dict], batch_id: Optional[str] = None,
+                       returning: bool = True) -> List[dict]:
+        params = {'p_visits': [with_name_key(v) for v in visits]}
+        if batch_id is not None:
+            # Ver migrations/007_visitor_batch_idempotency.sql
+            params['p_batch_id'] = batch_id
+        if not returning:
+            # Ver migrations/008_visitor_projection.sql
+            params['p_return_rows'] = False
+        with time_db_operation('register_batch'):
+            response = self.client.rpc('register_visitors_batch', params).execute()
+        return response.data or []
+
+    def list_by_last_visit(self, limit: int, after: Optional[PageKey] = None,
+                           before: Optional[PageKey] = None,
+                           columns: Sequence[str] = LISTING_COLUMNS) -> List[dict]:
+        query = self.client.table('visitors').select(', '.join(columns))
+        if after:
+            query = query.or_(keyset_filter('lt', after))
+        elif before:
+            query = query.or_(keyset_filter('gt', before))
+
+        # Hacia atrás se recorre el índice en orden ascendente y se invierte
+        descending = before is None
+        with time_db_operation('list'):
+            response = query \
+                .order('last_visit', desc=descending) \
+                .order('id', desc=descending) \
+                .limit(limit) \
+                .execute()
+        rows = response.data or []
+        return rows if descending else rows[::-1]
+
+    def get_visitor(self, name_key: str,
+                    columns: Sequence[str] = LISTING_COLUMNS) -> Optional[dict]:
+        # Sondeo al índice único de name_key (migración 006)
+        with time_db_operation('get'):
+            response = self.client.table('visitors') \
+                .select(', '.join(columns)) \
+                .eq('name_key', name_key) \
+                .limit(1) \
+                .execute()
+        return response.data[0] if response.data else None
+
+    def totals(self) -> dict:
+        # Agregado en el servidor (ver migrations/004_visitor_totals.sql): una fila
+        with time_db_operation('totals'):
+            response = self.client.rpc('visitor_totals').execute()
+        row = response.data[0] if response.data else {}
+        return {
+            'total_unique': int(row.get('total_unique') or 0),
+            'total_visits': int(row.get('total_visits') or 0),
+            'last_visit': row.get('last_visit')
+        }
+
+    # Filas del rollup por petición: no debe superar max-rows de PostgREST
+    # (1000 por defecto en Supabase), que recorta la respuesta sin error
+    STATS_PAGE_SIZE = 1000
+
+    def hourly_stats(self, since: str) -> List[dict]:
+        # Rollup que mantienen las funciones de registro (migración 009). Una
+        # ventana de 90 días son 2160 horas: se lee por páginas con .range()
+        # hasta recibir una incompleta
+        rows: List[dict] = []
+        with time_db_operation('hourly_stats'):
+            while True:
+                response = self.client.table('visitor_stats_hourly') \
+                    .select('bucket, visits, new_visitors') \
+                    .gte('bucket', since) \
+                    .order('bucket') \
+                    .range(len(rows), len(rows) + self.STATS_PAGE_SIZE - 1) \
+                    .execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < self.STATS_PAGE_SIZE:
+                    return rows
+
+    def top_visitors(self, limit: int) -> List[dict]:
+        # Recorre el índice visitors_visit_count_idx (migración 009)
+        with time_db_operation('top_visitors'):
+            response = self.client.table('visitors') \
+                .select(', '.join(TOP_COLUMNS)) \
+                .order('visit_count', desc=True) \
+                .order('id') \
+                .limit(limit) \
+                .execute()
+        return response.data or []
+
+
+class InMemoryVisitorRepository(VisitorRepository):
+    """
+    Repositorio en memoria del proceso, para pruebas de carga y despliegues pequeños
+
+    Un índice ordenado de claves (last_visit, id), como el índice keyset de
+    SQLite y Postgres, hace que una página cueste una búsqueda binaria más
+    `limit` filas, sin importar el tamaño de la tabla ni la profundidad.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, dict] = {}  # name_key -> fila
+        self._by_id: Dict[int, dict] = {}
+        self._index: List[PageKey] = []  # (last_visit, id) ascendente
+        self._applied_batches = set()
+        self._hourly: Dict[str, List[int]] = {}  # hora -> [visitas, nuevos]
+        self._next_id = 1
+        self._total_visits = 0
+        self._last_visit: Optional[str] = None
+
+    def register(self, name: str, ip_address: str = None) -> Optional[dict]:
+        now = utc_now()
+        return self._apply(name, 1, now, now, ip_address)
+
+    def register_batch(self, visits: List[dict], batch_id: Optional[str] = None,
+                       returning: bool = True) -> List[dict]:
+        if batch_id is not None:
+            with self._lock:
+                if batch_id in self._applied_batches:
+                    return []
+                self._applied_batches.add(batch_id)
+        rows = [self._apply(v['name'], v['increment'], v['first_visit'],
+                            v['last_visit'], v.get('ip_address'))
+                for v in visits]
+        return rows if returning else []
+
+    def list_by_last_visit(self, limit: int, after: Optional[PageKey] = None,
+                           before: Optional[PageKey] = None,
+                           columns: Sequence[str] = LISTING_COLUMNS) -> List[dict]:
+        with self._lock:
+            if after:
+                end = bisect.bisect_left(self._index, tuple(after))
+                keys = self._index[max(0, end - limit):end]
+            elif before:
+                start = bisect.bisect_right(self._index, tuple(before))
+                keys = self._index[start:start + limit]
+            else:
+                keys = self._index[-limit:]
+            rows = [self._by_id[visitor_id] for _, visitor_id in reversed(keys)]
+            # Solo se copian las columnas pedidas de las filas de la página
+            return [{c: r[c] for c in columns} for r in rows]
+
+    def get_visitor(self, name_key: str,
+                    columns: Sequence[str] = LISTING_COLUMNS) -> Optional[dict]:
+        with self._lock:
+            row = self._rows.get(name_key)
+            return {c: row[c] for c in columns} if row is not None else None
+
+    def totals(self) -> dict:
+        with self._lock:
+            return {'total_unique': len(self._rows), 'total_visits': self._total_visits,
+                    'last_visit': self._last_visit}
+
+    def hourly_stats(self, since: str) -> List[dict]:
+        with self._lock:
+            return [{'bucket': bucket, 'visits': visits, 'new_visitors': new}
+                    for bucket, (visits, new) in sorted(self._hourly.items())
+                    if bucket >= since]
+
+    def top_visitors(self, limit: int) -> List[dict]:
+        with self._lock:
+            rows = heapq.nsmallest(limit, self._rows.values(),
+                                   key=lambda r: (-r['visit_count'], r['id']))
+            return [{c: r[c] for c in TOP_COLUMNS} for r in rows]
+
+    def _apply(self, name, increment, first_visit, last_visit, ip_address) -> dict:
+        key = normalize_name(name)
+        with self._lock:
+            row = self._rows.get(key)
+            bucket = self._hourly.setdefault(hour_bucket(last_visit), [0, 0])
+            bucket[0] += increment
+            if row is None:
+                bucket[1] += 1
+                row = {'id': self._next_id, 'name': clean_name(name), 'name_key': key,
+                       'visit_count': 0, 'first_visit': first_visit,
+                       'last_visit': last_visit, 'ip_address': ip_address}
+                self._rows[key] = row
+                self._by_id[row['id']] = row
+                self._next_id += 1
+            else:
+                self._index.pop(bisect.bisect_left(self._index, (row['last_visit'], row['id'])))
+            row['visit_count'] += increment
+            row['last_visit'] = max(row['last_visit'], last_visit)
+            bisect.insort(self._index, (row['last_visit'], row['id']))
+            row['ip_address'] = ip_address or row['ip_address']
+            self._total_visits += increment
+            self._last_visit = max(self._last_visit or row['last_visit'], row['last_visit'])
+            return dict(row)
+
+
+class SQLiteVisitorRepository(VisitorRepository):
+    """Repositorio sobre un archivo SQLite en modo WAL (una conexión por hilo)"""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS visitors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            visit_count INTEGER NOT NULL DEFAULT 1,
+            first_visit TEXT NOT NULL,
+            last_visit TEXT NOT NULL,
+            ip_address TEXT
+        );
+        CREATE INDEX IF NOT EXISTS visitors_last_visit_idx ON visitors (last_visit DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS visitors_visit_count_idx ON visitors (visit_count DESC, id);
+        CREATE TABLE IF NOT EXISTS visitor_applied_batches (
+            batch_id TEXT PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        );
+    '''
+
+    NAME_KEY_INDEX = 'CREATE UNIQUE INDEX IF NOT EXISTS visitors_name_key_idx ON visitors (name_key)'
+
+    UPSERT = '''
+        INSERT INTO visitors (name, name_key, visit_count, first_visit, last_visit, ip_address)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (name_key) DO UPDATE
+           SET visit_count = visit_count + excluded.visit_count,
+               last_visit  = max(last_visit, excluded.last_visit),
+               ip_address  = COALESCE(excluded.ip_address, ip_address)
+    '''
+
+    UPSERT_RETURNING = f"{UPSERT} RETURNING {', '.join(REGISTER_COLUMNS)}"
+
+    # Sin las filas, el rollup solo necesita saber si el visitante es nuevo
+    UPSERT_COUNT = f"{UPSERT} RETURNING visit_count"
+
+    ROLLUP = '''
+        INSERT INTO visitor_stats_hourly (bucket, visits, new_visitors) VALUES (?, ?, ?)
+        ON CONFLICT (bucket) DO UPDATE
+           SET visits       = visits + excluded.visits,
+               new_visitors = new_visitors + excluded.new_visitors
+    '''
+
+    def __init__(self, path: str = 'visitors.db'):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        self._migrate_name_key(conn)
+        self._migrate_stats(conn)
+
+    def register(self, name: str, ip_address: str = None) -> Optional[dict]:
+        now = utc_now()
+        conn = self._connect()
+        with conn:
+            row = conn.execute(self.UPSERT_RETURNING, (clean_name(name), normalize_name(name),
+                                                       1, now, now, ip_address)).fetchone()
+            conn.execute(self.ROLLUP, (hour_bucket(now), 1, int(row['visit_count'] == 1)))
+        return dict(row)
+
+    def register_batch(self, visits: List[dict], batch_id: Optional[str] = None,
+                       returning: bool = True) -> List[dict]:
+        conn = self._connect()
+        with conn:
+            if batch_id is not None:
+                # Misma transacción que los incrementos: o se aplican ambos o ninguno
+                inserted = conn.execute(
+                    'INSERT OR IGNORE INTO visitor_applied_batches VALUES (?, ?)',
+                    (batch_id, utc_now())).rowcount
+                if not inserted:
+                    return []
+            params = [(v['name'], v['name_key'], v['increment'], v['first_visit'],
+                       v['last_visit'], v.get('ip_address')) for v in map(with_name_key, visits)]
+            upsert = self.UPSERT_RETURNING if returning else self.UPSERT_COUNT
+            rows = [conn.execute(upsert, p).fetchone() for p in params]
+            # Rollup por hora en la misma transacción (nuevo: visit_count == incremento)
+            hourly: Dict[str, List[int]] = {}
+            for (_, _, increment, _, last_visit, _), row in zip(params, rows):
+                bucket = hourly.setdefault(hour_bucket(last_visit), [0, 0])
+                bucket[0] += increment
+                bucket[1] += row['visit_count'] == increment
+            conn.executemany(self.ROLLUP, [(b, *counts) for b, counts in hourly.items()])
+        return [dict(r) for r in rows] if returning else []
+
+    def list_by_last_visit(self, limit: int, after: Optional[PageKey] = None,
+                           before: Optional[PageKey] = None,
+                           columns: Sequence[str] = LISTING_COLUMNS) -> List[dict]:
+        columns = ', '.join(columns)
+        if before:
+            cursor = self._connect().execute(
+                f"SELECT {columns} FROM visitors WHERE (last_visit, id) > (?, ?) "
+                "ORDER BY last_visit ASC, id ASC LIMIT ?", (*before, limit))
+            return [dict(r) for r in cursor][::-1]
+        where, params = ("WHERE (last_visit, id) < (?, ?) ", tuple(after)) if after else ("", ())
+        cursor = self._connect().execute(
+            f"SELECT {columns} FROM visitors {where}"
+            "ORDER BY last_visit DESC, id DESC LIMIT ?", (*params, limit))
+        return [dict(r) for r in cursor]
+
+    def get_visitor(self, name_key: str,
+                    columns: Sequence[str] = LISTING_COLUMNS) -> Optional[dict]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(columns)} FROM visitors WHERE name_key = ?",
+            (name_key,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def totals(self) -> dict:
+        unique, visits, last_visit = self._connect().execute(
+            'SELECT count(*), COALESCE(sum(visit_count), 0), max(last_visit) '
+            'FROM visitors').fetchone()
+        return {'total_unique': unique, 'total_visits': visits, 'last_visit': last_visit}
+
+    def hourly_stats(self, since: str) -> List[dict]:
+        cursor = self._connect().execute(
+            'SELECT bucket, visits, new_visitors FROM visitor_stats_hourly '
+            'WHERE bucket >= ? ORDER BY bucket', (since,))
+        return [dict(r) for r in cursor]
+
+    def top_visitors(self, limit: int) -> List[dict]:
+        cursor = self._connect().execute(
+            f"SELECT {', '.join(TOP_COLUMNS)} FROM visitors "
+            "ORDER BY visit_count DESC, id LIMIT ?", (limit,))
+        return [dict(r) for r in cursor]
+
+    def _migrate_name_key(self, conn: sqlite3.Connection) -> None:
+        """
+        Adapta archivos creados antes de name_key: calcula la clave, fusiona
+        los duplicados en la fila más antigua y crea el índice único
+        """
+        columns = {r['name'] for r in conn.execute('PRAGMA table_info(visitors)')}
+        with conn:
+            if 'name_key' not in columns:
+                conn.execute("ALTER TABLE visitors ADD COLUMN name_key TEXT NOT NULL DEFAULT ''")
+                conn.executemany('UPDATE visitors SET name_key = ? WHERE id = ?', [
+                    (normalize_name(r['name']), r['id'])
+                    for r in conn.execute('SELECT id, name FROM visitors')])
+                conn.execute('''
+                    UPDATE visitors AS v
+                       SET visit_count = d.total_visits,
+                           first_visit = d.first_visit,
+                           last_visit  = d.last_visit
+                      FROM (SELECT name_key, min(id) AS keep_id, sum(visit_count) AS total_visits,
+                                   min(first_visit) AS first_visit, max(last_visit) AS last_visit
+                              FROM visitors GROUP BY name_key HAVING count(*) > 1) AS d
+                     WHERE v.id = d.keep_id''')
+                conn.execute('''
+                    DELETE FROM visitors
+                     WHERE id NOT IN (SELECT min(id) FROM visitors GROUP BY name_key)''')
+            conn.execute(self.NAME_KEY_INDEX)
+
+    def _migrate_stats(self, conn: sqlite3.Connection) -> None:
+        """
+        Crea el rollup por hora; en archivos con visitantes lo rellena con una
+        estimación (primera visita en la hora de first_visit, el resto en la
+        de last_visit), como migrations/009_visitor_stats_rollup.sql
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                  "AND name = 'visitor_stats_hourly'").fetchone()
+            if not exists:
+                conn.execute('''
+                    CREATE TABLE visitor_stats_hourly (
+                        bucket TEXT PRIMARY KEY,
+                        visits INTEGER NOT NULL DEFAULT 0,
+                        new_visitors INTEGER NOT NULL DEFAULT 0
+                    )''')
+                hour = "substr({0}, 1, 10) || 'T' || substr({0}, 12, 2) || ':00:00'"
+                conn.execute(f'''
+                    INSERT INTO visitor_stats_hourly (bucket, visits, new_visitors)
+                    SELECT bucket, sum(visits), sum(new_visitors)
+                      FROM (SELECT {hour.format('first_visit')} AS bucket,
+                                   1 AS visits, 1 AS new_visitors
+                              FROM visitors
+                            UNION ALL
+                            SELECT {hour.format('last_visit')}, visit_count - 1, 0
+                              FROM visitors
+                             WHERE visit_count > 1)
+                     GROUP BY bucket''')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+
+def create_visitor_repository(backend: str = None) -> VisitorRepository:
+    """
+    Crea el repositorio configurado en VISITOR_BACKEND
+
+    Args:
+        backend: Nombre del backend; si es None se lee de VISITOR_BACKEND
+
+    Returns:
+        VisitorRepository: Instancia del backend solicitado
+    """
+    backend = backend or os.getenv('VISITOR_BACKEND', 'supabase')
+    if backend == 'memory':
+        return InMemoryVisitorRepository()
+    if backend == 'sqlite':
+        return SQLiteVisitorRepository(os.getenv('VISITOR_SQLITE_PATH', 'visitors.db'))
+    if backend == 'supabase':
+        return SupabaseVisitorRepository()
+    raise ValueError(f"VISITOR_BACKEND desconocido: {backend}")
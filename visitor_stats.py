@@ -0,0 +1,75 @@
+"""
+Estadísticas de visitas para /visitors/stats
+
+Se calculan a partir del rollup por hora que mantienen las funciones de
+registro (visitor_stats_hourly, ver migrations/009_visitor_stats_rollup.sql)
+y del índice por visit_count: el coste depende de las horas de la ventana
+pedida y del tamaño del ranking, no de la cantidad de visitantes.
+
+  - hourly: visitas, visitantes nuevos y visitas de recurrentes por hora
+  - daily:  lo mismo por día, sumando las horas de cada día
+  - top:    los visitantes con más visitas
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from visitor_repository import hour_bucket
+
+DEFAULT_HOURS = 24
+DEFAULT_DAYS = 7
+DEFAULT_TOP = 10
+
+MAX_HOURS = 24 * 7
+MAX_DAYS = 90
+MAX_TOP = 100
+
+
+def build_stats(repository, hours: int = DEFAULT_HOURS, days: int = DEFAULT_DAYS,
+                top: int = DEFAULT_TOP, now: Optional[datetime] = None) -> dict:
+    """
+    Estadísticas de las últimas `hours` horas y `days` días, y el top-`top`
+
+    Las horas y los días sin visitas aparecen con contadores a cero para que
+    las series tengan siempre la misma longitud.
+
+    Args:
+        repository: VisitorRepository del que leer
+        hours: Horas de la serie por hora (incluida la actual)
+        days: Días de la serie por día (incluido hoy)
+        top: Tamaño del ranking por visit_count
+        now: Momento de referencia en UTC sin zona (por defecto, ahora)
+    """
+    # Las horas del rollup están en UTC (ver visitor_repository.utc_now)
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    first_hour = current_hour - timedelta(hours=hours - 1)
+    first_day = current_hour.replace(hour=0) - timedelta(days=days - 1)
+
+    # Una sola lectura del rollup cubre las dos ventanas
+    since = min(first_hour, first_day).isoformat()
+    buckets: Dict[str, List[int]] = {}
+    for row in repository.hourly_stats(since):
+        counts = buckets.setdefault(hour_bucket(row['bucket']), [0, 0])
+        counts[0] += int(row['visits'])
+        counts[1] += int(row['new_visitors'])
+
+    daily: Dict[str, List[int]] = {}
+    for bucket, (visits, new) in buckets.items():
+        counts = daily.setdefault(bucket[:10], [0, 0])
+        counts[0] += visits
+        counts[1] += new
+
+    hour_keys = [(first_hour + timedelta(hours=i)).isoformat() for i in range(hours)]
+    day_keys = [(first_day + timedelta(days=i)).date().isoformat() for i in range(days)]
+    return {
+        'generated_at': now.isoformat(),
+        'hourly': [_series_point('hour', key, buckets.get(key)) for key in hour_keys],
+        'daily': [_series_point('date', key, daily.get(key)) for key in day_keys],
+        'top': repository.top_visitors(top),
+    }
+
+
+def _series_point(label: str, key: str, counts: Optional[List[int]]) -> dict:
+    visits, new = counts or (0, 0)
+    return {label: key, 'visits': visits, 'new_visitors': new,
+            'returning_visits': visits - new}